@@ -0,0 +1,145 @@
+from panda3d.core import AudioSound
+import math
+import time
+
+
+class AudioVoicePool:
+    """Заранее загруженные звуки с несколькими голосами на каждый.
+
+    Каждый звук декодируется один раз при старте (preload), и для него
+    создается несколько AudioSound-голосов. play() берет свободный голос, а
+    если все заняты - крадет тот, что начал играть раньше всех. Во время
+    игры ничего не загружается и не создается.
+    """
+
+    def __init__(self, loader, max_voices=8):
+        self.loader = loader
+        self.max_voices = max_voices
+        # Имя -> {'voices': [...], 'started': [...], 'next': n}
+        self.sounds = {}
+
+        self.plays = 0
+        self.steals = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def preload(self, name, path, voices=None, min_interval=None, volume=1.0):
+        """Загружает звук под именем name.
+
+        Количество голосов задается явно (voices) или считается по длине звука
+        и минимальному интервалу между повторами (например, cooldown оружия),
+        чтобы при непрерывной стрельбе хвост выстрела не обрывался.
+        """
+        first = self.loader.loadSfx(path)
+        if voices is None:
+            voices = 2
+            if min_interval and first.length() > 0:
+                voices = math.ceil(first.length() / min_interval) + 1
+        voices = max(1, min(voices, self.max_voices))
+
+        # Остальные голоса берутся из кэша звукового менеджера, файл не читается заново
+        sounds = [first] + [self.loader.loadSfx(path) for _ in range(voices - 1)]
+        for sound in sounds:
+            sound.setVolume(volume)
+        self.sounds[name] = {
+            'voices': sounds,
+            'started': [0.0] * voices,
+            'next': 0
+        }
+
+    def has_sound(self, name):
+        return name in self.sounds
+
+    def play(self, name):
+        """Проигрывает звук на свободном или самом старом голосе"""
+        entry = self.sounds.get(name)
+        if entry is None:
+            return None
+
+        started = time.perf_counter()
+        voices = entry['voices']
+        count = len(voices)
+
+        # Ищем свободный голос по кругу, начиная со следующего
+        index = None
+        for offset in range(count):
+            candidate = (entry['next'] + offset) % count
+            if voices[candidate].status() != AudioSound.PLAYING:
+                index = candidate
+                break
+        if index is None:
+            # Все заняты - крадем голос, который играет дольше всех
+            index = min(range(count), key=entry['started'].__getitem__)
+            voices[index].stop()
+            self.steals += 1
+
+        voice = voices[index]
+        voice.play()
+        entry['started'][index] = started
+        entry['next'] = (index + 1) % count
+
+        latency = time.perf_counter() - started
+        self.plays += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        return voice
+
+    def set_volume(self, name, volume):
+        entry = self.sounds.get(name)
+        if entry:
+            for voice in entry['voices']:
+                voice.setVolume(volume)
+
+    def stop_all(self):
+        for entry in self.sounds.values():
+            for voice in entry['voices']:
+                voice.stop()
+
+    def get_stats(self):
+        return {
+            'sounds': len(self.sounds),
+            'voices': sum(len(entry['voices']) for entry in self.sounds.values()),
+            'plays': self.plays,
+            'steals': self.steals,
+            'avg_latency_ms': self.latency_total / self.plays * 1000 if self.plays else 0.0,
+            'max_latency_ms': self.latency_max * 1000
+        }
+
+
+if __name__ == "__main__":
+    # Бенчмарк: loadSfx на каждый выстрел против пула голосов
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData('', 'window-type none')
+    from direct.showbase.ShowBase import ShowBase
+    import os
+
+    base = ShowBase()
+    sound_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+    path = os.path.join(sound_dir, "rifle_shot.wav")
+    shots = 500
+
+    # Старый способ: новый AudioSound на каждый выстрел
+    latencies = []
+    for _ in range(shots):
+        started = time.perf_counter()
+        sound = base.loader.loadSfx(path)
+        sound.play()
+        latencies.append(time.perf_counter() - started)
+        base.sfxManagerList[0].update()
+    latencies.sort()
+    print(f"loadSfx per shot: avg {sum(latencies) / shots * 1000:.3f} ms, "
+          f"p99 {latencies[int(shots * 0.99)] * 1000:.3f} ms")
+
+    pool = AudioVoicePool(base.loader)
+    started = time.perf_counter()
+    pool.preload("rifle", path, min_interval=0.1)
+    print(f"Preloaded {len(pool.sounds['rifle']['voices'])} voices in {(time.perf_counter() - started) * 1000:.2f} ms")
+    latencies = []
+    for _ in range(shots):
+        started = time.perf_counter()
+        pool.play("rifle")
+        latencies.append(time.perf_counter() - started)
+        base.sfxManagerList[0].update()
+    latencies.sort()
+    print(f"voice pool:       avg {sum(latencies) / shots * 1000:.3f} ms, "
+          f"p99 {latencies[int(shots * 0.99)] * 1000:.3f} ms, stats {pool.get_stats()}")
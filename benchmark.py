@@ -0,0 +1,274 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from panda3d.core import ClockObject, PandaSystem, Point3, Vec3
+
+from session_recorder import GAMEPLAY_SETTINGS
+from task_profiler import TaskProfiler
+
+# Фиксированные время старта и шаг часов: одинаковая работа на кадр при любой скорости машины.
+# Старт не с нуля - нулевые "время последнего выстрела/попадания" должны быть в прошлом
+START_TIME = 100.0
+FRAME_DT = 1 / 60
+# Настройки, от которых зависит нагрузка; в бенчмарке всегда по умолчанию
+BENCHMARK_SETTINGS = GAMEPLAY_SETTINGS + ('bullet_traces', 'damage_numbers', 'killfeed')
+WEAPON_KEYS = ('1', '2', '3', '4', '5')
+# Куда целится бот: центр туловища в координатах манекена (как в хитбоксе).
+# Не по границам модели - они меняются, когда фоном догружается картинка
+AIM_POINT = Point3(0, 0, 1.5)
+
+
+class AimBot:
+    """Скриптовый игрок: наводится на манекены, стреляет, меняет оружие и двигается.
+
+    Ходит через те же пути, что живой игрок: поворот - apply_look_delta,
+    выстрелы, оружие, движение и прыжки - события messenger. Все решения
+    берутся из своего генератора с сидом, поэтому прогон повторяется.
+    """
+
+    def __init__(self, game, seed=0, turn_speed=540.0, fire_angle=1.5, fire_interval=0.25,
+                 weapon_interval=600, strafe_interval=120, jump_interval=300):
+        self.game = game
+        self.rng = random.Random(seed)
+        self.turn_speed = turn_speed
+        self.fire_angle = fire_angle
+        # Короткие нажатия с паузой: разброс успевает восстановиться, как у живого игрока
+        self.fire_interval = fire_interval
+        self.last_press = None
+        self.weapon_interval = weapon_interval
+        self.strafe_interval = strafe_interval
+        self.jump_interval = jump_interval
+
+        self.frame = 0
+        self.target = None
+        self.aim_offset = None
+        self.aim_point = None
+        self.firing = False
+        self.strafe_key = None
+        self.presses = 0
+        self.task = None
+
+    def start(self):
+        # После input_pipeline (-49), до обработки событий и update
+        self.task = self.game.taskMgr.add(self.update, 'aim_bot', sort=-48)
+
+    def stop(self):
+        if self.task is not None:
+            self.game.taskMgr.remove(self.task)
+            self.task = None
+
+    def update(self, task):
+        self.frame += 1
+        self.move()
+
+        if self.target not in self.game.targets:
+            self.pick_target()
+        if self.target is None:
+            self.release_fire()
+            return task.cont
+
+        # Точка берется от модели каждый кадр: пул может переставить тот же манекен на новое место
+        self.aim_point = self.game.render.getRelativePoint(self.target.model, self.aim_offset)
+        delta_heading, delta_pitch = self.aim_error()
+        turn = self.turn_speed * globalClock.getDt()
+        self.game.apply_look_delta(max(-turn, min(turn, delta_heading)),
+                                   max(-turn, min(turn, delta_pitch)))
+
+        self.release_fire()
+        now = globalClock.getFrameTime()
+        ready = self.last_press is None or now - self.last_press >= self.fire_interval
+        if ready and abs(delta_heading) < self.fire_angle and abs(delta_pitch) < self.fire_angle:
+            messenger.send('mouse1')
+            self.presses += 1
+            self.firing = True
+            self.last_press = now
+        return task.cont
+
+    def move(self):
+        if self.frame % self.weapon_interval == 0:
+            messenger.send(WEAPON_KEYS[self.frame // self.weapon_interval % len(WEAPON_KEYS)])
+        # Половину времени стрейф то влево, то вправо, половину - стоит на месте
+        if self.frame % self.strafe_interval == 0:
+            self.strafe_key = 'd' if self.strafe_key == 'a' else 'a'
+            messenger.send(self.strafe_key)
+        elif self.frame % self.strafe_interval == self.strafe_interval // 2:
+            messenger.send(f"{self.strafe_key}-up")
+        if self.frame % self.jump_interval == self.jump_interval // 2:
+            messenger.send('space')
+
+    def release_fire(self):
+        if self.firing:
+            messenger.send('mouse1-up')
+            self.firing = False
+
+    def pick_target(self):
+        """Ближайший по углу манекен; точка прицеливания - туловище с разбросом (в координатах манекена)"""
+        self.target = None
+        best = None
+        for target in self.game.targets:
+            self.aim_point = self.game.render.getRelativePoint(target.model, AIM_POINT)
+            error = sum(abs(value) for value in self.aim_error())
+            if best is None or error < best[0]:
+                best = (error, target)
+        if best is not None:
+            self.target = best[1]
+            self.aim_offset = AIM_POINT + Vec3(self.rng.gauss(0, 0.1), 0, self.rng.gauss(0, 0.1))
+
+    def aim_error(self):
+        """Поворот (heading, pitch) в градусах от взгляда камеры до точки прицеливания"""
+        delta = self.aim_point - self.game.camera.getPos(self.game.render)
+        heading = -math.degrees(math.atan2(delta.getX(), delta.getY()))
+        pitch = math.degrees(math.atan2(delta.getZ(), math.hypot(delta.getX(), delta.getY())))
+        delta_heading = (heading - self.game.camera_heading + 180) % 360 - 180
+        return delta_heading, pitch - self.game.camera_pitch
+
+
+def run_benchmark(target_count, frames=3000, warmup=120, seed=1):
+    """Один прогон в этом процессе: игра без окна, бот, замер кадров и задач"""
+    from main import Game
+
+    game = Game(headless=True)
+    for key in BENCHMARK_SETTINGS:
+        game.settings[key] = game.DEFAULT_SETTINGS[key]
+    game.settings['target_count'] = target_count
+
+    globalClock.setMode(ClockObject.MNonRealTime)
+    globalClock.setFrameTime(START_TIME)
+    globalClock.setDt(FRAME_DT)
+    game.start_game(seed=seed)
+    bot = AimBot(game, seed)
+    bot.start()
+
+    for _ in range(warmup):
+        game.taskMgr.step()
+
+    profiler = TaskProfiler(game.taskMgr, window=frames)
+    profiler.enable()
+    frame_times = np.zeros(frames)
+    for i in range(frames):
+        started = time.perf_counter()
+        game.taskMgr.step()
+        frame_times[i] = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(frame_times, (50, 95, 99)) * 1000
+    profile = profiler.get_stats()
+    tasks = profile['tasks']
+    # Остаток кадра вне задач (в основном вызовы C++ между задачами)
+    other = frame_times.mean() * 1000 - sum(task['ms_per_frame'] for task in tasks.values())
+    tasks['other'] = {'ms_per_frame': other}
+    return {
+        'targets': target_count,
+        'frame_ms': {
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'mean': float(frame_times.mean() * 1000),
+            'max': float(frame_times.max() * 1000)
+        },
+        'tasks': tasks,
+        'profiler_overhead_ms': profile['overhead_ms'],
+        'score': int(game.score),
+        'presses': bot.presses
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_all(target_counts, frames, warmup, seed):
+    """Каждое число манекенов - в отдельном процессе, чтобы прогоны не влияли друг на друга"""
+    runs = []
+    for count in target_counts:
+        handle, result_path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', str(count),
+                            '--frames', str(frames), '--warmup', str(warmup), '--seed', str(seed),
+                            '--result-file', result_path],
+                           check=True, stdout=subprocess.DEVNULL,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        finally:
+            os.remove(result_path)
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'panda3d': PandaSystem.getVersionString(),
+        'platform': platform.platform(),
+        'frames': frames,
+        'warmup': warmup,
+        'seed': seed,
+        'frame_dt': FRAME_DT,
+        'runs': runs
+    }
+
+
+def print_report(report, top=6):
+    print(f"commit {report['commit']}, {report['frames']} frames, seed {report['seed']}")
+    for run in report['runs']:
+        frame = run['frame_ms']
+        print(f"{run['targets']:>4} targets: p50 {frame['p50']:.2f} ms, p95 {frame['p95']:.2f} ms, "
+              f"p99 {frame['p99']:.2f} ms, score {run['score']}")
+        for name, task in list(run['tasks'].items())[:top]:
+            print(f"      {name:<28} {task['ms_per_frame']:.3f} ms/frame")
+
+
+def print_comparison(old, new):
+    """Разница с прошлым отчетом (другой коммит) по одинаковым числам манекенов"""
+    print(f"compare {old['commit']} -> {new['commit']}")
+    if old['frames'] != new['frames'] or old['seed'] != new['seed']:
+        print("warning: reports use different frames or seed")
+    old_runs = {run['targets']: run for run in old['runs']}
+    for run in new['runs']:
+        previous = old_runs.get(run['targets'])
+        if previous is None:
+            continue
+        changes = []
+        for key in ('p50', 'p95', 'p99'):
+            before, after = previous['frame_ms'][key], run['frame_ms'][key]
+            changes.append(f"{key} {before:.2f} -> {after:.2f} ms ({(after - before) / before * 100:+.1f}%)")
+        print(f"{run['targets']:>4} targets: " + ", ".join(changes))
+
+
+if __name__ == "__main__":
+    # python benchmark.py --targets 10 30 60 --frames 3000 --output bench.json --compare old.json
+    parser = argparse.ArgumentParser(description="Headless frame benchmark with a scripted aim bot")
+    parser.add_argument('--targets', type=int, nargs='+', default=[10], help="target counts to run")
+    parser.add_argument('--frames', type=int, default=3000, help="measured frames per run")
+    parser.add_argument('--warmup', type=int, default=120, help="frames before measuring")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark.json', help="JSON report path")
+    parser.add_argument('--compare', metavar='JSON', help="previous report to compare with")
+    parser.add_argument('--run-one', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        result = run_benchmark(args.run_one, args.frames, args.warmup, args.seed)
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    report = run_all(args.targets, args.frames, args.warmup, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print_report(report)
+    print(f"Report saved to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
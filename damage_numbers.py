@@ -0,0 +1,168 @@
+from panda3d.core import TextNode
+import random
+
+
+class DamageNumbers:
+    """Всплывающие цифры урона из заранее созданного пула.
+
+    Узлы пула создаются один раз. Геометрия строк "+N" для частых значений
+    генерируется при старте (кэш глифов) и при попадании только подключается
+    к свободному узлу. Редкие строки пишутся в собственный TextNode узла.
+    Анимацией всех цифр занимается один вызов update() за кадр.
+    """
+
+    def __init__(self, parent, pool_size=24, lifetime=0.5, rise=0.2, scale=0.07,
+                 spread=0.15, cached_values=range(0, 401)):
+        self.lifetime = lifetime
+        self.rise = rise
+        self.spread = spread
+        self.root = parent.attachNewNode('damage_numbers')
+
+        # Кэш геометрии строк: значение -> сгенерированный узел
+        generator = TextNode('damage_glyphs')
+        generator.setAlign(TextNode.ACenter)
+        self.glyph_cache = {}
+        for value in cached_values:
+            generator.setText(self.format_value(value))
+            # Цвет запекается в геометрию: у каждого значения он свой и не меняется
+            generator.setTextColor(*self.get_color(value))
+            self.glyph_cache[value] = generator.generate()
+
+        self.slots = []
+        for i in range(pool_size):
+            holder = self.root.attachNewNode(f'damage_number_{i}')
+            holder.setScale(scale)
+            # Запасной TextNode для значений вне кэша
+            text_node = TextNode(f'damage_text_{i}')
+            text_node.setAlign(TextNode.ACenter)
+            text_np = holder.attachNewNode(text_node)
+            # Сюда подключается геометрия из кэша
+            glyph_np = holder.attachNewNode(f'damage_glyph_{i}')
+            holder.stash()
+            self.slots.append({
+                'holder': holder,
+                'text_node': text_node,
+                'text_np': text_np,
+                'glyph_np': glyph_np,
+                'start_time': 0.0,
+                'x': 0.0,
+                'z': 0.0,
+                'active': False
+            })
+        self.next_slot = 0
+        self.active_count = 0
+
+    @staticmethod
+    def format_value(value):
+        return f"+{value}"
+
+    @staticmethod
+    def get_color(value):
+        """Цвет в зависимости от урона"""
+        if value >= 100:  # Хедшот
+            return (1, 0, 0, 1)  # Красный
+        if value >= 60:  # Высокий урон
+            return (1, 0.5, 0, 1)  # Оранжевый
+        return (1, 1, 1, 1)  # Белый
+
+    def spawn(self, value, now, rng=random):
+        """Показывает число урона рядом с прицелом; rng - генератор для смещения (поток эффектов игры)"""
+        # Свободный слот или самый старый из занятых
+        slot = self.slots[self.next_slot]
+        self.next_slot = (self.next_slot + 1) % len(self.slots)
+        if not slot['active']:
+            self.active_count += 1
+
+        glyph = self.glyph_cache.get(value)
+        glyph_node = slot['glyph_np'].node()
+        glyph_node.removeAllChildren()
+        if glyph is not None:
+            glyph_node.addChild(glyph)
+            slot['text_np'].stash()
+        else:
+            slot['text_node'].setText(self.format_value(value))
+            slot['text_node'].setTextColor(*self.get_color(value))
+            slot['text_np'].unstash()
+
+        # Случайное смещение от центра экрана
+        slot['x'] = rng.uniform(-self.spread, self.spread)
+        slot['z'] = rng.uniform(-self.spread, self.spread)
+        slot['start_time'] = now
+        slot['active'] = True
+
+        holder = slot['holder']
+        holder.setAlphaScale(1.0)
+        holder.setPos(slot['x'], 0, slot['z'])
+        holder.unstash()
+
+    def update(self, now):
+        """Поднимает и растворяет все активные числа"""
+        if self.active_count == 0:
+            return
+        for slot in self.slots:
+            if not slot['active']:
+                continue
+            progress = (now - slot['start_time']) / self.lifetime
+            if progress >= 1.0:
+                slot['active'] = False
+                slot['holder'].stash()
+                self.active_count -= 1
+                continue
+            slot['holder'].setZ(slot['z'] + self.rise * progress)
+            slot['holder'].setAlphaScale(1.0 - progress)
+
+    def clear(self):
+        for slot in self.slots:
+            slot['active'] = False
+            slot['holder'].stash()
+        self.active_count = 0
+
+    def destroy(self):
+        self.root.removeNode()
+        self.slots = []
+        self.glyph_cache.clear()
+
+
+if __name__ == "__main__":
+    # Бенчмарк: новый TextNode + интервалы на каждое попадание против пула
+    from panda3d.core import loadPrcFileData, Point3, Vec4
+    loadPrcFileData('', 'window-type offscreen\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+    from direct.interval.IntervalGlobal import Parallel, LerpColorScaleInterval
+    import time
+    import tracemalloc
+
+    base = ShowBase()
+    values = [random.choice((15, 20, 25, 30, 40, 45, 50, 60, 72, 100, 120, 200)) for _ in range(2000)]
+
+    def old_spawn(value):
+        damage_text = TextNode('damage')
+        damage_text.setText(f"+{value}")
+        damage_text.setAlign(TextNode.ACenter)
+        text_np = base.aspect2d.attachNewNode(damage_text)
+        offset_x = random.uniform(-0.15, 0.15)
+        offset_y = random.uniform(-0.15, 0.15)
+        text_np.setPos(offset_x, 0, offset_y)
+        text_np.setScale(0.07)
+        Parallel(
+            LerpColorScaleInterval(text_np, 0.5, Vec4(1, 1, 1, 0), Vec4(1, 1, 1, 1)),
+            text_np.posInterval(0.5, Point3(offset_x, 0, offset_y + 0.2), Point3(offset_x, 0, offset_y))
+        ).start()
+        base.taskMgr.doMethodLater(0.5, lambda task: text_np.removeNode(), 'remove_damage_text')
+
+    started = time.perf_counter()
+    numbers = DamageNumbers(base.aspect2d)
+    print(f"Pool and glyph cache built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    for name, spawn in (("TextNode per hit", old_spawn),
+                        ("pool", lambda value: numbers.spawn(value, globalClock.getFrameTime()))):
+        tracemalloc.start()
+        started = time.perf_counter()
+        for value in values:
+            spawn(value)
+            numbers.update(globalClock.getFrameTime())
+            base.taskMgr.step()
+        elapsed = (time.perf_counter() - started) / len(values) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>16}: {elapsed:.3f} ms per hit+frame, python peak {peak / 1024:.0f} KB")
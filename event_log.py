@@ -0,0 +1,201 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from hitbox import HITBOX_PARTS
+
+# Заголовок: магия, размер записи, длина JSON с описанием сессии; дальше записи подряд
+MAGIC = b'AIMEVT1\0'
+HEADER = struct.Struct('<8sII')
+
+EVENT_SHOT = 0
+EVENT_HIT = 1
+EVENT_KILL = 2
+EVENT_SPAWN = 3
+EVENT_KINDS = ('shot', 'hit', 'kill', 'spawn')
+
+# Зона попадания хранится индексом в ZONES, 0 - нет зоны (выстрел мимо, спавн)
+ZONES = ('',) + tuple(zone.name for zone, _ in HITBOX_PARTS)
+
+# Одна запись фиксированного размера; файл читается как массив этого типа без копирования.
+# time - время кадра от старта сессии (монотонное игровое время), target - номер манекена
+# в пуле (-1 - нет), damage - очки, spread - разброс выстрела, point - точка попадания
+# или спавна, direction - направление луча выстрела
+EVENT_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('frame', '<u4'),
+    ('target', '<i4'),
+    ('damage', '<i4'),
+    ('spread', '<f4'),
+    ('direction', '<f4', (3,)),
+    ('point', '<f4', (3,)),
+    ('kind', 'u1'),
+    ('weapon', 'u1'),
+    ('zone', 'u1'),
+    ('reserved', 'u1')
+])
+
+NO_VECTOR = (0.0, 0.0, 0.0)
+
+
+class EventLog:
+    """Журнал событий сессии: выстрелы, попадания, убийства и спавны.
+
+    log() в кадре только собирает кортеж и кладет его в queue.SimpleQueue -
+    без блокировок на стороне игры. Фоновый поток забирает все накопленное
+    пачкой, переводит в массив EVENT_DTYPE и дописывает в конец файла.
+    Файл - заголовок с JSON и записи подряд, см. load_event_log.
+    """
+
+    def __init__(self, path, weapons, info=None, batch_size=4096):
+        self.path = path
+        self.weapons = list(weapons)
+        self.weapon_index = {name: index for index, name in enumerate(self.weapons)}
+        self.zone_index = {name: index for index, name in enumerate(ZONES)}
+        self.info = dict(info or {}, weapons=self.weapons, zones=list(ZONES), kinds=list(EVENT_KINDS),
+                         dtype=EVENT_DTYPE.descr)
+        self.batch_size = batch_size
+        self.start_time = 0.0
+
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.file = None
+        self.logged = 0
+        self.written = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.start_time = globalClock.getFrameTime()
+        self.info['start_time'] = self.start_time
+        info = json.dumps(self.info).encode()
+        self.file = open(self.path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, EVENT_DTYPE.itemsize, len(info)) + info)
+        self.bytes_written = HEADER.size + len(info)
+        self.thread = threading.Thread(target=self.writer, name='event_log', daemon=True)
+        self.thread.start()
+
+    def log(self, kind, weapon, target=-1, damage=0, spread=0.0, direction=NO_VECTOR, point=NO_VECTOR, zone=''):
+        """Ставит событие в очередь; вызывается из кадра, не ждет диска"""
+        self.queue.put((
+            globalClock.getFrameTime() - self.start_time, globalClock.getFrameCount(), target, damage, spread,
+            tuple(direction), tuple(point), kind, self.weapon_index.get(weapon, 255), self.zone_index.get(zone, 0), 0
+        ))
+        self.logged += 1
+
+    def writer(self):
+        """Поток записи: ждет первое событие, добирает остальные без ожидания"""
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            # None - сигнал остановки от close(), все до него дописывается
+            if batch[-1] is None:
+                batch.pop()
+                running = False
+            if batch:
+                started = time.perf_counter()
+                data = np.array(batch, dtype=EVENT_DTYPE).tobytes()
+                self.file.write(data)
+                self.file.flush()
+                self.written += len(batch)
+                self.batches += 1
+                self.bytes_written += len(data)
+                self.write_time += time.perf_counter() - started
+
+    def close(self):
+        """Дописывает очередь и закрывает файл"""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.file = None
+        print(f"Event log saved: {self.path} ({self.written} events, {self.bytes_written} bytes)")
+
+    def get_stats(self):
+        return {
+            'logged': self.logged,
+            'written': self.written,
+            'queued': self.logged - self.written,
+            'batches': self.batches,
+            'bytes': self.bytes_written,
+            'write_ms': self.write_time * 1000
+        }
+
+
+def load_event_log(path, mmap=True):
+    """Читает журнал: (описание сессии, массив EVENT_DTYPE).
+
+    С mmap=True записи не копируются в память, а отображаются из файла
+    (np.memmap). Хвост недописанной записи (игра упала) отбрасывается.
+    """
+    with open(path, 'rb') as f:
+        magic, record_size, info_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        info = json.loads(f.read(info_size))
+    if record_size != EVENT_DTYPE.itemsize:
+        raise ValueError(f"{path}: record size {record_size}, expected {EVENT_DTYPE.itemsize}")
+    offset = HEADER.size + info_size
+    count = (os.path.getsize(path) - offset) // record_size
+    if not count:
+        return info, np.zeros(0, dtype=EVENT_DTYPE)
+    if mmap:
+        return info, np.memmap(path, dtype=EVENT_DTYPE, mode='r', offset=offset, shape=(count,))
+    return info, np.fromfile(path, dtype=EVENT_DTYPE, count=count, offset=offset)
+
+
+if __name__ == "__main__":
+    # Бенчмарк: цена log() в кадре и пропускная способность потока записи,
+    # затем чтение обратно через memmap и проверка содержимого
+    import builtins
+    import tempfile
+
+    class FakeClock:
+        frame = 0
+
+        def getFrameTime(self):
+            return self.frame / 60
+
+        def getFrameCount(self):
+            return self.frame
+
+    clock = builtins.globalClock = FakeClock()
+    path = os.path.join(tempfile.mkdtemp(), 'events.evlog')
+    log = EventLog(path, ['rifle', 'shotgun'], {'seed': 1})
+    log.start()
+
+    events = 200000
+    started = time.perf_counter()
+    for i in range(events):
+        clock.frame = i // 4
+        if i % 4 == 3:
+            log.log(EVENT_HIT, 'rifle', target=i % 10, damage=60, point=(1.0, 20.0, 2.5), zone='target_body')
+        else:
+            log.log(EVENT_SHOT, 'shotgun', spread=0.02, direction=(0.0, 1.0, 0.0))
+    log_time = time.perf_counter() - started
+    log.close()
+    stats = log.get_stats()
+    print(f"log(): {log_time / events * 1e6:.2f} us per event, {stats['written']} written in "
+          f"{stats['batches']} batches, writer {stats['write_ms'] / events * 1000:.2f} us per event")
+
+    info, records = load_event_log(path)
+    hits = records[records['kind'] == EVENT_HIT]
+    print(f"{path}: {len(records)} records of {EVENT_DTYPE.itemsize} bytes, {len(hits)} hits, "
+          f"weapons {info['weapons']}, zone of first hit {ZONES[hits[0]['zone']]}, "
+          f"damage {int(hits['damage'].sum())}, last time {records['time'][-1]:.2f} s")
@@ -0,0 +1,140 @@
+class GameClock:
+    """Игровое время отдельно от globalClock: фиксированный шаг и замедление.
+
+    Реальное время кадра (умноженное на текущий масштаб времени) копится в
+    аккумуляторе, а симуляция вызывается шагами ровно по step секунд, поэтому
+    ее результат не зависит от частоты кадров. Остаток аккумулятора дает alpha
+    для интерполяции между двумя последними состояниями при отрисовке.
+    Замедление меняет только скорость игрового времени - globalClock не
+    трогается, и все, что идет по реальному времени (звук, HUD, интерфейс),
+    работает как обычно.
+    """
+
+    def __init__(self, step=1 / 120, max_steps=8, time_scale_speed=6.0):
+        self.step = step
+        # Больше шагов за кадр не делаем, чтобы долгий кадр не тянул за собой следующие
+        self.max_steps = max_steps
+        self.time_scale_speed = time_scale_speed
+
+        self.time_scale = 1.0
+        self.target_time_scale = 1.0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        # Игровое время - сумма сделанных шагов
+        self.game_time = 0.0
+        self.step_count = 0
+        self.steps_last_frame = 0
+        self.dropped_time = 0.0
+
+        self.step_callbacks = []
+
+    def add_step_callback(self, callback):
+        """callback(dt) вызывается на каждом шаге симуляции"""
+        if callback not in self.step_callbacks:
+            self.step_callbacks.append(callback)
+
+    def remove_step_callback(self, callback):
+        if callback in self.step_callbacks:
+            self.step_callbacks.remove(callback)
+
+    def set_time_scale(self, scale, immediate=False):
+        """Задает скорость игрового времени; переход плавный, если не immediate"""
+        self.target_time_scale = scale
+        if immediate:
+            self.time_scale = scale
+
+    def advance(self, real_dt):
+        """Продвигает игровое время на реальный dt кадра; возвращает число шагов"""
+        # Плавное изменение масштаба времени по реальному времени
+        if self.time_scale != self.target_time_scale:
+            diff = self.target_time_scale - self.time_scale
+            change = min(abs(diff), real_dt * self.time_scale_speed)
+            self.time_scale += change if diff > 0 else -change
+
+        self.accumulator += real_dt * self.time_scale
+        steps = 0
+        while self.accumulator >= self.step:
+            if steps == self.max_steps:
+                # Не успеваем - отбрасываем целые шаги, остаток оставляем для интерполяции
+                dropped = self.accumulator - self.accumulator % self.step
+                self.dropped_time += dropped
+                self.accumulator -= dropped
+                break
+            for callback in self.step_callbacks:
+                callback(self.step)
+            self.accumulator -= self.step
+            self.game_time += self.step
+            steps += 1
+
+        self.step_count += steps
+        self.steps_last_frame = steps
+        self.alpha = self.accumulator / self.step
+        return steps
+
+    def interpolate(self, previous, current):
+        """Состояние для отрисовки между двумя последними шагами"""
+        return previous + (current - previous) * self.alpha
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.time_scale = self.target_time_scale
+
+    def get_stats(self):
+        return {
+            'game_time': self.game_time,
+            'time_scale': self.time_scale,
+            'steps': self.step_count,
+            'steps_last_frame': self.steps_last_frame,
+            'dropped_ms': self.dropped_time * 1000
+        }
+
+
+if __name__ == "__main__":
+    # Проверка: прыжок с разбегом при разной частоте кадров.
+    # Переменный dt дает разную высоту и точку приземления, фиксированный шаг - одинаковые.
+    import random
+
+    def make_player():
+        return {'x': 0.0, 'z': 1.8, 'vz': 15.0, 'peak': 1.8, 'landed_x': None}
+
+    def simulate(player, dt):
+        if player['landed_x'] is not None:
+            return
+        player['x'] += 10.0 * dt
+        player['vz'] += -50.0 * dt
+        player['z'] += player['vz'] * dt
+        player['peak'] = max(player['peak'], player['z'])
+        if player['z'] <= 1.8:
+            player['z'] = 1.8
+            player['landed_x'] = player['x']
+
+    def run(fps, fixed, seconds=1.0, jitter=0.15):
+        rng = random.Random(fps)
+        player = make_player()
+        clock = GameClock()
+        clock.add_step_callback(lambda dt: simulate(player, dt))
+        elapsed = 0.0
+        while elapsed < seconds:
+            dt = 1 / fps * rng.uniform(1 - jitter, 1 + jitter)
+            elapsed += dt
+            if fixed:
+                clock.advance(dt)
+            else:
+                simulate(player, dt)
+        return player
+
+    print(f"{'fps':>5} {'variable peak':>14} {'landed x':>9} {'fixed peak':>11} {'landed x':>9}")
+    for fps in (30, 60, 144, 240, 360):
+        variable = run(fps, False)
+        fixed = run(fps, True)
+        print(f"{fps:>5} {variable['peak']:>14.4f} {variable['landed_x']:>9.4f} "
+              f"{fixed['peak']:>11.4f} {fixed['landed_x']:>9.4f}")
+
+    # Замедление: 0.3 секунды реального времени на скорости 0.3 = 0.09 секунды игрового
+    clock = GameClock(step=1 / 120)
+    clock.set_time_scale(0.3, immediate=True)
+    for _ in range(18):
+        clock.advance(1 / 60)
+    print(f"slow motion 0.3 for 0.3 s real: game time {clock.game_time:.4f} s "
+          f"+ {clock.accumulator:.4f} s in accumulator, stats {clock.get_stats()}")
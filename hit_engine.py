@@ -0,0 +1,301 @@
+from panda3d.core import Mat4, Point3, CollisionSphere
+import numpy as np
+from hitbox import HITBOX_PARTS
+
+
+class RayHits:
+    """Результат пакетной проверки лучей.
+
+    Для каждого луча i: hit[i] - было ли попадание, target_index[i] и
+    part_index[i] - манекен и зона, distance[i] - расстояние вдоль луча,
+    point[i] - точка на поверхности в мировых координатах.
+    """
+
+    def __init__(self, engine, hit, target_index, part_index, distance, point):
+        self.engine = engine
+        self.hit = hit
+        self.target_index = target_index
+        self.part_index = part_index
+        self.distance = distance
+        self.point = point
+
+    def __len__(self):
+        return len(self.hit)
+
+    def get(self, ray_index):
+        """(манекен, зона, точка, расстояние) для луча или None при промахе"""
+        if not self.hit[ray_index]:
+            return None
+        target = self.engine.targets[self.target_index[ray_index]]
+        zone = self.engine.zones[self.part_index[ray_index]]
+        return target, zone, self.point[ray_index], float(self.distance[ray_index])
+
+
+class HitEngine:
+    """Аналитическая проверка N лучей против M манекенов одним вызовом NumPy.
+
+    Хитбоксы всех манекенов одинаковы (HITBOX_PARTS), поэтому хранится только
+    обратная матрица каждого манекена: луч переводится в локальные координаты
+    манекена и проверяется против сфер и боксов шаблона. Манекены
+    регистрируются через update_target/remove_target при спавне и смерти.
+    """
+
+    def __init__(self, render, capacity=32):
+        self.render = render
+
+        sphere_zones, box_zones = [], []
+        centers, radii, box_min, box_max = [], [], [], []
+        for zone, solid in HITBOX_PARTS:
+            if isinstance(solid, CollisionSphere):
+                center = solid.getCenter()
+                centers.append((center.x, center.y, center.z))
+                radii.append(solid.getRadius())
+                sphere_zones.append(zone)
+            else:
+                low, high = solid.getMin(), solid.getMax()
+                box_min.append((low.x, low.y, low.z))
+                box_max.append((high.x, high.y, high.z))
+                box_zones.append(zone)
+
+        # Сначала сферы, потом боксы - в том же порядке, что и zones
+        self.zones = sphere_zones + box_zones
+        self.sphere_centers = np.array(centers, dtype=np.float64).reshape(-1, 3)
+        self.sphere_radii_sq = np.array(radii, dtype=np.float64) ** 2
+        self.box_min = np.array(box_min, dtype=np.float64).reshape(-1, 3)
+        self.box_max = np.array(box_max, dtype=np.float64).reshape(-1, 3)
+
+        # Описанная сфера всех зон для грубого отсечения пар луч-манекен
+        points = np.vstack([self.box_min, self.box_max, self.sphere_centers])
+        low, high = points.min(axis=0), points.max(axis=0)
+        self.bound_center_local = (low + high) / 2
+        corners = np.vstack([self.box_min, self.box_max])
+        self.bound_radius_sq = max(
+            np.max(np.sum((corners - self.bound_center_local) ** 2, axis=1)),
+            np.max((np.linalg.norm(self.sphere_centers - self.bound_center_local, axis=1)
+                    + np.sqrt(self.sphere_radii_sq)) ** 2)
+        )
+
+        self.targets = []
+        self.slots = {}
+        self.free_slots = []
+        # Мир -> локальные координаты манекена: p_local = p @ rotation + offset
+        self.rotation = np.zeros((capacity, 3, 3), dtype=np.float64)
+        self.offset = np.zeros((capacity, 3), dtype=np.float64)
+        self.bound_center = np.zeros((capacity, 3), dtype=np.float64)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def grow(self):
+        capacity = len(self.active) * 2
+        self.rotation = np.resize(self.rotation, (capacity, 3, 3))
+        self.offset = np.resize(self.offset, (capacity, 3))
+        self.bound_center = np.resize(self.bound_center, (capacity, 3))
+        active = np.zeros(capacity, dtype=bool)
+        active[:len(self.active)] = self.active
+        self.active = active
+
+    def update_target(self, target):
+        """Регистрирует манекен или обновляет его положение"""
+        slot = self.slots.get(target)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.targets[slot] = target
+            else:
+                slot = len(self.targets)
+                if slot >= len(self.active):
+                    self.grow()
+                self.targets.append(target)
+            self.slots[target] = slot
+
+        mat = target.model.getMat(self.render)
+        inverse = Mat4(mat)
+        inverse.invertInPlace()
+        # Panda3D умножает точку-строку на матрицу справа
+        for row in range(3):
+            self.rotation[slot, row] = inverse.getRow3(row)
+        self.offset[slot] = inverse.getRow3(3)
+        self.bound_center[slot] = mat.xformPoint(Point3(*self.bound_center_local))
+        self.active[slot] = True
+
+    def remove_target(self, target):
+        slot = self.slots.pop(target, None)
+        if slot is None:
+            return
+        self.active[slot] = False
+        self.targets[slot] = None
+        self.free_slots.append(slot)
+
+    def miss(self, ray_count):
+        return RayHits(self, np.zeros(ray_count, dtype=bool), np.zeros(ray_count, dtype=np.int64),
+                       np.zeros(ray_count, dtype=np.int64), np.full(ray_count, np.inf),
+                       np.zeros((ray_count, 3)))
+
+    def cast(self, origins, directions, max_distance=np.inf):
+        """Проверяет лучи (N, 3) против всех активных манекенов"""
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        ray_count = len(origins)
+
+        slots = np.flatnonzero(self.active[:len(self.targets)])
+        if len(slots) == 0 or ray_count == 0:
+            return self.miss(ray_count)
+
+        # Грубая фаза (N, M): луч против описанной сферы манекена
+        oc = origins[:, None, :] - self.bound_center[slots][None]
+        b = np.einsum('nmk,nk->nm', oc, directions)
+        c = np.einsum('nmk,nmk->nm', oc, oc) - self.bound_radius_sq
+        disc = b * b - c
+        candidates = (disc >= 0) & (b <= np.sqrt(np.maximum(disc, 0)))
+        ray_index, candidate = np.nonzero(candidates)
+        if len(ray_index) == 0:
+            return self.miss(ray_count)
+        slot_index = slots[candidate]
+
+        # Точная фаза (K пар): лучи в локальных координатах манекенов
+        rotation = self.rotation[slot_index]
+        local_origin = np.einsum('ki,kij->kj', origins[ray_index], rotation) + self.offset[slot_index]
+        local_dir = np.einsum('ki,kij->kj', directions[ray_index], rotation)
+
+        # Сферы: |o + t*d - c|^2 = r^2, d единичный
+        oc = local_origin[:, None, :] - self.sphere_centers[None]
+        b = np.einsum('ksj,kj->ks', oc, local_dir)
+        c = np.einsum('ksj,ksj->ks', oc, oc) - self.sphere_radii_sq
+        disc = b * b - c
+        root = np.sqrt(np.maximum(disc, 0))
+        sphere_t = np.where((disc >= 0) & (root - b >= 0), np.maximum(-b - root, 0.0), np.inf)
+
+        # Боксы: метод плит
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_dir = 1.0 / local_dir[:, None, :]
+            t1 = (self.box_min[None] - local_origin[:, None, :]) * inv_dir
+            t2 = (self.box_max[None] - local_origin[:, None, :]) * inv_dir
+        t_near = np.nanmax(np.minimum(t1, t2), axis=2)
+        t_exit = np.nanmin(np.maximum(t1, t2), axis=2)
+        box_t = np.where((t_near <= t_exit) & (t_exit >= 0), np.maximum(t_near, 0.0), np.inf)
+
+        # Ближайшая зона в каждой паре, затем ближайшая пара для каждого луча
+        pair_t = np.concatenate([sphere_t, box_t], axis=1)
+        pair_part = np.argmin(pair_t, axis=1)
+        pair_t = pair_t[np.arange(len(pair_t)), pair_part]
+        pair_t = np.where(pair_t <= max_distance, pair_t, np.inf)
+
+        order = np.lexsort((pair_t, ray_index))
+        first = order[np.unique(ray_index[order], return_index=True)[1]]
+
+        distance = np.full(ray_count, np.inf)
+        target_index = np.zeros(ray_count, dtype=np.int64)
+        part_index = np.zeros(ray_count, dtype=np.int64)
+        rays = ray_index[first]
+        distance[rays] = pair_t[first]
+        target_index[rays] = slot_index[first]
+        part_index[rays] = pair_part[first]
+
+        hit = np.isfinite(distance)
+        point = origins + directions * np.where(hit, distance, 0.0)[:, None]
+        return RayHits(self, hit, target_index, part_index, distance, point)
+
+
+if __name__ == "__main__":
+    # Сверка с коллизиями Panda3D на случайных лучах и бенчмарк N x M
+    from panda3d.core import NodePath, CollisionTraverser, CollisionHandlerQueue, CollisionNode
+    from panda3d.core import CollisionRay, BitMask32
+    from hitbox import HitboxTemplate, TARGET_MASK
+    import random
+    import sys
+    import time
+
+    class BenchTarget:
+        def __init__(self, model):
+            self.model = model
+
+    rng = random.Random(0)
+    render = NodePath('render')
+    template = HitboxTemplate()
+    engine = HitEngine(render)
+    targets = []
+    for _ in range(50):
+        model = render.attachNewNode('target_root')
+        model.setPos(rng.uniform(-15, 15), rng.uniform(15, 35), 1)
+        model.lookAt(0, 0, 0)
+        model.setH(model.getH() + 180)
+        template.instance_to(model)
+        target = BenchTarget(model)
+        engine.update_target(target)
+        targets.append(target)
+    by_model = {target.model.node(): target for target in targets}
+
+    traverser = CollisionTraverser('verify')
+    queue = CollisionHandlerQueue()
+    ray = CollisionRay()
+    ray_node = CollisionNode('ray')
+    ray_node.addSolid(ray)
+    ray_node.setFromCollideMask(TARGET_MASK)
+    ray_node.setIntoCollideMask(BitMask32.allOff())
+    traverser.addCollider(render.attachNewNode(ray_node), queue)
+
+    rays = 2000
+    origins = np.array([(rng.uniform(-3, 3), rng.uniform(-3, 3), rng.uniform(0.5, 3.5)) for _ in range(rays)])
+    directions = np.array([(rng.uniform(-0.6, 0.6), 1.0, rng.uniform(-0.15, 0.15)) for _ in range(rays)])
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    result = engine.cast(origins, directions)
+
+    mismatches = 0
+    hits = 0
+    for i in range(rays):
+        ray.setOrigin(Point3(*origins[i]))
+        ray.setDirection(*directions[i])
+        traverser.traverse(render)
+        expected = None
+        if queue.getNumEntries() > 0:
+            queue.sortEntries()
+            entry = queue.getEntry(0)
+            into = entry.getIntoNodePath()
+            expected = (by_model[into.getParent().getParent().node()],
+                        HitboxTemplate.get_zone(entry.getIntoNode()),
+                        entry.getSurfacePoint(render))
+        actual = result.get(i)
+        if expected is None and actual is None:
+            continue
+        hits += 1
+        if expected is None or actual is None or expected[:2] != actual[:2] \
+                or (Point3(*actual[2]) - expected[2]).length() > 1e-2:
+            mismatches += 1
+    print(f"Verified {rays} random rays ({hits} hits) against Panda3D: {mismatches} mismatches")
+
+    print(f"{'rays':>6} {'targets':>8} {'engine ms':>10} {'panda ms':>10}")
+    for ray_count, target_count in ((1, 10), (8, 10), (8, 100), (64, 100), (8, 1000)):
+        render = NodePath('render')
+        engine = HitEngine(render)
+        for _ in range(target_count):
+            model = render.attachNewNode('target_root')
+            model.setPos(rng.uniform(-15, 15), rng.uniform(15, 35), 1)
+            model.lookAt(0, 0, 0)
+            template.instance_to(model)
+            engine.update_target(BenchTarget(model))
+        traverser = CollisionTraverser('bench')
+        queue = CollisionHandlerQueue()
+        ray_np = render.attachNewNode(ray_node)
+        traverser.addCollider(ray_np, queue)
+        origins = np.zeros((ray_count, 3))
+        origins[:, 2] = 1.8
+        directions = np.array([(rng.uniform(-0.3, 0.3), 1.0, rng.uniform(-0.05, 0.05)) for _ in range(ray_count)])
+
+        started = time.perf_counter()
+        for _ in range(50):
+            engine.cast(origins, directions)
+        engine_ms = (time.perf_counter() - started) / 50 * 1000
+
+        started = time.perf_counter()
+        for _ in range(50):
+            for direction in directions:
+                ray.setOrigin(0, 0, 1.8)
+                ray.setDirection(*direction)
+                traverser.traverse(render)
+        panda_ms = (time.perf_counter() - started) / 50 * 1000
+        print(f"{ray_count:>6} {target_count:>8} {engine_ms:>10.3f} {panda_ms:>10.3f}")
+
+    # Расхождение с Panda3D - ошибка в математике пластин или сфер
+    if mismatches:
+        print(f"FAILED: {mismatches} rays differ from Panda3D")
+    sys.exit(1 if mismatches else 0)
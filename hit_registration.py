@@ -0,0 +1,97 @@
+from panda3d.core import CollisionTraverser, CollisionHandlerQueue, CollisionNode, CollisionRay
+from panda3d.core import BitMask32, Point3, Vec3
+from hitbox import HitboxTemplate, TARGET_MASK
+
+
+class HitRecord:
+    """Результат одного выстрела (луча), попавшего в манекен.
+
+    target - объект Target (None, если манекен не из пула), target_np - его
+    корневой узел, zone - HitZone, point - точка попадания в мировых
+    координатах, origin/direction - луч выстрела, time - время кадра
+    выстрела, weapon - имя оружия.
+    """
+
+    def __init__(self, target, target_np, zone, point, distance, origin, direction, time, weapon):
+        self.target = target
+        self.target_np = target_np
+        self.zone = zone
+        self.point = point
+        self.distance = distance
+        self.origin = origin
+        self.direction = direction
+        self.time = time
+        self.weapon = weapon
+
+    def __repr__(self):
+        return f"HitRecord({self.zone!r}, point={self.point}, distance={self.distance:.2f}, weapon={self.weapon!r})"
+
+
+class HitRegistration:
+    """Проверка попаданий по требованию: один луч на выстрел.
+
+    Луч не добавлен в общий self.cTrav и не обходится каждый кадр. Он живет
+    в отдельном траверсере с маской только манекенов (TARGET_MASK), и
+    cast() ставит его ровно в точку и направление выстрела перед обходом.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.traverser = CollisionTraverser('hit_registration')
+        self.queue = CollisionHandlerQueue()
+
+        self.ray = CollisionRay()
+        ray_node = CollisionNode('hit_ray')
+        ray_node.addSolid(self.ray)
+        ray_node.setFromCollideMask(TARGET_MASK)
+        ray_node.setIntoCollideMask(BitMask32.allOff())
+        # Луч в координатах render: origin и direction задаются в мировых
+        self.ray_np = game.render.attachNewNode(ray_node)
+        self.traverser.addCollider(self.ray_np, self.queue)
+
+        self.casts = 0
+
+    def cast(self, origin, direction, weapon=None, max_distance=None):
+        """Пускает луч выстрела и возвращает HitRecord ближайшего попадания или None"""
+        origin = Point3(origin)
+        direction = Vec3(direction)
+        direction.normalize()
+
+        self.ray.setOrigin(origin)
+        self.ray.setDirection(direction)
+        self.traverser.traverse(self.game.render)
+        self.casts += 1
+
+        if self.queue.getNumEntries() == 0:
+            return None
+        self.queue.sortEntries()
+
+        for entry in self.queue.getEntries():
+            zone = HitboxTemplate.get_zone(entry.getIntoNode())
+            if zone is None:
+                continue
+            point = entry.getSurfacePoint(self.game.render)
+            distance = (point - origin).length()
+            if max_distance is not None and distance > max_distance:
+                return None
+            target_np = self.find_target_root(entry.getIntoNodePath())
+            if target_np is None:
+                continue
+            return HitRecord(
+                self.game.target_pool.find(target_np), target_np, zone, point, distance,
+                origin, direction, globalClock.getFrameTime(), weapon
+            )
+        return None
+
+    @staticmethod
+    def find_target_root(node_path):
+        """Поднимается от узла хитбокса до корневого узла манекена"""
+        while not node_path.isEmpty():
+            if node_path.getName() == "target_root":
+                return node_path
+            node_path = node_path.getParent()
+        return None
+
+    def destroy(self):
+        self.traverser.clearColliders()
+        self.ray_np.removeNode()
@@ -0,0 +1,144 @@
+from panda3d.core import NodePath, CollisionNode, CollisionBox, CollisionSphere, BitMask32, Point3
+import copy
+
+# Маска, в которую попадают выстрелы по манекенам
+TARGET_MASK = BitMask32.bit(1)
+
+
+class HitZone:
+    """Зона попадания манекена.
+
+    damage - урон по манекену (Target.take_damage), part - ключ множителя
+    урона оружия в Game.get_damage_for_part.
+    """
+
+    def __init__(self, name, part, damage):
+        self.name = name
+        self.part = part
+        self.damage = damage
+
+    def __repr__(self):
+        return f"HitZone({self.name!r}, {self.part!r}, {self.damage})"
+
+
+# Зоны манекена: имя узла, зона, твердое тело в координатах манекена
+HITBOX_PARTS = [
+    # Голова - мгновенное убийство
+    (HitZone('target_head', 'head', 100), CollisionSphere(0, 0, 2.6, 0.6)),
+    # Тело - средний урон
+    (HitZone('target_body', 'body', 60), CollisionBox(Point3(0, 0, 1.5), 0.7, 0.4, 0.6)),
+    # Руки и ноги - малый урон
+    (HitZone('target_left_arm', 'limb', 40), CollisionBox(Point3(-1.0, 0, 1.5), 0.3, 0.3, 0.6)),
+    (HitZone('target_right_arm', 'limb', 40), CollisionBox(Point3(1.0, 0, 1.5), 0.3, 0.3, 0.6)),
+    (HitZone('target_legs', 'limb', 40), CollisionBox(Point3(0, 0, 0.6), 0.7, 0.4, 1.0)),
+]
+
+
+class HitboxTemplate:
+    """Один набор CollisionNode, общий для всех манекенов.
+
+    Манекен подключает шаблон через instanceTo, поэтому узлы и твердые тела
+    не копируются. Зона попадания хранится на самом CollisionNode (python tag).
+    Включать и выключать коллизии отдельного манекена нужно через stash его
+    экземпляра, а не через маски узлов - маски общие.
+    """
+
+    def __init__(self):
+        self.root = NodePath('target_hitbox')
+        self.parts = []
+        for zone, solid in HITBOX_PARTS:
+            node = CollisionNode(zone.name)
+            node.addSolid(solid)
+            node.setIntoCollideMask(TARGET_MASK)
+            node.setPythonTag('hit_zone', zone)
+            self.parts.append(self.root.attachNewNode(node))
+
+    def instance_to(self, parent):
+        return self.root.instanceTo(parent)
+
+    def set_debug_visible(self, visible):
+        """Показывает твердые тела красным (режим без картинок) или прячет их"""
+        for np in self.parts:
+            if visible:
+                np.show()
+                np.setColor(0.8, 0.2, 0.2, 1)  # Красный цвет, полностью непрозрачный
+                # Настраиваем прозрачность для правильного отображения
+                np.setTransparency(1)
+                np.setBin("transparent", 0)
+                np.setDepthWrite(True)  # Включаем запись в буфер глубины
+            else:
+                np.hide()
+
+    @staticmethod
+    def get_zone(node):
+        """Зона попадания для CollisionNode или None, если это не манекен"""
+        if not node.hasPythonTag('hit_zone'):
+            return None
+        return node.getPythonTag('hit_zone')
+
+
+def build_hitbox_copies(parent):
+    """Старый способ: пять новых CollisionNode на каждый манекен (для сравнения)"""
+    for zone, solid in HITBOX_PARTS:
+        node = CollisionNode(zone.name)
+        node.addSolid(copy.copy(solid))
+        node.setIntoCollideMask(TARGET_MASK)
+        parent.attachNewNode(node)
+
+
+if __name__ == "__main__":
+    # Бенчмарк: память и время обхода коллизий для копий и общего шаблона
+    from panda3d.core import CollisionTraverser, CollisionHandlerQueue, CollisionRay
+    import os
+    import random
+    import time
+
+    def rss_bytes():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return 0
+
+    def build_scene(count, instanced, rng):
+        render = NodePath('render')
+        template = HitboxTemplate() if instanced else None
+        for _ in range(count):
+            model = render.attachNewNode('target_root')
+            model.setPos(rng.uniform(-15, 15), rng.uniform(15, 35), 1)
+            model.lookAt(0, 0, 0)
+            model.setH(model.getH() + 180)
+            if instanced:
+                template.instance_to(model)
+            else:
+                build_hitbox_copies(model)
+        return render, template
+
+    def traversal_ms(render, rays=200):
+        traverser = CollisionTraverser('bench')
+        queue = CollisionHandlerQueue()
+        ray = CollisionRay()
+        ray_node = CollisionNode('ray')
+        ray_node.addSolid(ray)
+        ray_node.setFromCollideMask(TARGET_MASK)
+        ray_node.setIntoCollideMask(BitMask32.allOff())
+        ray_np = render.attachNewNode(ray_node)
+        ray_np.setPos(0, 0, 1.8)
+        traverser.addCollider(ray_np, queue)
+        rng = random.Random(1)
+        started = time.perf_counter()
+        for _ in range(rays):
+            ray.setDirection(rng.uniform(-0.5, 0.5), 1, rng.uniform(-0.05, 0.05))
+            traverser.traverse(render)
+        return (time.perf_counter() - started) / rays * 1000
+
+    print(f"{'targets':>8} {'mode':>10} {'coll nodes':>11} {'rss MB':>8} {'traverse ms':>12}")
+    for count in (100, 1000, 5000):
+        for instanced in (False, True):
+            rss_before = rss_bytes()
+            render, template = build_scene(count, instanced, random.Random(0))
+            rss_after = rss_bytes()
+            unique = len(HITBOX_PARTS) if instanced else count * len(HITBOX_PARTS)
+            mode = "instanced" if instanced else "copies"
+            print(f"{count:>8} {mode:>10} {unique:>11} {(rss_after - rss_before) / 1e6:>8.2f} {traversal_ms(render):>12.3f}")
+            render.removeNode()
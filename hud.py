@@ -0,0 +1,191 @@
+import time
+
+
+class HudField:
+    """Одна строка HUD: текст, формат, частота обновления и кэш значений"""
+
+    def __init__(self, text, fmt, source=None, interval=0.0):
+        self.text = text
+        self.fmt = fmt
+        self.source = source
+        self.interval = interval
+        self.values = None
+        self.string = None
+        self.next_refresh = 0.0
+
+    def format(self, values):
+        if callable(self.fmt):
+            return self.fmt(*values)
+        return self.fmt.format(*values)
+
+
+class Hud:
+    """Текстовый HUD, который перегенерирует текст только при изменении строки.
+
+    Поле с source опрашивается задачей hud не чаще своего interval (например,
+    FPS 4 раза в секунду). Поле без source получает значения через set() в
+    момент события (счет, таймер). В обоих случаях строка форматируется,
+    только если изменились значения, а setText вызывается, только если
+    изменилась сама строка. Время работы HUD за кадр копится для отладки.
+    """
+
+    def __init__(self, task_mgr, window=120):
+        self.task_mgr = task_mgr
+        self.fields = {}
+        self.window = window
+
+        self.frame_costs = []
+        self.frame_cost = 0.0
+        self.max_frame_cost = 0.0
+        self.text_updates = 0
+        self.skipped = 0
+        self.task = None
+
+    def start(self):
+        """Запускает опрос полей (после update и шагов симуляции, чтобы показывать значения этого кадра)"""
+        if self.task is None:
+            self.invalidate()
+            self.task = self.task_mgr.add(self.update, 'hud', sort=2)
+
+    def stop(self):
+        if self.task is not None:
+            self.task_mgr.remove(self.task)
+            self.task = None
+
+    def add_field(self, name, text, fmt, source=None, rate=None):
+        """Регистрирует поле; rate - сколько раз в секунду опрашивать source"""
+        interval = 1.0 / rate if rate else 0.0
+        self.fields[name] = HudField(text, fmt, source, interval)
+
+    def set(self, name, *values):
+        """Передает новые значения поля (обновление по событию)"""
+        started = time.perf_counter()
+        self.apply(self.fields[name], values)
+        self.frame_cost += time.perf_counter() - started
+
+    def apply(self, field, values):
+        if values == field.values:
+            self.skipped += 1
+            return
+        field.values = values
+        string = field.format(values)
+        if string == field.string:
+            self.skipped += 1
+            return
+        field.string = string
+        field.text.setText(string)
+        self.text_updates += 1
+
+    def invalidate(self, name=None):
+        """Сбрасывает кэш, чтобы поле обновилось на ближайшем кадре"""
+        fields = [self.fields[name]] if name else self.fields.values()
+        for field in fields:
+            field.values = None
+            field.next_refresh = 0.0
+
+    def update(self, task):
+        started = time.perf_counter()
+        # HUD обновляется по реальному времени, замедление его не тянет
+        now = globalClock.getRealTime()
+        for field in self.fields.values():
+            if field.source is None or now < field.next_refresh:
+                continue
+            # Скрытые поля не опрашиваем
+            if field.text.isHidden():
+                continue
+            field.next_refresh = now + field.interval
+            self.apply(field, field.source())
+
+        self.frame_cost += time.perf_counter() - started
+        self.frame_costs.append(self.frame_cost)
+        if len(self.frame_costs) > self.window:
+            self.frame_costs.pop(0)
+        self.max_frame_cost = max(self.max_frame_cost, self.frame_cost)
+        self.frame_cost = 0.0
+        return task.cont
+
+    def get_average_ms(self):
+        if not self.frame_costs:
+            return 0.0
+        return sum(self.frame_costs) / len(self.frame_costs) * 1000
+
+    def get_max_ms(self):
+        return self.max_frame_cost * 1000
+
+    def get_stats(self):
+        return {
+            'fields': len(self.fields),
+            'avg_frame_ms': self.get_average_ms(),
+            'max_frame_ms': self.get_max_ms(),
+            'text_updates': self.text_updates,
+            'skipped': self.skipped
+        }
+
+    def destroy(self):
+        self.stop()
+        self.fields.clear()
+
+
+if __name__ == "__main__":
+    # Бенчмарк: setText всех полей каждый кадр против кэшированного HUD
+    from panda3d.core import loadPrcFileData, TextNode
+    loadPrcFileData('', 'window-type offscreen\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+    from direct.gui.OnscreenText import OnscreenText
+    import math
+
+    base = ShowBase()
+    frames = 600
+
+    def make_text(y):
+        return OnscreenText(text="", style=1, fg=(1, 1, 1, 1), pos=(-1.3, y), align=TextNode.ALeft, scale=.05)
+
+    # Игрок ходит по кругу, FPS слегка плавает, счет растет раз в секунду
+    state = {'frame': 0}
+
+    def fps():
+        return (int(60 + 3 * math.sin(state['frame'] * 0.1)),)
+
+    def pos():
+        t = state['frame'] / 60
+        return (10 * math.cos(t), 10 * math.sin(t), 1.8)
+
+    def speed():
+        return (5.0 + math.sin(state['frame'] / 30),)
+
+    def score():
+        return (state['frame'] // 60 * 100,)
+
+    def collisions():
+        return (0.12 + 0.01 * math.sin(state['frame']), 0.4)
+
+    sources = [("FPS: {}", fps, 4), ("Pos: ({:.1f}, {:.1f}, {:.1f})", pos, 10),
+               ("Speed: {:.1f}", speed, 10), ("Score: {}", score, None),
+               ("Collisions: {:.3f} ms (max {:.3f})", collisions, 2)]
+    texts = [make_text(0.95 - i * 0.1) for i in range(len(sources))]
+
+    def run(naive):
+        """Полное время кадра (мс) с рендером: текст перегенерируется при отрисовке"""
+        total = 0.0
+        for frame in range(frames):
+            state['frame'] = frame
+            started = time.perf_counter()
+            if naive:
+                for text, (fmt, source, _) in zip(texts, sources):
+                    text.setText(fmt.format(*source()))
+            base.taskMgr.step()
+            total += time.perf_counter() - started
+            # Частота опроса считается по реальному времени - держим темп 60 FPS
+            time.sleep(1 / 60)
+        return total / frames * 1000
+
+    naive_ms = run(True)
+    hud = Hud(base.taskMgr, window=frames)
+    for i, (text, (fmt, source, rate)) in enumerate(zip(texts, sources)):
+        hud.add_field(i, text, fmt, source, rate)
+    hud.start()
+    hud_ms = run(False)
+
+    print(f"setText every frame: {naive_ms:.3f} ms/frame, {frames * len(texts)} text regenerations")
+    print(f"Hud:                 {hud_ms:.3f} ms/frame, HUD task {hud.get_average_ms():.4f} ms/frame, "
+          f"stats {hud.get_stats()}")
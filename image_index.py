@@ -0,0 +1,141 @@
+from panda3d.core import Filename
+import os
+import random
+import time
+
+
+class CategoryImageIndex:
+    """Индекс изображений категорий манекенов в памяти.
+
+    Каталог категории сканируется один раз, дальше список берется из памяти.
+    Не чаще раза в check_interval секунд сверяется mtime каталога: если файлы
+    добавили или удалили, индекс категории перестраивается.
+    """
+
+    VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+    def __init__(self, base_path, check_interval=1.0):
+        self.base_path = base_path
+        self.check_interval = check_interval
+        # Категория -> {'path', 'os_path', 'mtime', 'images', 'checked_at'}
+        self.entries = {}
+        self.scan_count = 0
+
+    def resolve_category_path(self, category):
+        """Возвращает (путь Panda3D, путь ОС) каталога категории или None"""
+        category_path = f"{self.base_path}/images/nsfw/{category}"
+        os_path = Filename(category_path).toOsSpecific()
+        if os.path.isdir(os_path):
+            return category_path, os_path
+
+        # Попробуем поискать в родительской директории
+        parent_path = os.path.dirname(os.path.dirname(self.base_path))
+        category_path = f"{parent_path}/images/nsfw/{category}"
+        os_path = Filename(category_path).toOsSpecific()
+        if os.path.isdir(os_path):
+            return category_path, os_path
+
+        print(f"Путь к категории не существует: {category}")
+        return None
+
+    def scan(self, category):
+        """Полностью перечитывает каталог категории"""
+        self.scan_count += 1
+        entry = {
+            'path': None,
+            'os_path': None,
+            'mtime': None,
+            'images': [],
+            'checked_at': time.monotonic()
+        }
+        self.entries[category] = entry
+
+        resolved = self.resolve_category_path(category)
+        if not resolved:
+            return entry
+        category_path, os_path = resolved
+        entry['path'] = category_path
+        entry['os_path'] = os_path
+
+        try:
+            entry['mtime'] = os.stat(os_path).st_mtime_ns
+            files = sorted(os.listdir(os_path))
+        except OSError as e:
+            print(f"Ошибка при чтении директории {category_path}: {e}")
+            return entry
+
+        entry['images'] = [
+            f"{category_path}/{file}" for file in files
+            if file.lower().endswith(self.VALID_EXTENSIONS)
+        ]
+        print(f"Проиндексировано {len(entry['images'])} изображений в категории {category}")
+        return entry
+
+    def is_stale(self, entry):
+        """Проверяет mtime каталога, если прошел интервал проверки"""
+        now = time.monotonic()
+        if now - entry['checked_at'] < self.check_interval:
+            return False
+        entry['checked_at'] = now
+
+        if entry['os_path'] is None:
+            # Каталога не было - возможно, его уже создали
+            return True
+        try:
+            return os.stat(entry['os_path']).st_mtime_ns != entry['mtime']
+        except OSError:
+            return True
+
+    def get_images(self, category):
+        """Возвращает список изображений категории (не изменять снаружи)"""
+        entry = self.entries.get(category)
+        if entry is None or self.is_stale(entry):
+            entry = self.scan(category)
+        return entry['images']
+
+    def random_image(self, category, rng=random):
+        """Случайное изображение категории за O(1) или None"""
+        images = self.get_images(category)
+        if not images:
+            return None
+        return images[rng.randrange(len(images))]
+
+    def invalidate(self, category=None):
+        """Сбрасывает индекс одной категории или всех сразу"""
+        if category is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(category, None)
+
+
+def scan_directory(os_path):
+    """Старый способ: листинг каталога на каждый спавн (для сравнения)"""
+    return [
+        file for file in os.listdir(os_path)
+        if file.lower().endswith(CategoryImageIndex.VALID_EXTENSIONS)
+    ]
+
+
+if __name__ == "__main__":
+    # Бенчмарк: стоимость выбора картинки на спавн в зависимости от числа файлов
+    import tempfile
+    import timeit
+
+    spawns = 2000
+    print(f"{'files':>8} {'scan us/spawn':>15} {'index us/spawn':>15}")
+    for file_count in (10, 100, 1000, 10000):
+        with tempfile.TemporaryDirectory() as tmp:
+            category_dir = os.path.join(tmp, "images", "nsfw", "bench")
+            os.makedirs(category_dir)
+            for i in range(file_count):
+                open(os.path.join(category_dir, f"target{i}.png"), 'wb').close()
+
+            index = CategoryImageIndex(Filename.fromOsSpecific(tmp).getFullpath())
+            index.get_images("bench")
+
+            scan_time = timeit.timeit(
+                lambda: random.choice(scan_directory(category_dir)), number=spawns)
+            index_time = timeit.timeit(
+                lambda: index.random_image("bench"), number=spawns)
+
+            print(f"{file_count:>8} {scan_time / spawns * 1e6:>15.2f} {index_time / spawns * 1e6:>15.2f}")
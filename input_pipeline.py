@@ -0,0 +1,270 @@
+from panda3d.core import WindowProperties
+import numpy as np
+
+
+class InputPipeline:
+    """Единственная стадия ввода мыши, первая в кадре.
+
+    Задача input_pipeline идет сразу после dataLoop (sort -50), который
+    переносит события окна в MouseWatcher. Из trail log берутся все
+    события указателя с прошлого кадра (а не одна позиция на кадр), каждое
+    ровно один раз - по номеру последовательности. Смещения суммируются,
+    чувствительность применяется один раз, камера поворачивается, курсор
+    возвращается в центр. Для каждого события копится задержка от его
+    времени до поворота камеры.
+    """
+
+    def __init__(self, game, window=2000, trail_duration=0.5):
+        self.game = game
+        self.mouse_watcher = game.mouseWatcherNode
+        self.trail_duration = trail_duration
+        self.task = None
+
+        # Последнее обработанное событие и позиция, от которой считается смещение
+        self.last_sequence = -1
+        self.last_pos = None
+
+        # Кольцевые буферы задержек (с) и числа событий за кадр
+        self.latencies = np.zeros(window)
+        self.latency_count = 0
+        self.frame_samples = np.zeros(240, dtype=np.int32)
+        self.frame_count = 0
+        self.total_samples = 0
+        self.skipped_samples = 0
+        self.fallback_frames = 0
+
+        self.has_trail = False
+        if self.mouse_watcher is not None and hasattr(game.win, 'enablePointerEvents'):
+            # Окно отдает все события указателя, MouseWatcher хранит их в trail log
+            game.win.enablePointerEvents(0)
+            self.mouse_watcher.setTrailLogDuration(trail_duration)
+            self.has_trail = True
+
+    def start(self):
+        if self.task is None:
+            self.recenter(*self.get_window_size())
+            self.task = self.game.taskMgr.add(self.update, 'input_pipeline', sort=-49)
+
+    def stop(self):
+        if self.task is not None:
+            self.game.taskMgr.remove(self.task)
+            self.task = None
+
+    def get_window_size(self):
+        props = self.game.win.getProperties()
+        return props.getXSize(), props.getYSize()
+
+    def recenter(self, width, height):
+        center = (width // 2, height // 2)
+        self.game.win.movePointer(0, center[0], center[1])
+        self.last_pos = center
+
+    def read_samples(self):
+        """Новые события указателя: список (dx, dy, время) в пикселях"""
+        trail = self.mouse_watcher.getTrailLog()
+        samples = []
+        last_x, last_y = self.last_pos
+        for i in range(trail.getNumEvents()):
+            sequence = trail.getSequence(i)
+            if sequence <= self.last_sequence:
+                continue
+            self.last_sequence = sequence
+            if not trail.getInWindow(i):
+                self.skipped_samples += 1
+                continue
+            x, y = trail.getXpos(i), trail.getYpos(i)
+            # Событие от movePointer (или без движения) ничего не поворачивает
+            if x == last_x and y == last_y:
+                continue
+            samples.append((x - last_x, y - last_y, trail.getTime(i)))
+            last_x, last_y = x, y
+        return samples
+
+    def read_pointer(self, now):
+        """Запасной путь без trail log: одна позиция указателя за кадр"""
+        pointer = self.game.win.getPointer(0)
+        self.fallback_frames += 1
+        return [(pointer.getX() - self.last_pos[0], pointer.getY() - self.last_pos[1], now)]
+
+    def update(self, task):
+        now = globalClock.getRealTime()
+        width, height = self.get_window_size()
+        samples = self.read_samples() if self.has_trail else self.read_pointer(now)
+
+        if samples:
+            delta_x = sum(sample[0] for sample in samples)
+            delta_y = sum(sample[1] for sample in samples)
+            # Пиксели в доли половины окна, как у MouseWatcher, и один раз чувствительность
+            sensitivity = self.game.get_look_sensitivity()
+            self.game.apply_look_delta(-delta_x / (width / 2) * sensitivity,
+                                       -delta_y / (height / 2) * sensitivity)
+
+            applied = globalClock.getRealTime()
+            window = len(self.latencies)
+            for _, _, sample_time in samples:
+                self.latencies[self.latency_count % window] = applied - sample_time
+                self.latency_count += 1
+            self.total_samples += len(samples)
+
+        self.frame_samples[self.frame_count % len(self.frame_samples)] = len(samples)
+        self.frame_count += 1
+        self.recenter(width, height)
+        return task.cont
+
+    def get_latency_percentiles(self):
+        """Задержка от события мыши до поворота камеры, мс"""
+        filled = self.latencies[:min(self.latency_count, len(self.latencies))]
+        if not len(filled):
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        p50, p95, p99 = np.percentile(filled, (50, 95, 99)) * 1000
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+    def get_stats(self):
+        filled = self.frame_samples[:min(self.frame_count, len(self.frame_samples))]
+        stats = {
+            'samples': self.total_samples,
+            'avg_samples_per_frame': float(filled.mean()) if len(filled) else 0.0,
+            'max_samples_per_frame': int(filled.max()) if len(filled) else 0,
+            'skipped': self.skipped_samples,
+            'fallback_frames': self.fallback_frames
+        }
+        stats.update(self.get_latency_percentiles())
+        return stats
+
+    def destroy(self):
+        self.stop()
+        if self.has_trail:
+            self.mouse_watcher.clearTrailLog()
+
+
+if __name__ == "__main__":
+    # Проверка на синтетической мыши 1000 Гц: при любой частоте кадров каждое событие
+    # учитывается ровно один раз (итоговый поворот совпадает с ожидаемым), а задержка
+    # считается для каждого события, а не только для последней позиции кадра.
+    import random
+
+    class FakeTrail:
+        def __init__(self):
+            self.events = []
+
+        def getNumEvents(self):
+            return len(self.events)
+
+        def getSequence(self, i):
+            return self.events[i][0]
+
+        def getInWindow(self, i):
+            return True
+
+        def getXpos(self, i):
+            return self.events[i][1]
+
+        def getYpos(self, i):
+            return self.events[i][2]
+
+        def getTime(self, i):
+            return self.events[i][3]
+
+    class FakeMouse:
+        """Указатель, который двигается событиями 1000 Гц и переставляется movePointer"""
+
+        def __init__(self):
+            self.trail = FakeTrail()
+            self.x, self.y = 400, 300
+            self.sequence = 0
+
+        def move(self, dx, dy, time):
+            self.x += dx
+            self.y += dy
+            self.sequence += 1
+            self.trail.events.append((self.sequence, self.x, self.y, time))
+            self.trail.events = self.trail.events[-500:]
+
+        def getTrailLog(self):
+            return self.trail
+
+    class FakePointer:
+        def __init__(self, mouse):
+            self.mouse = mouse
+
+        def getX(self):
+            return self.mouse.x
+
+        def getY(self):
+            return self.mouse.y
+
+    class FakeWindow:
+        def __init__(self, mouse):
+            self.mouse = mouse
+
+        def getProperties(self):
+            props = WindowProperties()
+            props.setSize(800, 600)
+            return props
+
+        def movePointer(self, device, x, y):
+            self.mouse.x, self.mouse.y = x, y
+            return True
+
+        def getPointer(self, device):
+            return FakePointer(self.mouse)
+
+    class FakeClock:
+        def __init__(self):
+            self.time = 0.0
+
+        def getRealTime(self):
+            return self.time
+
+    class FakeGame:
+        def __init__(self, trail):
+            self.mouse = FakeMouse()
+            self.mouseWatcherNode = self.mouse
+            self.win = FakeWindow(self.mouse)
+            self.camera_heading = 0.0
+            self.camera_pitch = 0.0
+            if not trail:
+                self.mouseWatcherNode = None
+
+        def get_look_sensitivity(self):
+            return 50.0
+
+        def apply_look_delta(self, delta_heading, delta_pitch):
+            self.camera_heading += delta_heading
+            self.camera_pitch = min(89, max(-89, self.camera_pitch + delta_pitch))
+
+    class FakeTask:
+        cont = 1
+
+    import builtins
+    clock = FakeClock()
+    builtins.globalClock = clock
+
+    def run(fps, trail, seconds=2.0, poll_hz=1000):
+        rng = random.Random(fps)
+        game = FakeGame(trail)
+        pipeline = InputPipeline(game)
+        pipeline.has_trail = trail
+        pipeline.recenter(800, 600)
+        moved_x = 0
+        frame_time = 1 / fps
+        next_frame = frame_time
+        for i in range(int(seconds * poll_hz)):
+            clock.time = i / poll_hz
+            dx = rng.choice((1, 2, 3))
+            moved_x += dx
+            game.mouse.move(dx, 0, clock.time)
+            if clock.time >= next_frame:
+                pipeline.update(FakeTask)
+                next_frame += frame_time
+        pipeline.update(FakeTask)
+        expected = -moved_x / 400 * 50.0
+        return game.camera_heading, expected, pipeline
+
+    print(f"{'fps':>5} {'path':>8} {'heading':>10} {'expected':>10} {'samples/frame':>14} {'p50 ms':>7} {'p99 ms':>7}")
+    for fps in (60, 144, 240):
+        for trail in (False, True):
+            heading, expected, pipeline = run(fps, trail)
+            stats = pipeline.get_stats()
+            print(f"{fps:>5} {'trail' if trail else 'pointer':>8} {heading:>10.3f} {expected:>10.3f} "
+                  f"{stats['avg_samples_per_frame']:>14.2f} {stats['p50']:>7.2f} {stats['p99']:>7.2f}")
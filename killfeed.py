@@ -0,0 +1,327 @@
+from panda3d.core import GeomVertexData, GeomVertexFormat, GeomVertexWriter, GeomTriangles, Geom, GeomNode
+from panda3d.core import TextNode, TransparencyAttrib
+
+# Рамка сообщения в координатах записи: фон и четыре границы
+FRAME_LEFT, FRAME_RIGHT = -0.5, 0.05
+FRAME_BOTTOM, FRAME_TOP = -0.015, 0.025
+BORDER_THICKNESS = 0.002
+BACKGROUND_COLOR = (0, 0, 0, 0.3)
+BORDER_COLOR = (1, 1, 1, 0.8)
+
+
+def make_frame_geom():
+    """Фон и границы записи одним Geom (цвета в вершинах)"""
+    quads = [
+        ((FRAME_LEFT, FRAME_RIGHT, FRAME_BOTTOM, FRAME_TOP), BACKGROUND_COLOR),
+        ((FRAME_LEFT, FRAME_RIGHT, FRAME_TOP, FRAME_TOP + BORDER_THICKNESS), BORDER_COLOR),
+        ((FRAME_LEFT, FRAME_RIGHT, FRAME_BOTTOM - BORDER_THICKNESS, FRAME_BOTTOM), BORDER_COLOR),
+        ((FRAME_LEFT - BORDER_THICKNESS, FRAME_LEFT, FRAME_BOTTOM, FRAME_TOP), BORDER_COLOR),
+        ((FRAME_RIGHT, FRAME_RIGHT + BORDER_THICKNESS, FRAME_BOTTOM, FRAME_TOP), BORDER_COLOR),
+    ]
+    vdata = GeomVertexData('killfeed_frame', GeomVertexFormat.getV3c4(), Geom.UHStatic)
+    vdata.uncleanSetNumRows(len(quads) * 4)
+    vertex = GeomVertexWriter(vdata, 'vertex')
+    color = GeomVertexWriter(vdata, 'color')
+    triangles = GeomTriangles(Geom.UHStatic)
+    for i, ((left, right, bottom, top), rgba) in enumerate(quads):
+        for x, z in ((left, bottom), (right, bottom), (right, top), (left, top)):
+            vertex.addData3(x, 0, z)
+            color.addData4(*rgba)
+        # Фон идет первым, поэтому границы рисуются поверх него
+        triangles.addVertices(i * 4, i * 4 + 1, i * 4 + 2)
+        triangles.addVertices(i * 4, i * 4 + 2, i * 4 + 3)
+    geom = Geom(vdata)
+    geom.addPrimitive(triangles)
+    node = GeomNode('killfeed_frame')
+    node.addGeom(geom)
+    return node
+
+
+class Killfeed:
+    """Килфид, который работает только пока что-то анимируется.
+
+    Каждая запись - один узел: текст и рамка, где рамка (фон и границы)
+    это один общий Geom, подключенный ко всем записям. Прозрачность всей
+    записи меняется одним setAlphaScale. Задача killfeed_update живет, только
+    пока записи выезжают или растворяются; окончание показа будит ее через
+    один doMethodLater на ближайшую запись. Узлы записей переиспользуются.
+    """
+
+    def __init__(self, parent, task_mgr, max_entries=5, duration=5.0, fade_time=0.3,
+                 slide_distance=0.2, x=1.3, top=0.9, spacing=0.06):
+        self.task_mgr = task_mgr
+        self.max_entries = max_entries
+        self.duration = duration
+        self.fade_time = fade_time
+        self.slide_distance = slide_distance
+        self.x = x
+        self.top = top
+        self.spacing = spacing
+
+        self.root = parent.attachNewNode('killfeed')
+        self.frame_geom = make_frame_geom()
+        self.entries = []
+        # Свободные узлы записей для повторного использования
+        self.free_nodes = []
+
+        self.update_task = None
+        self.expire_task = None
+        # Сколько кадров килфид что-то делал (для бенчмарка и отладки)
+        self.active_frames = 0
+
+    def create_node(self):
+        entry_np = self.root.attachNewNode('killfeed_entry')
+        entry_np.setTransparency(TransparencyAttrib.MAlpha)
+
+        frame_np = entry_np.attachNewNode(self.frame_geom)
+        frame_np.setBin('background', 10)
+
+        text_node = TextNode('killfeed_text')
+        text_node.setAlign(TextNode.ARight)
+        text_node.setTextColor(0.3, 0.6, 1, 1)
+        text_node.setShadow(0.04, 0.04)
+        text_node.setShadowColor(0, 0, 0, 1)
+        text_np = entry_np.attachNewNode(text_node)
+        text_np.setScale(0.04)
+        text_np.setBin('gui-popup', 0)
+        return entry_np
+
+    def add(self, text, now=None):
+        """Добавляет сообщение сверху-вниз, самое старое уходит при переполнении"""
+        if now is None:
+            now = globalClock.getFrameTime()
+        entry_np = self.free_nodes.pop() if self.free_nodes else self.create_node()
+        entry_np.find('killfeed_text').node().setText(text)
+        entry_np.setAlphaScale(0)
+        entry_np.unstash()
+
+        entry = {
+            'np': entry_np,
+            'creation_time': now,
+            'y_pos': self.top - len(self.entries) * self.spacing,
+            'x_offset': self.slide_distance,
+            'alpha': 0.0,
+            'target_alpha': 1.0
+        }
+        entry_np.setPos(self.x + entry['x_offset'], 0, entry['y_pos'])
+        self.entries.append(entry)
+
+        # Лишние записи растворяются, а при очень частых убийствах удаляются сразу
+        showing = [e for e in self.entries if e['target_alpha'] > 0]
+        if len(showing) > self.max_entries:
+            showing[0]['target_alpha'] = 0.0
+        while len(self.entries) > self.max_entries * 2:
+            self.release(self.entries[0])
+        self.wake()
+
+    def wake(self):
+        """Запускает задачу анимации, если она не идет"""
+        if self.update_task is None:
+            self.update_task = self.task_mgr.add(self.update, 'killfeed_update')
+
+    def release(self, entry):
+        self.entries.remove(entry)
+        entry['np'].stash()
+        self.free_nodes.append(entry['np'])
+
+    def update(self, task):
+        """Анимирует записи; снимает себя, когда анимировать нечего"""
+        now = globalClock.getFrameTime()
+        dt = globalClock.getDt()
+        self.active_frames += 1
+        animating = False
+
+        for entry in list(self.entries):
+            entry_np = entry['np']
+
+            # Окончание показа
+            if entry['target_alpha'] > 0 and now - entry['creation_time'] > self.duration:
+                entry['target_alpha'] = 0.0
+
+            if entry['alpha'] != entry['target_alpha']:
+                step = dt / self.fade_time
+                if entry['target_alpha'] > entry['alpha']:
+                    entry['alpha'] = min(entry['target_alpha'], entry['alpha'] + step)
+                else:
+                    entry['alpha'] = max(entry['target_alpha'], entry['alpha'] - step)
+                entry_np.setAlphaScale(entry['alpha'])
+                animating = True
+
+            # И запись, убранная еще до появления (несколько убийств за кадр)
+            if entry['alpha'] <= 0 and entry['target_alpha'] == 0:
+                self.release(entry)
+                continue
+
+            if entry['x_offset'] > 0:
+                slide_speed = self.slide_distance / self.fade_time
+                entry['x_offset'] = max(0.0, entry['x_offset'] - slide_speed * dt)
+                entry_np.setX(self.x + entry['x_offset'])
+                animating = True
+
+        # Записи сдвигаются вверх на место удаленных
+        for i, entry in enumerate(self.entries):
+            target_y = self.top - i * self.spacing
+            if entry['y_pos'] != target_y:
+                entry['y_pos'] = target_y
+                entry['np'].setZ(target_y)
+
+        if animating:
+            return task.cont
+        self.update_task = None
+        self.schedule_expire(now)
+        return task.done
+
+    def schedule_expire(self, now):
+        """Ставит таймер на ближайшее окончание показа"""
+        if self.expire_task:
+            self.task_mgr.remove(self.expire_task)
+            self.expire_task = None
+        expire_times = [e['creation_time'] + self.duration for e in self.entries if e['target_alpha'] > 0]
+        if expire_times:
+            # Чуть позже срока, чтобы сравнение в update уже сработало
+            delay = max(0.0, min(expire_times) - now) + 0.001
+            self.expire_task = self.task_mgr.doMethodLater(delay, self.on_expire, 'killfeed_expire')
+
+    def on_expire(self, task):
+        self.expire_task = None
+        self.wake()
+        return task.done
+
+    def is_idle(self):
+        return self.update_task is None
+
+    def clear(self):
+        for entry in list(self.entries):
+            self.release(entry)
+        if self.update_task:
+            self.task_mgr.remove(self.update_task)
+            self.update_task = None
+        if self.expire_task:
+            self.task_mgr.remove(self.expire_task)
+            self.expire_task = None
+
+    def destroy(self):
+        self.clear()
+        self.root.removeNode()
+        self.free_nodes = []
+
+
+if __name__ == "__main__":
+    # Бенчмарк: минутная сессия с частыми убийствами, старый килфид против нового
+    from panda3d.core import loadPrcFileData, ClockObject, CardMaker
+    loadPrcFileData('', 'window-type none\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+    from direct.gui.OnscreenText import OnscreenText
+    import time
+
+    base = ShowBase()
+    globalClock.setMode(ClockObject.MNonRealTime)
+    globalClock.setFrameRate(60)
+
+    class OldKillfeed:
+        """Сокращенная копия прежних create_killfeed_message/update_killfeed_positions"""
+
+        def __init__(self):
+            self.messages = []
+
+        def add(self, text):
+            y_pos = 0.9 - len(self.messages) * 0.06
+            x_pos = 1.5
+            message = OnscreenText(text=text, fg=(0.3, 0.6, 1, 0), shadow=(0, 0, 0, 0), pos=(x_pos, y_pos),
+                                   align=TextNode.ARight, scale=0.04)
+            message.setBin('gui-popup', 0)
+            frame_root = base.aspect2d.attachNewNode("frame_root")
+            frame_root.setPos(x_pos, 0, y_pos)
+            cm = CardMaker('killfeed_bg')
+            cm.setFrame(-0.5, 0.05, -0.015, 0.025)
+            bg = frame_root.attachNewNode(cm.generate())
+            bg.setTransparency(TransparencyAttrib.MAlpha)
+            bg.setColor(0, 0, 0, 0)
+            borders = []
+            for frame in ((-0.5, 0.05, 0.025, 0.027), (-0.5, 0.05, -0.017, -0.015),
+                          (-0.502, -0.5, -0.015, 0.025), (0.05, 0.052, -0.015, 0.025)):
+                cm_border = CardMaker('border')
+                cm_border.setFrame(*frame)
+                border = frame_root.attachNewNode(cm_border.generate())
+                border.setColor(1, 1, 1, 0)
+                border.setTransparency(TransparencyAttrib.MAlpha)
+                borders.append(border)
+            self.messages.append({'message': message, 'frame_root': frame_root, 'background': bg,
+                                  'borders': borders, 'creation_time': globalClock.getFrameTime(),
+                                  'y_pos': y_pos, 'x_pos': x_pos, 'alpha': 0, 'target_alpha': 1,
+                                  'x_offset': 0.2})
+            if len(self.messages) > 5:
+                self.messages[0]['target_alpha'] = 0
+
+        def update(self):
+            current_time = globalClock.getFrameTime()
+            dt = globalClock.getDt()
+            to_remove = []
+            for i, msg in enumerate(self.messages):
+                if msg['alpha'] != msg['target_alpha']:
+                    change = dt / 0.3
+                    if msg['target_alpha'] > msg['alpha']:
+                        msg['alpha'] = min(msg['target_alpha'], msg['alpha'] + change)
+                    else:
+                        msg['alpha'] = max(msg['target_alpha'], msg['alpha'] - change)
+                    msg['message'].setFg((0.3, 0.6, 1, msg['alpha']))
+                    msg['message'].setShadow((0, 0, 0, msg['alpha']))
+                    msg['background'].setColor(0, 0, 0, msg['alpha'] * 0.3)
+                    for border in msg['borders']:
+                        border.setColor(1, 1, 1, msg['alpha'] * 0.8)
+                if msg['x_offset'] > 0:
+                    msg['x_offset'] = max(0, msg['x_offset'] - 0.2 / 0.3 * dt)
+                    msg['x_pos'] = 1.3 + msg['x_offset']
+                    msg['message'].setPos(msg['x_pos'], msg['y_pos'])
+                    msg['frame_root'].setPos(msg['x_pos'], 0, msg['y_pos'])
+                if current_time - msg['creation_time'] > 5.0 and msg['target_alpha'] == 1:
+                    msg['target_alpha'] = 0
+                if msg['alpha'] <= 0 and msg['target_alpha'] == 0:
+                    to_remove.append(msg)
+                target_y = 0.9 - i * 0.06
+                if msg['y_pos'] != target_y:
+                    msg['y_pos'] = target_y
+                    msg['message'].setPos(msg['x_pos'], target_y)
+                    msg['frame_root'].setPos(msg['x_pos'], 0, target_y)
+            for msg in to_remove:
+                msg['message'].removeNode()
+                msg['frame_root'].removeNode()
+                self.messages.remove(msg)
+
+    def session(kill_frames, frames, use_new):
+        """Время килфида за кадр (мс): среднее и максимум"""
+        feed = Killfeed(base.aspect2d, base.taskMgr) if use_new else OldKillfeed()
+        kill_frames = set(kill_frames)
+        total = 0.0
+        longest = 0.0
+        for frame in range(frames):
+            started = time.perf_counter()
+            if frame in kill_frames:
+                feed.add("You killed Training Bot")
+            if not use_new:
+                feed.update()
+            base.taskMgr.step()
+            elapsed = time.perf_counter() - started
+            total += elapsed
+            longest = max(longest, elapsed)
+        if use_new:
+            extra = f", active {feed.active_frames}/{frames} frames, nodes created {len(feed.free_nodes) + len(feed.entries)}"
+            feed.destroy()
+        else:
+            extra = ""
+            for msg in feed.messages:
+                msg['message'].removeNode()
+                msg['frame_root'].removeNode()
+        return f"{total / frames * 1000:.3f} ms/frame (max {longest * 1000:.2f}){extra}"
+
+    # Минута игры на 60 FPS: серии убийств дробовиком, редкие одиночные и поток без пауз
+    frames = 3600
+    patterns = {
+        'bursts': [f for start in range(0, frames, 600) for f in range(start, start + 40, 4)],
+        'steady': list(range(0, frames, 90)),
+        'spam': list(range(0, frames, 3)),
+    }
+    for name, kills in patterns.items():
+        print(f"{name} ({len(kills)} kills)")
+        print(f"  old: {session(kills, frames, False)}")
+        print(f"  new: {session(kills, frames, True)}")
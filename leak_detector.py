@@ -0,0 +1,200 @@
+import gc
+import json
+import os
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class LeakDetector:
+    """Следит за ростом сцены, задач и объектов Python за долгую сессию.
+
+    Раз в interval секунд игрового времени снимается выборка: число узлов
+    под render, aspect2d и bullet_traces, число живых задач по имени и
+    объектов Python по типу. Метрика считается утечкой, если после
+    прогрева она почти на каждом шаге не убывает и выросла хотя бы на
+    min_growth. Пулы и кэши, которые растут только в начале, прогрев и
+    требование роста по всей истории отсеивают.
+    """
+
+    def __init__(self, game, interval=5.0, max_samples=2000, warmup_samples=3, min_samples=12,
+                 min_growth=5, monotonic_fraction=0.9, min_object_count=50, track_objects=True):
+        self.game = game
+        self.interval = interval
+        self.warmup_samples = warmup_samples
+        self.min_samples = min_samples
+        self.min_growth = min_growth
+        self.monotonic_fraction = monotonic_fraction
+        self.min_object_count = min_object_count
+        self.track_objects = track_objects
+
+        self.series = {}
+        self.max_samples = max_samples
+        self.sample_count = 0
+        self.sample_time = 0.0
+        self.started = None
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.started = globalClock.getFrameTime()
+            self.sample()
+            self.task = self.game.taskMgr.doMethodLater(self.interval, self.sample_task, 'leak_detector')
+
+    def stop(self):
+        if self.task is not None:
+            self.game.taskMgr.remove(self.task)
+            self.task = None
+
+    def sample_task(self, task):
+        self.sample()
+        return task.again
+
+    def get_counts(self):
+        """Все метрики одной выборки: имя -> число"""
+        counts = {
+            'nodes/render': self.game.render.countNumDescendants(),
+            'nodes/aspect2d': self.game.aspect2d.countNumDescendants(),
+            'nodes/bullet_traces': self.game.bullet_traces.countNumDescendants()
+        }
+        tasks = Counter(task.getName() for task in self.game.taskMgr.getTasks() + self.game.taskMgr.getDoLaters())
+        counts['tasks/total'] = sum(tasks.values())
+        for name, count in tasks.items():
+            counts[f"tasks/{name}"] = count
+        if self.track_objects:
+            # Без сборки в счет попадает мусор с циклами, ждущий редкой сборки старшего поколения
+            gc.collect()
+            objects = Counter(type(obj).__name__ for obj in gc.get_objects())
+            counts['objects/total'] = sum(objects.values())
+            for name, count in objects.items():
+                # Редкие типы не отслеживаем, пока их не станет заметно много
+                if count >= self.min_object_count or f"objects/{name}" in self.series:
+                    counts[f"objects/{name}"] = count
+        return counts
+
+    def sample(self):
+        started = time.perf_counter()
+        now = globalClock.getFrameTime() - self.started
+        counts = self.get_counts()
+        # Метрика, которая пропала из выборки (задача завершилась), пишется нулем
+        for name in self.series:
+            counts.setdefault(name, 0)
+        for name, value in counts.items():
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = deque(maxlen=self.max_samples)
+            series.append((self.sample_count, now, value))
+        self.sample_count += 1
+        self.sample_time += time.perf_counter() - started
+
+    def find_growth(self):
+        """Метрики с монотонным ростом после прогрева, от самого быстрого роста"""
+        flagged = []
+        for name, series in self.series.items():
+            samples = [sample for sample in series if sample[0] >= self.warmup_samples]
+            if len(samples) < self.min_samples:
+                continue
+            times = np.array([sample[1] for sample in samples])
+            values = np.array([sample[2] for sample in samples], dtype=float)
+            growth = values[-1] - values[0]
+            if growth < self.min_growth:
+                continue
+            non_decreasing = float(np.mean(np.diff(values) >= 0))
+            if non_decreasing < self.monotonic_fraction:
+                continue
+            # Рост по всей истории, а не один скачок: каждая треть в среднем выше предыдущей
+            thirds = [part.mean() for part in np.array_split(values, 3)]
+            if not thirds[0] < thirds[1] < thirds[2]:
+                continue
+            slope = np.polyfit(times - times[0], values, 1)[0] if times[-1] > times[0] else 0.0
+            flagged.append({
+                'metric': name,
+                'first': int(values[0]),
+                'last': int(values[-1]),
+                'growth': int(growth),
+                'per_minute': float(slope * 60),
+                'non_decreasing': non_decreasing
+            })
+        flagged.sort(key=lambda item: item['per_minute'], reverse=True)
+        return flagged
+
+    def get_stats(self):
+        return {
+            'samples': self.sample_count,
+            'duration_s': self.get_duration(),
+            'metrics': len(self.series),
+            'sample_ms': self.sample_time / self.sample_count * 1000 if self.sample_count else 0.0
+        }
+
+    def get_duration(self):
+        if self.started is None:
+            return 0.0
+        return globalClock.getFrameTime() - self.started
+
+    def write_report(self, path):
+        """JSON-отчет: подозрительные метрики с историей и последние значения всех метрик"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        flagged = self.find_growth()
+        for item in flagged:
+            item['history'] = [[round(sample[1], 2), sample[2]] for sample in self.series[item['metric']]]
+        latest = {name: series[-1][2] for name, series in sorted(self.series.items()) if series}
+        report = dict(self.get_stats(), leaks=flagged, latest=latest)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def destroy(self):
+        self.stop()
+        self.series.clear()
+
+
+if __name__ == "__main__":
+    # Долгий прогон без окна: бот играет заданное число минут игрового времени
+    # (часы MNonRealTime, быстрее реального), детектор пишет отчет об утечках.
+    # python leak_detector.py --minutes 60 --targets 10 --output leak_report.json
+    import argparse
+    import sys
+    from panda3d.core import ClockObject
+    from benchmark import AimBot, BENCHMARK_SETTINGS, FRAME_DT, START_TIME
+
+    parser = argparse.ArgumentParser(description="Headless soak test with leak detection")
+    parser.add_argument('--minutes', type=float, default=60.0, help="game time to play")
+    parser.add_argument('--targets', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--interval', type=float, default=10.0, help="seconds of game time between samples")
+    parser.add_argument('--output', default='leak_report.json')
+    args = parser.parse_args()
+
+    from main import Game
+    game = Game(headless=True)
+    for key in BENCHMARK_SETTINGS:
+        game.settings[key] = game.DEFAULT_SETTINGS[key]
+    game.settings['target_count'] = args.targets
+
+    globalClock.setMode(ClockObject.MNonRealTime)
+    globalClock.setFrameTime(START_TIME)
+    globalClock.setDt(FRAME_DT)
+    game.start_game(seed=args.seed)
+    bot = AimBot(game, args.seed)
+    bot.start()
+
+    detector = LeakDetector(game, interval=args.interval)
+    detector.start()
+    frames = int(args.minutes * 60 / FRAME_DT)
+    started = time.perf_counter()
+    for frame in range(frames):
+        game.taskMgr.step()
+        if frame and frame % (60 * 60 * 5) == 0:
+            print(f"{frame * FRAME_DT / 60:.0f} min of game time, {time.perf_counter() - started:.0f} s real, "
+                  f"{len(detector.find_growth())} growing metrics")
+
+    report = detector.write_report(args.output)
+    print(f"Soak: {args.minutes:g} min of game time in {time.perf_counter() - started:.0f} s, "
+          f"{report['samples']} samples, {report['sample_ms']:.1f} ms per sample, score {int(game.score)}")
+    for leak in report['leaks']:
+        print(f"  LEAK {leak['metric']}: {leak['first']} -> {leak['last']} ({leak['per_minute']:+.1f}/min)")
+    print(f"Report saved to {args.output}")
+    sys.exit(1 if report['leaks'] else 0)
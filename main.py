@@ -1,37 +1,66 @@
 from direct.showbase.ShowBase import ShowBase
-from panda3d.core import Point3, Vec3, Vec4, Vec2, Point2, WindowProperties, MouseWatcher, NodePath
-from panda3d.core import CollisionTraverser, CollisionNode, CollisionHandlerQueue, CollisionHandlerPusher
-from panda3d.core import CollisionRay, CollisionSphere, CollisionBox, BitMask32
-from panda3d.core import TextNode, TextureStage, Texture, TransparencyAttrib
+from panda3d.core import Point3, Vec3, Vec2, WindowProperties, MouseWatcher, NodePath
+from panda3d.core import CollisionTraverser, CollisionNode, CollisionHandlerPusher
+from panda3d.core import CollisionSphere, CollisionBox, BitMask32
+from panda3d.core import TextNode, TextureStage, Texture
 from panda3d.core import AmbientLight, DirectionalLight, LineSegs, ClockObject
-from panda3d.core import CardMaker
+from panda3d.core import Filename, loadPrcFileData
 from direct.gui.OnscreenText import OnscreenText
 from direct.gui.DirectGui import DirectFrame
 from direct.task import Task
-from direct.interval.IntervalGlobal import Sequence, Parallel, LerpColorScaleInterval, LerpColorInterval, LerpPosInterval, LerpHprInterval, Wait, Func
+from direct.interval.IntervalGlobal import Sequence, Parallel, LerpColorInterval, LerpPosInterval, LerpHprInterval, Wait
 from direct.filter.CommonFilters import CommonFilters
 from menu import MainMenu
-from target import Target
+from target import Target, TargetPool
+from texture_streaming import TextureStreamer
+from hitbox import TARGET_MASK
+from map_collision import load_map_collision, CollisionCost, MAP_MASK
+from hit_engine import HitEngine
+from hit_registration import HitRegistration, HitRecord
+from audio_pool import AudioVoicePool
+from music import MusicPlayer
+from tracers import TracerRenderer
+from shells import ShellCasings
+from damage_numbers import DamageNumbers
+from killfeed import Killfeed
+from hud import Hud
+from game_clock import GameClock
+from input_pipeline import InputPipeline
+from task_profiler import TaskProfiler
+from session_recorder import RngStreams, SessionRecorder, SessionPlayer, GAMEPLAY_SETTINGS
+from settings_store import SettingsStore
+from event_log import EventLog, EVENT_SHOT, EVENT_HIT, EVENT_KILL, EVENT_SPAWN
 from splash_screen import SplashScreen
-import random
 import math
 import time
-import json
 import os
 from direct.actor.Actor import Actor
 from math import sin, cos, pi, radians as deg2Rad
 import sys
 
 class Game(ShowBase):
-    def __init__(self):
+    def __init__(self, headless=False, record_dir=None, event_log_dir=None):
+        # Без окна и звука - для воспроизведения записанных сессий
+        self.headless = headless
+        if headless:
+            loadPrcFileData('', 'window-type offscreen\naudio-library-name null')
         ShowBase.__init__(self)
 
         # Инициализация FPS
         self.fps = 0
         
+        # Случайность игры - отдельные потоки от сида сессии
+        self.rng = RngStreams()
+        # Запись сессий: папка для файлов (None - не записывать) и текущая запись/воспроизведение
+        self.record_dir = record_dir
+        self.session = None
+        # Журнал выстрелов и попаданий: папка для файлов (None - не писать) и журнал текущей игры
+        self.event_log_dir = event_log_dir
+        self.event_log = None
+        self.exitFunc = self.on_exit
+        
         # Инициализация коллизий
         self.cTrav = CollisionTraverser('traverser')
-        self.cQueue = CollisionHandlerQueue()
         
         # Load the map
         self.map_model = self.loader.loadModel("xz.egg")
@@ -39,18 +68,18 @@ class Game(ShowBase):
         self.map_model.setPos(0, 0, 0)
         self.map_model.setScale(1)
         
-        # Setup map collisions
-        map_collision = CollisionNode('map_collision')
-        map_collision_np = NodePath(map_collision)
-        geom_node = self.map_model.find("**/+GeomNode")
-        if not geom_node.isEmpty():
-            geom_node.copyTo(map_collision_np)
-            map_collision_np.reparentTo(self.map_model)
+        # Setup map collisions: BVH из полигонов карты, кэшируется в .bam рядом с egg
+        map_egg = Filename(Target.get_base_path(), "xz.egg").toOsSpecific()
+        self.map_collision_np = load_map_collision(map_egg, self.map_model)
+        self.map_collision_np.reparentTo(self.map_model)
         
         # Player collision setup
         self.player_collision = CollisionNode('player')
         player_sphere = CollisionSphere(0, 0, 0, 1.0)  # Radius of 1 unit
         self.player_collision.addSolid(player_sphere)
+        # Только карта и манекены, без видимой геометрии
+        self.player_collision.setFromCollideMask(MAP_MASK | TARGET_MASK)
+        self.player_collision.setIntoCollideMask(BitMask32.allOff())
         self.player_collision_np = self.camera.attachNewNode(self.player_collision)
         
         # Set up collision handler
@@ -59,6 +88,8 @@ class Game(ShowBase):
         
         # Add collisions to traverser
         self.cTrav.addCollider(self.player_collision_np, self.collision_handler)
+        # Замер времени обхода коллизий за кадр
+        self.collision_cost = CollisionCost(self.taskMgr)
         
         # Отключаем стандартное управление мышью
         self.disableMouse()
@@ -76,6 +107,7 @@ class Game(ShowBase):
             'damage_numbers': True,
             'killfeed': True,
             'show_fps': True,
+            'max_fps': 0,  # Ограничение FPS отрисовки, 0 - без ограничения (только vsync)
             'recoil_enabled': True,  # Включение/выключение отдачи
             'weapon_position': {
                 'x': 0.25,  # Чуть ближе к центру
@@ -91,10 +123,16 @@ class Game(ShowBase):
             },
             'target_count': 10,  # Добавляем настройку количества манекенов
             'bullet_traces': True,  # Новая настройка для следов пуль
-            'spread_enabled': True  # Новая настройка для разброса
+            'spread_enabled': True,  # Новая настройка для разброса
+            'texture_streaming': True,  # Фоновая загрузка текстур манекенов
+            'texture_atlas': True,  # Упаковка картинок манекенов в атлас
+            'texture_cache_budget_mb': 256,  # Бюджет памяти кэша текстур манекенов
+            'max_shell_casings': 256  # Максимум гильз на сцене, старые исчезают первыми
         }
         
         # Загружаем настройки
+        # settings.json пишется с задержкой и в фоне, см. SettingsStore
+        self.settings_store = SettingsStore(self.taskMgr)
         self.settings = self.load_settings()
         
         # Применяем начальные настройки
@@ -112,12 +150,14 @@ class Game(ShowBase):
         if self.settings.get('fullscreen', False):
             props.setFullscreen(True)
             
-        self.win.requestProperties(props)
+        self.request_window_properties(props)
 
         # Start with splash screen, then initialize menu
         self.menu = None
-        self.splash = SplashScreen(self)
-        self.splash.start()
+        self.splash = None
+        if not headless:
+            self.splash = SplashScreen(self)
+            self.splash.start()
 
         # Игровая статистика
         self.score = 0
@@ -153,7 +193,7 @@ class Game(ShowBase):
         properties.setTitle("Aim Trainer")
         properties.setCursorHidden(True)
         properties.setMouseMode(WindowProperties.M_relative)
-        self.win.requestProperties(properties)
+        self.request_window_properties(properties)
         
         # Настраиваем FOV (поле зрения)
         self.camLens.setFov(self.settings['fov'])  # Увеличиваем FOV до значения из настроек
@@ -256,6 +296,24 @@ class Game(ShowBase):
                     "recovery_time": 0.08 # Время восстановления точности
                 },
                 "sound": "sounds/revik.wav"  # Звук выстрела для винтовки
+            },
+            "shotgun": {
+                "cooldown": 0.8,  # Медленная перезарядка
+                "damage": 15,     # Урон одной дробины
+                "pellets": 8,     # Дробин за выстрел, проверяются через HitEngine
+                "pellet_spread": 0.06,  # Конус дроби, добавляется к разбросу оружия
+                "recoil": {
+                    "pitch": (1.5, 2.5),    # Сильная отдача вверх
+                    "yaw": (-0.5, 0.5)
+                },
+                "spread": {
+                    "base": 0.01,
+                    "max": 0.08,
+                    "moving_mult": 1.5,
+                    "jumping_mult": 2.0,
+                    "recovery_time": 0.8
+                },
+                "sound": "sounds/shot.wav"  # Звук выстрела для дробовика
             }
         }
         
@@ -274,6 +332,8 @@ class Game(ShowBase):
         self.recoil_recovery_speed = 5.0  # Скорость возврата камеры
         self.recoil_recovery_delay = 0.1  # Задержка перед началом восстановления
         self.last_shot_time = 0
+        # Игровое время с последнего выстрела (растет на шаг GameClock, с учетом замедления)
+        self.time_since_shot = float('inf')
         
         # Добавляем параметры разброса
         self.current_spread = 0.0  # Текущий разброс
@@ -281,6 +341,10 @@ class Game(ShowBase):
         # Настройка камеры
         self.camera_height = 1.8
         self.camera.setPos(0, 0, self.camera_height)
+        # Позиция игрока в симуляции: текущий и предыдущий шаг, камера рисуется между ними
+        self.player_pos = Point3(0, 0, self.camera_height)
+        self.player_prev_pos = Point3(self.player_pos)
+        self.player_render_pos = Point3(self.player_pos)
         self.camera_pitch = 0
         self.camera_heading = 0
         
@@ -288,6 +352,17 @@ class Game(ShowBase):
 
         # Создаем цель
         self.targets = []
+        # Пакетная проверка лучей против хитбоксов (дробовик)
+        self.hit_engine = HitEngine(self.render)
+        # Пул манекенов: убитые не удаляются, а переиспользуются
+        self.target_pool = TargetPool(self)
+        
+        # Фоновая загрузка текстур манекенов
+        self.texture_streamer = TextureStreamer(self)
+        
+        # Бюджет памяти кэша текстур
+        budget_mb = self.settings.get('texture_cache_budget_mb', self.DEFAULT_SETTINGS['texture_cache_budget_mb'])
+        Target.texture_cache.set_budget(int(budget_mb * 1024 * 1024))
         
         # Создаем прицел
         self.crosshair = OnscreenText(
@@ -297,48 +372,88 @@ class Game(ShowBase):
             pos=(0, 0),
             scale=.05)
 
-        # Загрузка звуков
-        self.shot_sound = self.loader.loadSfx("sounds/shot.wav")
-        self.hit_sound = self.loader.loadSfx("sounds/hit.wav")
+        # Загрузка звуков: все декодируются один раз, у каждого несколько голосов
+        self.audio = AudioVoicePool(self.loader)
+        for weapon_name, weapon_params in self.weapons.items():
+            self.audio.preload(weapon_name, weapon_params["sound"], min_interval=weapon_params["cooldown"])
         # Настройка громкости
-        self.shot_sound.setVolume(0.5)
-        self.hit_sound.setVolume(0.7)
+        self.audio.preload("shot", "sounds/shot.wav", volume=0.5)
+        self.audio.preload("hit", "sounds/hit.wav", volume=0.7)
         
         # Настройка информационных текстов
         self.fps_text = self.create_text(-1.3, 0.95)
         self.pos_text = self.create_text(-1.3, 0.85)
         self.speed_text = self.create_text(-1.3, 0.75)
+        self.collision_text = self.create_text(-1.3, 0.65)
+        self.hud_text = self.create_text(-1.3, 0.55)
+        
+        # HUD: текст перегенерируется только при изменении строки, у каждого поля своя частота
+        self.hud = Hud(self.taskMgr)
+        self.hud.add_field('fps', self.fps_text, "FPS: {}", lambda: (self.fps,), rate=4)
+        self.hud.add_field('pos', self.pos_text, "Pos: ({:.1f}, {:.1f}, {:.1f})",
+                           lambda: tuple(self.camera.getPos()), rate=10)
+        self.hud.add_field('speed', self.speed_text, "Speed: {:.1f}", self.get_speed_values, rate=10)
+        self.hud.add_field('collision', self.collision_text, "Collisions: {:.3f} ms (max {:.3f})",
+                           lambda: (self.collision_cost.get_average_ms(), self.collision_cost.get_max_ms()), rate=2)
+        self.hud.add_field('hud', self.hud_text, "HUD: {:.3f} ms (max {:.3f})",
+                           lambda: (self.hud.get_average_ms(), self.hud.get_max_ms()), rate=2)
+        self.input_text = self.create_text(-1.3, 0.45)
+        self.hud.add_field('input', self.input_text, "Input: p50 {:.1f} ms, p99 {:.1f} ms, {:.1f} samples/frame",
+                           self.get_input_values, rate=2)
+        self.hud.add_field('score', self.score_text, "Score: {}")
+        self.hud.add_field('timer', self.timer_text, "Time: {}:{:02d}")
+        
+        # Замер времени задач: F3 - оверлей с самыми дорогими задачами, F4 - выгрузка в CSV
+        self.task_profiler = TaskProfiler(self.taskMgr)
+        self.profiler_text = OnscreenText(
+            text="",
+            style=1,
+            fg=(1, 1, 0.6, 1),
+            pos=(-1.3, 0.35),
+            align=TextNode.ALeft,
+            scale=.04,
+            mayChange=True
+        )
+        self.profiler_text.hide()
+        self.hud.add_field('profiler', self.profiler_text, "{}", self.task_profiler.get_overlay_values, rate=4)
         
         # Список для хранения всех визуальных эффектов
         self.shot_effects = []  # Каждый элемент это кортеж (line_node, marker_node, task)
         
-        # Список для хранения текста урона
-        self.damage_texts = []  # Каждый элемент это кортеж (text_node, start_time, start_pos)
+        # Пул всплывающих чисел урона
+        self.damage_numbers = DamageNumbers(self.aspect2d)
         
         # Список для хранения 2D маркеров попадания
         self.hit_markers = []  # Каждый элемент это NodePath
         
-        # Инициализация килфида
-        self.killfeed_messages = []
-        self.killfeed_fade_time = 0.3  # Время для fade in/out анимации
-        self.killfeed_slide_distance = 0.2  # Расстояние для slide анимации
-        self.killfeed_duration = 5  # Длительность показа сообщения в секундах
-        
-        # Список для хранения активных гильз
-        self.active_shells = []
+        # Инициализация килфида: задача анимации запускается только при новых сообщениях
+        self.killfeed = Killfeed(
+            self.aspect2d,
+            self.taskMgr,
+            max_entries=5,
+            duration=5,  # Длительность показа сообщения в секундах
+            fade_time=0.3,  # Время для fade in/out анимации
+            slide_distance=0.2  # Расстояние для slide анимации
+        )
         
-        # Загружаем модель гильзы
-        self.shell_model = self.loader.loadModel("models/box")  # Временно используем box как гильзу
-        self.shell_model.setScale(0.02, 0.05, 0.02)  # Масштаб для гильзы
-        self.shell_model.setColor(0.8, 0.6, 0.2)  # Цвет латуни
+        # Гильзы: массивы NumPy и один Geom на все (размер бокса как у старой модели)
+        self.shell_casings = ShellCasings(
+            self.render,
+            capacity=self.settings.get('max_shell_casings', self.DEFAULT_SETTINGS['max_shell_casings']),
+            half_extents=(0.02, 0.05, 0.02),  # Масштаб для гильзы
+            color=(0.8, 0.6, 0.2, 1)  # Цвет латуни
+        )
         
         # Настройка управления
         self.accept("escape", self.return_to_menu)
+        self.accept("f3", self.toggle_task_profiler)
+        self.accept("f4", self.export_task_profile)
         self.accept("space", self.start_jump)
         self.accept("1", self.switch_weapon, ["rifle"])    # Клавиша 1 для винтовки
         self.accept("2", self.switch_weapon, ["pistol"])   # Клавиша 2 для пистолета
         self.accept("3", self.switch_weapon, ["sniper"])   # Клавиша 3 для снайперской винтовки
         self.accept("4", self.switch_weapon, ["dual_revolvers"])   # Клавиша 4 для двойных револьверов
+        self.accept("5", self.switch_weapon, ["shotgun"])  # Клавиша 5 для дробовика
         self.accept("wheel_up", self.cycle_weapon, [1])    # Колесо мыши вверх для следующего оружия
         self.accept("wheel_down", self.cycle_weapon, [-1]) # Колесо мыши вниз для предыдущего оружия
         
@@ -371,50 +486,48 @@ class Game(ShowBase):
         # Добавляем задачу обновления текста урона
         self.taskMgr.add(self.update_damage_texts, "update_damage_texts")
         
-        # Добавляем задачу обновления гильз
-        self.taskMgr.add(self.update_shells, "update_shells")
+        # Проверка попаданий: отдельный луч только в момент выстрела,
+        # в общий self.cTrav (обходится каждый кадр) он не добавляется
+        self.hit_registration = HitRegistration(self)
         
-        # Create the collision ray
-        self.ray = CollisionRay()
-        rayNode = CollisionNode('mouseRay')
-        rayNode.addSolid(self.ray)
-        rayNode.setFromCollideMask(BitMask32.bit(1))
-        rayNode.setIntoCollideMask(BitMask32.allOff())
-        self.rayNodePath = self.camera.attachNewNode(rayNode)
-        self.cTrav.addCollider(self.rayNodePath, self.cQueue)
+        # Ввод мыши: одна стадия в начале кадра, все события указателя за кадр
+        self.input_pipeline = InputPipeline(self)
         
         # Настройка выхода из игры
         self.accept("window-event", self.cleanup)
         
         # Параметры эффектов при попадании
-        self.current_time_scale = 1.0   # Текущий масштаб времени
-        self.target_time_scale = 1.0    # Целевой масштаб времени
         self.normal_time_scale = 1.0    # Нормальная скорость времени
         self.slow_motion_scale = 0.3    # Скорость в замедленном режиме
-        self.time_scale_speed = 6.0     # Скорость перехода между нормальным и замедленным временем
         self.slow_motion_duration = 0.15 # Длительность замедления в секундах
         self.is_in_slow_motion = False
         
-        # Добавляем задачу обновления масштаба времени
-        taskMgr.add(self.update_time_scale, 'update_time_scale')
+        # Игровое время: фиксированный шаг 120 Гц и замедление без вмешательства в globalClock
+        self.game_clock = GameClock(step=1 / 120, time_scale_speed=6.0)
+        self.game_clock.add_step_callback(self.shell_casings.update)
+        # После update (ввод) и до collisionLoop (sort 30)
+        self.taskMgr.add(self.update_simulation, 'update_simulation', sort=1)
         
-        # Устанавливаем начальную скорость времени
-        globalClock.setMode(ClockObject.MLimited)
-        globalClock.setFrameRate(60)  # Ограничиваем FPS до 60
+        # Ограничение FPS отрисовки из настроек
+        self.apply_max_fps(self.settings.get('max_fps', self.DEFAULT_SETTINGS['max_fps']))
         
         # Добавляем обработчик обновления позиции оружия
         self.accept('update_weapon_position', self.update_weapon_position)
 
-        # Initialize audio
-        self.music = None
-        self.current_music_path = None
+        # Initialize audio: музыка грузится в фоне и меняется кроссфейдом
+        self.music_player = MusicPlayer(self)
+        self.music_player.set_playlist(MusicPlayer.list_tracks(
+            Filename(Target.get_base_path(), "music").toOsSpecific()
+        ))
 
         # Добавляем переменную для отслеживания зажатия кнопки
         self.mouse_pressed = False
         
         # Создаем родительский узел для трассеров пуль
         self.bullet_traces = self.render.attachNewNode("bullet_traces")
-        self.traces = []  # Список активных трассеров
+        # Все следы в одном кольцевом буфере вершин (один draw call)
+        self.tracers = TracerRenderer(self.bullet_traces)
+        self.taskMgr.add(self.update_tracers, "update_tracers")
         
         # В __init__ добавляем новые переменные
         self.is_aiming = False
@@ -444,18 +557,47 @@ class Game(ShowBase):
             "pistol": 65,
             "rifle": 45,
             "sniper": 30,
-            "dual_revolvers": 60
+            "dual_revolvers": 60,
+            "shotgun": 60
         }
 
         # Анимация оружия
         self.weapon_animation = None
         self.is_drawing_weapon = False
 
-        self.is_splash_screen_active = True  # Add this flag
+        self.is_splash_screen_active = not headless  # Без окна заставки нет
 
         # Добавляем переменную для отслеживания активного револьвера
         self.active_revolver = "left"  # Начинаем с левого револьвера
 
+    def request_window_properties(self, props):
+        """Свойства окна; без окна (воспроизведение сессии) пропускаются"""
+        if not self.headless:
+            self.win.requestProperties(props)
+
+    def toggle_task_profiler(self):
+        """Включает замер задач вместе с оверлеем"""
+        if self.task_profiler.toggle():
+            self.profiler_text.show()
+        else:
+            self.profiler_text.hide()
+
+    def export_task_profile(self):
+        """Сохраняет замеры задач за последние кадры в CSV"""
+        if not self.task_profiler.frame:
+            return
+        path = os.path.join('profiles', time.strftime("tasks_%Y%m%d_%H%M%S.csv"))
+        print(f"Task profile saved to {self.task_profiler.export_csv(path)}")
+
+    def get_input_values(self):
+        """Задержка ввода мыши для HUD"""
+        stats = self.input_pipeline.get_stats()
+        return (stats['p50'], stats['p99'], stats['avg_samples_per_frame'])
+
+    def get_speed_values(self):
+        """Текущая горизонтальная скорость для HUD"""
+        return (math.sqrt(self.horizontal_velocity.getX()**2 + self.horizontal_velocity.getY()**2),)
+
     def create_text(self, x, y):
         return OnscreenText(
             text="",
@@ -536,10 +678,8 @@ class Game(ShowBase):
 
     def setup_targets(self):
         """Создание манекенов"""
-        # Очищаем существующие манекены
-        for target in self.targets:
-            target.cleanup()
-        self.targets.clear()
+        # Возвращаем существующие манекены в пул
+        self.target_pool.release_all()
 
         # Получаем количество манекенов из настроек (по умолчанию 10)
         target_count = self.settings.get('target_count', 10)
@@ -549,16 +689,19 @@ class Game(ShowBase):
         max_distance = 35  # Максимальная дистанция от игрока
         arena_width = 30   # Ширина арены
         
-        # Создаем новые манекены
+        # Все манекены создаются на загрузке, запас для спавна достраивается по кадрам
+        self.target_pool.prewarm(target_count)
+        
+        # Расставляем манекены
         for _ in range(target_count):
             # Генерируем случайную позицию
-            x = random.uniform(-arena_width/2, arena_width/2)
-            y = random.uniform(min_distance, max_distance)
+            x = self.rng.spawn.uniform(-arena_width/2, arena_width/2)
+            y = self.rng.spawn.uniform(min_distance, max_distance)
             z = 1  # Высота манекена над землей
             
-            # Создаем манекен на случайной позиции
-            target = Target(self, Point3(x, y, z))
-            self.targets.append(target)
+            # Ставим манекен из пула на случайную позицию
+            target = self.target_pool.acquire(Point3(x, y, z))
+            self.log_event(EVENT_SPAWN, target=target.pool_id, point=target.position)
 
     def setup_weapon(self):
         # Создаем контейнер для всего оружия
@@ -695,6 +838,33 @@ class Game(ShowBase):
         
         self.weapon_models["dual_revolvers"] = dual_revolvers
         
+        # Создаем дробовик
+        shotgun = NodePath("shotgun")
+        shotgun.reparentTo(self.weapon)
+        
+        # Дуло дробовика (толстое и короткое)
+        barrel = self.loader.loadModel("models/box")
+        barrel.setScale(0.1, 0.7, 0.1)
+        barrel.setPos(0, 1.1, -0.1)
+        barrel.setColor(0.2, 0.2, 0.2)  # Тёмно-серый цвет
+        barrel.reparentTo(shotgun)
+        
+        # Цевье дробовика
+        pump = self.loader.loadModel("models/box")
+        pump.setScale(0.12, 0.25, 0.1)
+        pump.setPos(0, 1.1, -0.2)
+        pump.setColor(0.4, 0.2, 0.1)  # Коричневый цвет
+        pump.reparentTo(shotgun)
+        
+        # Приклад дробовика
+        stock = self.loader.loadModel("models/box")
+        stock.setScale(0.08, 0.35, 0.15)
+        stock.setPos(0, 0.5, -0.15)
+        stock.setColor(0.4, 0.2, 0.1)  # Коричневый цвет
+        stock.reparentTo(shotgun)
+        
+        self.weapon_models["shotgun"] = shotgun
+        
         # Скрываем все оружия кроме текущего
         for weapon_name, model in self.weapon_models.items():
             if weapon_name == self.current_weapon:
@@ -754,7 +924,7 @@ class Game(ShowBase):
         recoil_hpr = Vec3(
             start_hpr.getX(),     # Поворот влево-вправо
             start_hpr.getY() + 3, # Уменьшили поворот вверх с 5 до 3
-            start_hpr.getZ() + random.uniform(-1, 1)  # Уменьшили случайный наклон с (-2,2) до (-1,1)
+            start_hpr.getZ() + self.rng.effects.uniform(-1, 1)  # Уменьшили случайный наклон с (-2,2) до (-1,1)
         )
         
         # Создаем последовательность анимации
@@ -804,7 +974,7 @@ class Game(ShowBase):
         
         if not self.is_jumping:
             # Увеличиваем множитель комбо при последовательных прыжках только если распрыжка включена
-            current_time = time.time()
+            current_time = globalClock.getFrameTime()
             
             if self.settings.get('bhop_enabled', True):  # Проверяем, включена ли распрыжка
                 if current_time - self.last_jump_time < self.jump_combo_time:
@@ -873,8 +1043,7 @@ class Game(ShowBase):
             active_revolver = self.weapon_models["dual_revolvers"].find(f"{self.active_revolver}_revolver")
             
             # Воспроизводим звук выстрела
-            self.shot_sound = self.loader.loadSfx(self.weapons[self.current_weapon]["sound"])
-            self.shot_sound.play()
+            self.audio.play(self.current_weapon)
             
             # Создаем анимацию отдачи только для активного револьвера
             if self.active_revolver == "left":
@@ -886,7 +1055,7 @@ class Game(ShowBase):
                 recoil_hpr = Vec3(
                     active_revolver.getH() + 12,    # Поворот вправо
                     active_revolver.getP() + 15,    # Вверх
-                    active_revolver.getR() + random.uniform(-8, 8)
+                    active_revolver.getR() + self.rng.effects.uniform(-8, 8)
                 )
             else:  # right revolver
                 recoil_pos = Point3(
@@ -897,7 +1066,7 @@ class Game(ShowBase):
                 recoil_hpr = Vec3(
                     active_revolver.getH() - 12,    # Поворот влево
                     active_revolver.getP() + 15,    # Вверх
-                    active_revolver.getR() + random.uniform(-8, 8)
+                    active_revolver.getR() + self.rng.effects.uniform(-8, 8)
                 )
             
             # Создаем последовательность анимации только для активного револьвера
@@ -934,8 +1103,7 @@ class Game(ShowBase):
             
         else:
             # Оригинальная логика для других оружий
-            self.shot_sound = self.loader.loadSfx(self.weapons[self.current_weapon]["sound"])
-            self.shot_sound.play()
+            self.audio.play(self.current_weapon)
             
             # Создаем анимацию выброса гильзы
             self.create_shell_casing()
@@ -953,13 +1121,11 @@ class Game(ShowBase):
         # Получаем параметры текущего оружия
         weapon_params = self.weapons[self.current_weapon]
         
-        if not self.mouseWatcherNode.hasMouse():
+        if not self.has_mouse():
             return
-            
-        # Получаем позицию мыши
-        mouse_pos = self.mouseWatcherNode.getMouse()
         
         # Применяем разброс только если он включен в настройках
+        final_spread = 0.0
         if self.settings.get('spread_enabled', True):
             spread_params = weapon_params["spread"]
             
@@ -991,22 +1157,18 @@ class Game(ShowBase):
                 
             # Ограничиваем максимальный разброс
             final_spread = min(final_spread, spread_params["max"])
-            
-            # Добавляем случайный разброс к позиции мыши
-            spread_x = random.uniform(-final_spread, final_spread)
-            spread_y = random.uniform(-final_spread, final_spread)
-            
-            # Применяем разброс к позиции мыши
-            spread_mouse_pos = Point2(
-                mouse_pos.getX() + spread_x,
-                mouse_pos.getY() + spread_y
-            )
-        else:
-            # Если разброс выключен, используем точную позицию мыши
-            spread_mouse_pos = mouse_pos
         
-        # Создаем луч от камеры
-        self.ray.setFromLens(self.camNode, spread_mouse_pos.getX(), spread_mouse_pos.getY())
+        # Направление выстрела фиксируем до отдачи этого выстрела: камера
+        # смотрит туда, куда целился игрок (с отдачей прошлых выстрелов)
+        camera_mat = self.camera.getMat(self.render)
+        origin = self.camera.getPos(self.render)
+        direction = Vec3(camera_mat.getRow3(1))
+        if final_spread > 0:
+            # Один и тот же разброс идет и в проверку попадания, и в след пули
+            spread_x = self.rng.spread.uniform(-final_spread, final_spread)
+            spread_y = self.rng.spread.uniform(-final_spread, final_spread)
+            direction += Vec3(camera_mat.getRow3(0)) * spread_x + Vec3(camera_mat.getRow3(2)) * spread_y
+            direction.normalize()
         
         # Применяем отдачу только если она включена в настройках
         if self.settings.get('recoil_enabled', True):
@@ -1014,8 +1176,8 @@ class Game(ShowBase):
             recoil_pitch_range = weapon_params["recoil"]["pitch"]
             recoil_yaw_range = weapon_params["recoil"]["yaw"]
             
-            recoil_pitch = random.uniform(recoil_pitch_range[0], recoil_pitch_range[1])
-            recoil_yaw = random.uniform(recoil_yaw_range[0], recoil_yaw_range[1])
+            recoil_pitch = self.rng.recoil.uniform(recoil_pitch_range[0], recoil_pitch_range[1])
+            recoil_yaw = self.rng.recoil.uniform(recoil_yaw_range[0], recoil_yaw_range[1])
             
             self.recoil_pitch += recoil_pitch
             self.recoil_yaw += recoil_yaw
@@ -1033,109 +1195,92 @@ class Game(ShowBase):
         
         # Обновляем время последнего выстрела
         self.last_shot_time = globalClock.getFrameTime()
+        self.time_since_shot = 0.0
         
-        # Проверяем коллизии
-        self.cTrav.traverse(self.render)
+        # Оружие с дробью проверяет все дробины одним вызовом HitEngine
+        if weapon_params.get("pellets", 1) > 1:
+            self.fire_pellets(weapon_params, final_spread)
+            return
         
-        # Получаем начальную позицию пули (позиция оружия)
+        # Максимальная дистанция для следа пули
+        max_distance = 1000
+        
+        self.log_event(EVENT_SHOT, spread=final_spread, direction=direction)
+        
+        # Один луч ровно в направлении выстрела
+        hit = self.hit_registration.cast(origin, direction, self.current_weapon, max_distance)
+        
+        # Создаем след пули из позиции оружия если включено в настройках
+        if self.settings.get('bullet_traces', True):
+            end_pos = hit.point if hit else origin + direction * max_distance
+            self.create_bullet_trace(self.get_muzzle_pos(), end_pos)
+        
+        # Обработка попадания в цель
+        if hit:
+            self.register_hit(hit)
+
+    def get_muzzle_pos(self):
+        """Мировая позиция дула текущего оружия (начало следа пули)"""
         if self.current_weapon == "dual_revolvers":
-            # Для двойных револьверов используем позицию активного револьвера
-            active_revolver = self.weapon_models["dual_revolvers"].find(f"{self.active_revolver}_revolver")
+            # Для револьверов используем позицию активного револьвера
             if self.active_revolver == "left":
-                weapon_pos = self.camera.getPos() + self.camera.getMat().xformVec(Point3(-2.0, 0.6, -0.2))
+                local_pos = Point3(-2.0, 0.6, -0.2)
             else:
-                weapon_pos = self.camera.getPos() + self.camera.getMat().xformVec(Point3(0.4, 0.6, -0.2))
-        else:
-            # Для других оружий
-            if self.current_weapon == "rifle":
-                local_pos = Point3(0.2, 0.6, -0.2)
-            elif self.current_weapon == "pistol":
-                local_pos = Point3(0.15, 0.6, -0.2)
-            elif self.current_weapon == "sniper":
-                local_pos = Point3(0.25, 0.6, -0.2)
-            else:
-                local_pos = Point3(0, 0.6, -0.2)
-            # Преобразуем локальные координаты в мировые относительно камеры
-            weapon_pos = self.camera.getPos() + self.camera.getMat().xformVec(local_pos)
-        
-        # Получаем направление луча
-        direction = self.camera.getQuat().getForward()
-        
-        # Применяем разброс к направлению только если он включен
-        if self.settings.get('spread_enabled', True):
-            spread_x = random.uniform(-final_spread, final_spread)
-            spread_y = random.uniform(-final_spread, final_spread)
-            
-            # Применяем разброс к направлению
-            spread_direction = Vec3(
-                direction.getX() + spread_x,
-                direction.getY(),
-                direction.getZ() + spread_y
-            )
-            spread_direction.normalize()
+                local_pos = Point3(0.4, 0.6, -0.2)
+        elif self.current_weapon == "rifle":
+            local_pos = Point3(0.2, 0.6, -0.2)
+        elif self.current_weapon == "pistol":
+            local_pos = Point3(0.15, 0.6, -0.2)
+        elif self.current_weapon == "sniper":
+            local_pos = Point3(0.25, 0.6, -0.2)
+        elif self.current_weapon == "shotgun":
+            local_pos = Point3(0.2, 0.6, -0.2)
         else:
-            spread_direction = direction
+            local_pos = Point3(0, 0.6, -0.2)
+        # Преобразуем локальные координаты в мировые относительно камеры
+        return self.camera.getPos() + self.camera.getMat().xformVec(local_pos)
+        
+    def fire_pellets(self, weapon_params, spread):
+        """Выстрел дробью: все лучи проверяются за один вызов HitEngine"""
+        camera_mat = self.camera.getMat(self.render)
+        origin = self.camera.getPos(self.render)
+        forward = camera_mat.getRow3(1)
+        right = camera_mat.getRow3(0)
+        up = camera_mat.getRow3(2)
+        
+        # Разброс дроби - равномерно по кругу, плюс текущий разброс оружия
+        cone = weapon_params.get("pellet_spread", 0.05) + spread
+        directions = []
+        for _ in range(weapon_params["pellets"]):
+            angle = self.rng.spread.uniform(0, 2 * pi)
+            radius = cone * math.sqrt(self.rng.spread.random())
+            direction = forward + right * (radius * cos(angle)) + up * (radius * sin(angle))
+            direction.normalize()
+            directions.append(tuple(direction))
         
-        # Максимальная дистанция для следа пули
         max_distance = 1000
-        
-        # Рассчитываем конечную точку луча
-        end_pos = weapon_pos + (spread_direction * max_distance)
-        
-        # Создаем след пули если включено в настройках
-        if self.settings.get('bullet_traces', True):
-            if self.cQueue.getNumEntries() > 0:
-                # Если попали в цель, используем точку попадания
-                self.cQueue.sortEntries()
-                entry = self.cQueue.getEntry(0)
-                hit_pos = entry.getSurfacePoint(self.render)
-                
-                # Создаем след пули из правильной позиции
-                if self.current_weapon == "dual_revolvers":
-                    # Для револьверов используем позицию активного револьвера
-                    if self.active_revolver == "left":
-                        local_pos = Point3(-2.0, 0.6, -0.2)
-                    else:
-                        local_pos = Point3(0.4, 0.6, -0.2)
-                else:
-                    # Для других оружий используем их специфические позиции
-                    if self.current_weapon == "rifle":
-                        local_pos = Point3(0.2, 0.6, -0.2)
-                    elif self.current_weapon == "pistol":
-                        local_pos = Point3(0.15, 0.6, -0.2)
-                    elif self.current_weapon == "sniper":
-                        local_pos = Point3(0.25, 0.6, -0.2)
-                    else:
-                        local_pos = Point3(0, 0.6, -0.2)
-                
-                # Преобразуем локальные координаты в мировые относительно камеры
-                start_pos = self.camera.getPos() + self.camera.getMat().xformVec(local_pos)
-                self.create_bullet_trace(start_pos, hit_pos)
-                
-                # Обработка попадания в цель
-                self.handle_collision(entry)
+        hits = self.hit_engine.cast([tuple(origin)] * len(directions), directions, max_distance)
+        shot_time = globalClock.getFrameTime()
+        
+        # След каждой дробины идет от дула оружия
+        start_pos = self.get_muzzle_pos()
+        for i, direction in enumerate(directions):
+            self.log_event(EVENT_SHOT, spread=cone, direction=direction)
+            hit = hits.get(i)
+            if hit:
+                target, zone, point, distance = hit
+                end_pos = Point3(*point)
             else:
-                # Если не попали, используем конечную точку луча
-                if self.current_weapon == "dual_revolvers":
-                    # Для револьверов используем позицию активного револьвера
-                    if self.active_revolver == "left":
-                        local_pos = Point3(-2.0, 0.6, -0.2)
-                    else:
-                        local_pos = Point3(0.4, 0.6, -0.2)
-                else:
-                    # Для других оружий используем их специфические позиции
-                    if self.current_weapon == "rifle":
-                        local_pos = Point3(0.2, 0.6, -0.2)
-                    elif self.current_weapon == "pistol":
-                        local_pos = Point3(0.15, 0.6, -0.2)
-                    elif self.current_weapon == "sniper":
-                        local_pos = Point3(0.25, 0.6, -0.2)
-                    else:
-                        local_pos = Point3(0, 0.6, -0.2)
-                
-                # Преобразуем локальные координаты в мировые относительно камеры
-                start_pos = self.camera.getPos() + self.camera.getMat().xformVec(local_pos)
+                end_pos = origin + Vec3(*direction) * max_distance
+            if self.settings.get('bullet_traces', True):
                 self.create_bullet_trace(start_pos, end_pos)
+            # Несколько дробин могут попасть в один манекен - засчитываем первую
+            # (после нее манекен уже убран из HitEngine, и слот отдает None)
+            if hit and target is not None and target.is_active and target in self.targets:
+                self.register_hit(HitRecord(
+                    target, target.model, zone, end_pos, distance,
+                    origin, Vec3(*direction), shot_time, self.current_weapon
+                ))
         
     def remove_specific_effect(self, effect_index, task):
         if 0 <= effect_index < len(self.shot_effects):
@@ -1147,57 +1292,16 @@ class Game(ShowBase):
 
     def create_bullet_trace(self, start_pos, end_pos):
         """Создает след пули от точки start_pos до end_pos"""
-        ls = LineSegs()
-        ls.setColor(1.0, 1.0, 0.8, 0.5)  # Желтоватый цвет с прозрачностью
-        ls.setThickness(2.0)
-        ls.moveTo(start_pos)
-        
-        # Если есть попадание, рисуем до точки попадания
-        if end_pos is not None:
-            ls.drawTo(end_pos)
-        else:
-            # Если нет попадания, рисуем до конечной точки
-            ls.drawTo(end_pos)
-        
-        # Создаем узел из линии
-        trace = self.bullet_traces.attachNewNode(ls.create())
-        
-        # Добавляем эффект прозрачности
-        trace.setTransparency(TransparencyAttrib.MAlpha)
-        
-        # Запускаем анимацию исчезновения следа
-        Sequence(
-            Wait(0.1),  # Ждем 0.1 секунды
-            LerpColorScaleInterval(trace, 0.2, Vec4(1, 1, 1, 0)),  # Плавно делаем прозрачным
-            Func(trace.removeNode)  # Удаляем след
-        ).start()
-        
-    def remove_trace(self, trace_np, task):
-        """Удаляет след пули после того как он исчез"""
-        # Удаляем след из списка активных
-        self.traces = [(np, fade) for np, fade in self.traces if np != trace_np]
-        # Удаляем узел
-        trace_np.removeNode()
-        return Task.done
+        self.tracers.add(start_pos, end_pos, globalClock.getFrameTime())
+        
+    def update_tracers(self, task):
+        """Затухание всех следов пуль за один проход"""
+        self.tracers.update(globalClock.getFrameTime())
+        return Task.cont
 
     def update_damage_texts(self, task):
-        current_time = globalClock.getFrameTime()
-        
-        # Обновляем каждый текст
-        for i in range(len(self.damage_texts) - 1, -1, -1):
-            text_node, start_time, start_pos = self.damage_texts[i]
-            age = current_time - start_time
-            
-            if age > 1.0:  # Текст живет 1 секунду
-                text_node.removeNode()
-                self.damage_texts.pop(i)
-            else:
-                # Поднимаем текст вверх и делаем его прозрачным
-                alpha = 1.0 - age
-                z_offset = age * 2  # Поднимаем на 2 единицы за секунду
-                text_node.setPos(start_pos + Point3(0, 0, z_offset))
-                text_node.setAlphaScale(alpha)
-        
+        """Анимация всех чисел урона за один проход"""
+        self.damage_numbers.update(globalClock.getFrameTime())
         return task.cont
 
     def cleanup(self, window=None):
@@ -1212,9 +1316,7 @@ class Game(ShowBase):
         self.shot_effects.clear()
         
         # Очищаем все тексты урона
-        for text_node, _, _ in self.damage_texts:
-            text_node.removeNode()
-        self.damage_texts.clear()
+        self.damage_numbers.clear()
 
     def return_to_menu(self):
         # Ignore during splash screen
@@ -1229,13 +1331,20 @@ class Game(ShowBase):
             
         # Отключаем игровые компоненты
         self.taskMgr.remove("update")
+        self.game_clock.remove_step_callback(self.simulate_player)
+        self.input_pipeline.stop()
+        self.hud.stop()
         self.ignore("mouse1")
         
-        # Очищаем старые цели
-        if hasattr(self, 'targets'):
-            for target in self.targets:
-                target.destroy()
-            self.targets.clear()
+        # Дописываем итог записанной сессии
+        if self.session is not None and not self.session.is_playback:
+            self.session.stop(self.score)
+            self.session = None
+        self.close_event_log()
+        
+        # Убираем цели в пул и отменяем отложенные спавны
+        self.taskMgr.remove("spawn_target")
+        self.target_pool.release_all()
         
         # Очищаем оружие если оно есть
         if hasattr(self, 'weapon'):
@@ -1250,19 +1359,25 @@ class Game(ShowBase):
         else:
             self.main_menu.show()
 
-    def start_game(self):
+    def start_game(self, seed=None):
         if self.is_splash_screen_active:  # Check if splash screen is active
             return  # Ignore all actions during splash screen
         
         # Настраиваем окно для игры
         props = WindowProperties()
         props.setCursorHidden(True)
-        self.win.requestProperties(props)
+        self.request_window_properties(props)
         
-        # Очищаем старые цели если они есть
-        for target in self.targets:
-            target.destroy()
-        self.targets.clear()
+        # Новый сид сессии (или записанный при воспроизведении) и чистое состояние игрока
+        self.rng.reseed(seed)
+        self.reset_player()
+        if self.record_dir and self.session is None:
+            self.start_recording()
+        if self.event_log_dir:
+            self.start_event_log()
+        
+        # Убираем старые цели в пул если они есть
+        self.target_pool.release_all()
         
         # Включаем игровые компоненты
         self.setup_targets()
@@ -1270,12 +1385,17 @@ class Game(ShowBase):
         
         # Включаем управление
         self.taskMgr.add(self.update, "update")
+        self.game_clock.add_step_callback(self.simulate_player)
+        # Без окна мыши нет: камерой управляет запись сессии или бот бенчмарка
+        if not self.headless:
+            self.input_pipeline.start()
+        self.hud.start()
         self.accept("mouse1", self.on_mouse_press)
         self.accept("mouse1-up", self.on_mouse_release)
         
         # Сбрасываем и показываем счет и таймер
         self.score = 0
-        self.start_time = time.time()
+        self.start_time = globalClock.getFrameTime()
         self.update_score_display()
         self.update_timer_display()
         
@@ -1288,35 +1408,112 @@ class Game(ShowBase):
         # Setup audio
         self.setup_audio()
 
+    def reset_player(self):
+        """Состояние игрока и стрельбы к началу сессии (для повторяемости записи)"""
+        self.player_pos = Point3(0, 0, self.camera_height)
+        self.player_prev_pos = Point3(self.player_pos)
+        self.player_render_pos = Point3(self.player_pos)
+        self.camera.setPos(self.player_pos)
+        self.camera_heading = 0
+        self.camera_pitch = 0
+        self.camera.setHpr(0, 0, 0)
+        self.vertical_velocity = 0.0
+        self.horizontal_velocity = Vec3(0, 0, 0)
+        self.is_jumping = False
+        self.current_combo_jumps = 0
+        self.jump_combo_multiplier = 1.0
+        self.last_jump_time = 0
+        for key in self.keyMap:
+            self.keyMap[key] = False
+        
+        self.can_shoot = True
+        self.mouse_pressed = False
+        self.shoot_cooldown = self.weapons[self.current_weapon]["cooldown"]
+        self.last_shot_time = 0
+        self.time_since_shot = float('inf')
+        self.current_spread = 0.0
+        self.recoil_pitch = 0
+        self.recoil_yaw = 0
+        self.combo_multiplier = 1.0
+        self.last_hit_time = 0
+        self.active_revolver = "left"
+        self.taskMgr.remove('reset_shoot')
+        self.taskMgr.remove('reset_jump_combo')
+        self.combo_task = None
+        
+        # Без замедления, оставшегося с прошлой игры
+        self.taskMgr.remove('deactivate_slow_motion')
+        self.is_in_slow_motion = False
+        self.game_clock.set_time_scale(self.normal_time_scale, immediate=True)
+        self.game_clock.reset()
+
+    def start_recording(self):
+        """Начинает запись сессии в новый файл в record_dir"""
+        name = time.strftime("session_%Y%m%d_%H%M%S.aimrec")
+        self.session = SessionRecorder(self, os.path.join(self.record_dir, name))
+        settings = {key: self.settings.get(key, self.DEFAULT_SETTINGS[key]) for key in GAMEPLAY_SETTINGS}
+        self.session.start(self.rng.seed, self.current_weapon, settings)
+
+    def start_event_log(self):
+        """Открывает журнал событий новой игры в event_log_dir"""
+        self.close_event_log()
+        name = time.strftime("events_%Y%m%d_%H%M%S.evlog")
+        settings = {key: self.settings.get(key, self.DEFAULT_SETTINGS[key]) for key in GAMEPLAY_SETTINGS}
+        self.event_log = EventLog(os.path.join(self.event_log_dir, name), self.weapons,
+                                  {'seed': self.rng.seed, 'settings': settings})
+        self.event_log.start()
+
+    def on_exit(self):
+        """Закрытие окна: дописываем журнал событий и отложенные настройки"""
+        self.close_event_log()
+        self.settings_store.flush()
+
+    def close_event_log(self):
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
+
+    def log_event(self, kind, **fields):
+        """Событие в журнал текущей игры (если он ведется)"""
+        if self.event_log is not None:
+            self.event_log.log(kind, self.current_weapon, **fields)
+
+    def has_mouse(self):
+        """Есть ли мышь в окне; при записи и воспроизведении - значение этого кадра из записи"""
+        if self.session is not None:
+            return self.session.has_mouse()
+        return self.headless or self.mouseWatcherNode.hasMouse()
+
+    def apply_look_delta(self, delta_heading, delta_pitch):
+        """Поворот камеры мышью - из InputPipeline или из записи сессии"""
+        if self.session is not None and not self.session.is_playback:
+            self.session.record_look(delta_heading, delta_pitch)
+        self.camera_heading += delta_heading
+        self.camera_pitch = min(89, max(-89, self.camera_pitch + delta_pitch))
+        self.camera.setHpr(self.camera_heading, self.camera_pitch, 0)
+
     def update_score_display(self):
-        self.score_text.setText(f"Score: {self.score}")
+        self.hud.set('score', int(self.score))
     
     def update_timer_display(self):
         minutes = int(self.game_time) // 60
         seconds = int(self.game_time) % 60
-        self.timer_text.setText(f"Time: {minutes}:{seconds:02d}")
+        self.hud.set('timer', minutes, seconds)
     
     def update_timer_task(self, task):
         if not self.show_timer:
             return task.done
-        self.game_time = time.time() - self.start_time
+        self.game_time = globalClock.getFrameTime() - self.start_time
         self.update_timer_display()
         return task.cont
     
-    def handle_collision(self, entry):
-        # Получаем целевой объект и проверяем, что это действительно цель
-        hit_node = entry.getIntoNode()
-        if not hit_node.getName().startswith('target_'):
-            return
-            
-        target = entry.getIntoNodePath().getParent()
-        while target.getName() != "target_root":
-            target = target.getParent()
-            if target is None:
-                return
+    def register_hit(self, hit):
+        """Засчитывает попадание по HitRecord"""
+        zone = hit.zone
+        hit_pos = hit.point
         
-        # Получаем часть тела, в которую попали
-        damage = self.get_damage_for_part(hit_node.getName())
+        # Получаем часть тела, в которую попали (зона хранится на общем шаблоне)
+        damage = self.get_damage_for_part(zone.part)
         
         if damage <= 0:  # Если попали не в валидную часть тела
             return
@@ -1325,10 +1522,10 @@ class Game(ShowBase):
         self.activate_hit_effects()
         
         # Воспроизводим звук попадания
-        self.hit_sound.play()
+        self.audio.play("hit")
         
         # Обновляем комбо
-        current_time = time.time()
+        current_time = globalClock.getFrameTime()
         if current_time - self.last_hit_time < self.combo_window:
             self.combo_multiplier = min(2.0, self.combo_multiplier + 0.2)  # Максимум x2
         else:
@@ -1340,23 +1537,29 @@ class Game(ShowBase):
         
         # Добавляем очки
         self.score += points
+        if self.session is not None:
+            self.session.record_hit(zone.part, points, hit_pos)
+        target_id = hit.target.pool_id if hit.target else -1
+        self.log_event(EVENT_HIT, target=target_id, damage=points, direction=hit.direction, point=hit_pos,
+                       zone=zone.name)
         
         # Обновляем отображение счета
         if hasattr(self, 'score_text') and self.show_score:
-            self.score_text.setText(f"Score: {self.score}")
-        
-        # Получаем точку попадания
-        hit_pos = entry.getSurfacePoint(self.render)
+            self.update_score_display()
         
         # Показываем текст с очками
         if self.settings.get('damage_numbers', True):
-            self.spawn_damage_text(f"+{points}", hit_pos)
+            self.spawn_damage_text(points, hit_pos)
         
-        # Удаляем старый манекен
-        target.removeNode()
+        # Возвращаем манекен в пул вместо удаления
+        if hit.target:
+            self.target_pool.release(hit.target)
+        else:
+            hit.target_np.removeNode()
+        self.log_event(EVENT_KILL, target=target_id, damage=points, point=hit_pos)
         
         # Создаем новый манекен через случайное время
-        delay = random.uniform(0.5, 2.0)
+        delay = self.rng.respawn.uniform(0.5, 2.0)
         taskMgr.doMethodLater(delay, self.spawn_target, 'spawn_target')
         
         # Добавляем сообщение в килфид
@@ -1380,290 +1583,66 @@ class Game(ShowBase):
         # Возвращаем урон с учетом множителя
         return int(base_damage * multiplier)
 
-    def spawn_damage_text(self, text, pos):
-        # Создаем текст с уроном
-        damage_text = TextNode('damage')
-        damage_text.setText(text)
-        damage_text.setAlign(TextNode.ACenter)
-        
-        # Создаем узел для текста и прикрепляем к aspect2d (2D слой)
-        text_node_path = self.aspect2d.attachNewNode(damage_text)
-        
-        # Генерируем случайное смещение от центра
-        offset_x = random.uniform(-0.15, 0.15)
-        offset_y = random.uniform(-0.15, 0.15)
-        
-        # Располагаем текст со случайным смещением от центра
-        text_node_path.setPos(offset_x, 0, offset_y)
-        
-        # Устанавливаем размер текста
-        text_node_path.setScale(0.07)
-        
-        # Устанавливаем цвет в зависимости от урона
-        if int(text) >= 100:  # Хедшот
-            text_node_path.setColor(1, 0, 0, 1)  # Красный
-        elif int(text) >= 60:  # Высокий урон
-            text_node_path.setColor(1, 0.5, 0, 1)  # Оранжевый
-        else:  # Обычный урон
-            text_node_path.setColor(1, 1, 1, 1)  # Белый
-        
-        # Создаем анимацию движения вверх и исчезновения
-        fade_interval = LerpColorScaleInterval(
-            text_node_path,
-            0.5,  # Длительность
-            Vec4(1, 1, 1, 0),  # Конечное значение (прозрачный)
-            Vec4(1, 1, 1, 1)   # Начальное значение (непрозрачный)
-        )
-        
-        # Конечная позиция будет немного выше начальной, сохраняя случайное X-смещение
-        pos_interval = text_node_path.posInterval(
-            0.5,  # Длительность
-            Point3(offset_x, 0, offset_y + 0.2),  # Конечная позиция
-            Point3(offset_x, 0, offset_y)         # Начальная позиция
-        )
-        
-        # Запускаем обе анимации одновременно
-        Parallel(fade_interval, pos_interval).start()
-        
-        # Удаляем текст через 0.5 секунды
-        self.taskMgr.doMethodLater(
-            0.5,
-            lambda task: text_node_path.removeNode(),
-            'remove_damage_text'
-        )
+    def spawn_damage_text(self, damage, pos):
+        """Показывает число урона из пула (без создания узлов и интервалов)"""
+        self.damage_numbers.spawn(damage, globalClock.getFrameTime(), self.rng.effects)
 
     def spawn_target(self, task):
         # Генерируем случайную позицию для нового манекена
-        x = random.uniform(-10, 10)
-        y = random.uniform(20, 30)
+        x = self.rng.spawn.uniform(-10, 10)
+        y = self.rng.spawn.uniform(20, 30)
         
-        # Создаем новый манекен
-        target = Target(self, Point3(x, y, 1))
-        self.targets.append(target)
+        # Берем манекен из пула
+        target = self.target_pool.acquire(Point3(x, y, 1))
+        self.log_event(EVENT_SPAWN, target=target.pool_id, point=target.position)
         
         return task.done
 
-    def update_time_scale(self, task):
-        if self.is_in_slow_motion:
-            base.taskMgr.globalClock.setDt(base.taskMgr.globalClock.getDt() * self.slow_motion_scale)
-        return task.cont
-
     def activate_hit_effects(self):
         # Активируем замедление времени
-        self.target_time_scale = self.slow_motion_scale
+        self.game_clock.set_time_scale(self.slow_motion_scale)
         self.is_in_slow_motion = True
         taskMgr.doMethodLater(self.slow_motion_duration, self.deactivate_slow_motion, 'deactivate_slow_motion')
 
     def deactivate_slow_motion(self, task):
-        self.target_time_scale = self.normal_time_scale
+        self.game_clock.set_time_scale(self.normal_time_scale)
         self.is_in_slow_motion = False
         return task.done
 
-    def on_target_hit(self, target, hit_pos):
-        # Активируем эффекты при попадании
-        self.activate_hit_effects()
-        
-        # Существующая логика обработки попадания
-        self.hit_sound.play()
-        self.score += 10 * self.combo_multiplier
-        
-        # Обновляем комбо
-        current_time = time.time()
-        if current_time - self.last_hit_time < self.combo_window:
-            self.combo_multiplier += 0.5
-        else:
-            self.combo_multiplier = 1.0
-        self.last_hit_time = current_time
-        
-        # Обновляем текст счета
-        if hasattr(self, 'score_text') and self.show_score:
-            self.score_text.setText(f"Score: {int(self.score)}")
-        
-        # Получаем точку попадания
-        hit_pos = entry.getSurfacePoint(self.render)
-        
-        # Показываем текст с очками
-        if self.settings.get('damage_numbers', True):
-            self.spawn_damage_text(f"+{int(10 * self.combo_multiplier)}", hit_pos)
-        
-        # Удаляем цель и создаем новую
-        self.targets.remove(target)
-        target.cleanup()
-        self.spawn_target()
-
     def create_killfeed_message(self, target_name="Target"):
         """Создает новое сообщение в килфиде"""
-        y_pos = 0.9 - len(self.killfeed_messages) * 0.06
-        x_pos = 1.3 + self.killfeed_slide_distance  # Начальная позиция справа
-        
-        # Создаем текст сообщения с начальной прозрачностью 0
-        message = OnscreenText(
-            text=f"You killed {target_name}",
-            fg=(0.3, 0.6, 1, 0),
-            shadow=(0, 0, 0, 0),
-            pos=(x_pos, y_pos),
-            align=TextNode.ARight,
-            scale=0.04
-        )
-        message.setBin('gui-popup', 0)
-
-        # Создаем узел для группировки фона и границ
-        frame_root = aspect2d.attachNewNode("frame_root")
-        frame_root.setPos(x_pos, 0, y_pos)  # Устанавливаем начальную позицию
-        
-        # Создаем фон для сообщения с начальной прозрачностью 0
-        cm = CardMaker('killfeed_bg')
-        cm.setFrame(-0.5, 0.05, -0.015, 0.025)  # Относительные координаты
-        bg = frame_root.attachNewNode(cm.generate())
-        bg.setTransparency(TransparencyAttrib.MAlpha)
-        bg.setColor(0, 0, 0, 0)
-        bg.setBin('background', 10)
-        
-        # Создаем белые границы с начальной прозрачностью 0
-        border_thickness = 0.002
-        borders = []
-        
-        # Верхняя граница
-        cm_top = CardMaker('border_top')
-        cm_top.setFrame(-0.5, 0.05, 0.025, 0.025 + border_thickness)
-        border_top = frame_root.attachNewNode(cm_top.generate())
-        border_top.setColor(1, 1, 1, 0)
-        border_top.setTransparency(TransparencyAttrib.MAlpha)
-        border_top.setBin('background', 11)
-        borders.append(border_top)
-        
-        # Нижняя граница
-        cm_bottom = CardMaker('border_bottom')
-        cm_bottom.setFrame(-0.5, 0.05, -0.015 - border_thickness, -0.015)
-        border_bottom = frame_root.attachNewNode(cm_bottom.generate())
-        border_bottom.setColor(1, 1, 1, 0)
-        border_bottom.setTransparency(TransparencyAttrib.MAlpha)
-        border_bottom.setBin('background', 11)
-        borders.append(border_bottom)
-        
-        # Левая граница
-        cm_left = CardMaker('border_left')
-        cm_left.setFrame(-0.5 - border_thickness, -0.5, -0.015, 0.025)
-        border_left = frame_root.attachNewNode(cm_left.generate())
-        border_left.setColor(1, 1, 1, 0)
-        border_left.setTransparency(TransparencyAttrib.MAlpha)
-        border_left.setBin('background', 11)
-        borders.append(border_left)
-        
-        # Правая граница
-        cm_right = CardMaker('border_right')
-        cm_right.setFrame(0.05, 0.05 + border_thickness, -0.015, 0.025)
-        border_right = frame_root.attachNewNode(cm_right.generate())
-        border_right.setColor(1, 1, 1, 0)
-        border_right.setTransparency(TransparencyAttrib.MAlpha)
-        border_right.setBin('background', 11)
-        borders.append(border_right)
-        
-        # Добавляем сообщение в список с временем создания
-        self.killfeed_messages.append({
-            'message': message,
-            'frame_root': frame_root,
-            'background': bg,
-            'borders': borders,
-            'creation_time': globalClock.getFrameTime(),
-            'y_pos': y_pos,
-            'x_pos': x_pos,
-            'alpha': 0,
-            'target_alpha': 1,
-            'x_offset': self.killfeed_slide_distance
-        })
-        
-        # Удаляем старые сообщения, если их больше 5
-        if len(self.killfeed_messages) > 5:
-            oldest = self.killfeed_messages[0]
-            oldest['target_alpha'] = 0
-
-    def update_killfeed_positions(self):
-        """Обновляет позиции всех сообщений в килфиде"""
-        current_time = globalClock.getFrameTime()
-        messages_to_remove = []
-        
-        for i, msg_data in enumerate(self.killfeed_messages):
-            # Вычисляем время жизни сообщения
-            age = current_time - msg_data['creation_time']
-            
-            # Обновляем альфа и позицию X
-            if msg_data['alpha'] != msg_data['target_alpha']:
-                # Плавное изменение прозрачности
-                alpha_change = globalClock.getDt() / self.killfeed_fade_time
-                if msg_data['target_alpha'] > msg_data['alpha']:
-                    msg_data['alpha'] = min(msg_data['target_alpha'], msg_data['alpha'] + alpha_change)
-                else:
-                    msg_data['alpha'] = max(msg_data['target_alpha'], msg_data['alpha'] - alpha_change)
-                
-                # Обновляем прозрачность всех элементов
-                msg_data['message'].setFg((0.3, 0.6, 1, msg_data['alpha']))
-                msg_data['message'].setShadow((0, 0, 0, msg_data['alpha']))
-                msg_data['background'].setColor(0, 0, 0, msg_data['alpha'] * 0.3)
-                for border in msg_data['borders']:
-                    border.setColor(1, 1, 1, msg_data['alpha'] * 0.8)
-            
-            # Анимация скольжения
-            if msg_data['x_offset'] > 0:
-                slide_speed = self.killfeed_slide_distance / self.killfeed_fade_time
-                msg_data['x_offset'] = max(0, msg_data['x_offset'] - slide_speed * globalClock.getDt())
-                new_x = 1.3 + msg_data['x_offset']
-                
-                # Обновляем позицию текста и рамки
-                msg_data['message'].setPos(new_x, msg_data['y_pos'])
-                msg_data['frame_root'].setPos(new_x, 0, msg_data['y_pos'])
-                msg_data['x_pos'] = new_x
-            
-            # Запускаем исчезновение через 5 секунд
-            if age > 5.0 and msg_data['target_alpha'] == 1:
-                msg_data['target_alpha'] = 0
-            
-            # Удаляем полностью прозрачные сообщения
-            if msg_data['alpha'] <= 0 and msg_data['target_alpha'] == 0:
-                messages_to_remove.append(msg_data)
-            
-            # Обновляем позицию Y для всех сообщений
-            target_y = 0.9 - i * 0.06
-            if msg_data['y_pos'] != target_y:
-                msg_data['y_pos'] = target_y
-                msg_data['message'].setPos(msg_data['x_pos'], target_y)
-                msg_data['frame_root'].setPos(msg_data['x_pos'], 0, target_y)
-        
-        # Удаляем сообщения
-        for msg_data in messages_to_remove:
-            msg_data['message'].removeNode()
-            msg_data['frame_root'].removeNode()  # Удаляем весь узел с рамкой
-            self.killfeed_messages.remove(msg_data)
+        self.killfeed.add(f"You killed {target_name}")
 
     def update(self, task):
         """Обновление состояния игры"""
         if self.is_splash_screen_active:  # Check if splash screen is active
             return task.cont  # Continue but ignore input during splash screen
         
-        dt = globalClock.getDt()
-        
         # Обновляем FPS
         self.fps = int(globalClock.getAverageFrameRate())
         
-        # Плавное изменение масштаба времени
-        if self.current_time_scale != self.target_time_scale:
-            diff = self.target_time_scale - self.current_time_scale
-            change = min(abs(diff), dt * self.time_scale_speed) * (1 if diff > 0 else -1)
-            self.current_time_scale += change
+        # Движение, прыжки и отдача считаются фиксированными шагами в simulate_player
         
-        # Применяем текущий масштаб времени к dt
-        scaled_dt = dt * self.current_time_scale
+        # Поворот камеры мышью делает задача input_pipeline в начале кадра
         
-        # Обновляем все, что зависит от времени
-        self.update_score_display()
+        # Обработка стрельбы при нажатии левой кнопки мыши
+        if self.mouse_pressed and self.current_weapon == "rifle":
+            current_time = globalClock.getFrameTime()
+            if current_time - self.last_shot_time >= self.weapons[self.current_weapon]["cooldown"]:
+                self.shoot()
         
-        # Обновляем информационные тексты
-        self.fps_text.setText(f"FPS: {self.fps}")
-        self.pos_text.setText(f"Pos: ({self.camera.getX():.1f}, {self.camera.getY():.1f}, {self.camera.getZ():.1f})")
+        # Обновляем анимацию прицеливания
+        self.update_aim(task)
         
-        # Обновление отдачи
-        current_time = globalClock.getFrameTime()
-        if current_time - self.last_shot_time > self.recoil_recovery_delay:
+        return task.cont
+
+    def simulate_player(self, dt):
+        """Один шаг симуляции игрока: отдача, движение и прыжок (dt - фиксированный шаг)"""
+        self.player_prev_pos = Point3(self.player_pos)
+        
+        # Обновление отдачи: задержка считается в шагах игрового времени, а не по времени кадра
+        self.time_since_shot += dt
+        if self.time_since_shot > self.recoil_recovery_delay:
             # Восстановление от отдачи
             if self.recoil_pitch > 0:
                 old_pitch = self.recoil_pitch
@@ -1679,9 +1658,6 @@ class Game(ShowBase):
                     self.recoil_yaw = min(0, self.recoil_yaw + self.recoil_recovery_speed * dt)
                 # Применяем разницу к камере
                 self.camera_heading -= (old_yaw - self.recoil_yaw)
-            
-            # Обновляем положение камеры
-            self.camera.setHpr(self.camera_heading, self.camera_pitch, 0)
         
         # Обработка движения
         move_vec = Vec3(0, 0, 0)
@@ -1697,15 +1673,15 @@ class Game(ShowBase):
             move_vec.normalize()
             
             # Применяем поворот камеры к вектору движения
-            heading = self.camera.getH() * (pi / 180.0)
+            heading = self.camera_heading * (pi / 180.0)
             move_vec = Vec3(
                 move_vec.getX() * cos(heading) - move_vec.getY() * sin(heading),
                 move_vec.getX() * sin(heading) + move_vec.getY() * cos(heading),
                 0
             )
         
-        # Применяем скорость движения с учетом замедления времени
-        speed = (self.sprint_speed if self.keyMap["shift"] else self.move_speed) * self.current_time_scale
+        # Замедление времени уже учтено в числе шагов, скорость не масштабируется
+        speed = self.sprint_speed if self.keyMap["shift"] else self.move_speed
         if self.is_jumping:
             # Применяем множитель скорости от комбо прыжков
             speed *= self.jump_combo_multiplier
@@ -1717,18 +1693,15 @@ class Game(ShowBase):
             # Если на земле и нет движения, обнуляем горизонтальную скорость
             self.horizontal_velocity = Vec3(0, 0, 0)
             
-        # Применяем горизонтальное движение с учетом замедления времени
+        # Применяем горизонтальное движение
         if self.horizontal_velocity.length() > 0:
-            self.camera.setPos(
-                self.camera.getX() + self.horizontal_velocity.getX() * scaled_dt,
-                self.camera.getY() + self.horizontal_velocity.getY() * scaled_dt,
-                self.camera.getZ()
-            )
+            self.player_pos.setX(self.player_pos.getX() + self.horizontal_velocity.getX() * dt)
+            self.player_pos.setY(self.player_pos.getY() + self.horizontal_velocity.getY() * dt)
         
-        # Обработка прыжка и гравитации с учетом замедления времени
+        # Обработка прыжка и гравитации
         if self.is_jumping:
-            self.vertical_velocity += self.gravity * scaled_dt
-            new_z = self.camera.getZ() + self.vertical_velocity * scaled_dt
+            self.vertical_velocity += self.gravity * dt
+            new_z = self.player_pos.getZ() + self.vertical_velocity * dt
             
             if new_z <= self.camera_height:
                 new_z = self.camera_height
@@ -1739,51 +1712,39 @@ class Game(ShowBase):
                 if move_vec.length() == 0:
                     self.horizontal_velocity = Vec3(0, 0, 0)
             
-            self.camera.setZ(new_z)
-            
-        # Обновляем поворот камеры с учетом замедления времени
-        if self.mouseWatcherNode.hasMouse():
-            mouse_x = self.mouseWatcherNode.getMouseX()
-            mouse_y = self.mouseWatcherNode.getMouseY()
-            
-            # Применяем замедление к чувствительности мыши
-            sensitivity = self.settings["sensitivity"]
-            
-            # Применяем множитель чувствительности при прицеливании
-            if self.is_aiming:
-                sensitivity *= self.ads_sensitivity_multiplier
-            
-            self.camera_heading -= mouse_x * sensitivity
-            self.camera_pitch += mouse_y * sensitivity
-            
-            # Ограничиваем угол подъема/спуска камеры
-            self.camera_pitch = min(89, max(-89, self.camera_pitch))
-            
+            self.player_pos.setZ(new_z)
+
+    def update_simulation(self, task):
+        """Шаги симуляции за кадр и интерполированная позиция камеры"""
+        if self.is_splash_screen_active:
+            return task.cont
+        
+        player_active = self.simulate_player in self.game_clock.step_callbacks
+        if player_active:
+            # CollisionHandlerPusher двигает камеру после нас - переносим его поправку в симуляцию
+            pushed = self.camera.getPos() - self.player_render_pos
+            if pushed.lengthSquared() > 0:
+                self.player_pos += pushed
+                self.player_prev_pos += pushed
+        
+        self.game_clock.advance(globalClock.getDt())
+        # Вершины гильз - один раз за кадр, после всех шагов физики
+        self.shell_casings.update_geometry()
+        
+        if player_active:
+            self.player_render_pos = self.game_clock.interpolate(self.player_prev_pos, self.player_pos)
+            self.camera.setPos(self.player_render_pos)
             self.camera.setHpr(self.camera_heading, self.camera_pitch, 0)
-            
-            # Возвращаем курсор в центр экрана
-            self.win.movePointer(0,
-                int(self.win.getProperties().getXSize() / 2),
-                int(self.win.getProperties().getYSize() / 2))
-        
-        # Вычисляем текущую скорость движения
-        current_speed = math.sqrt(self.horizontal_velocity.getX()**2 + self.horizontal_velocity.getY()**2)
-        self.speed_text.setText(f"Speed: {current_speed:.1f}")
-        
-        # Обработка стрельбы при нажатии левой кнопки мыши
-        if self.mouse_pressed and self.current_weapon == "rifle":
-            current_time = time.time()
-            if current_time - self.last_shot_time >= self.weapons[self.current_weapon]["cooldown"]:
-                self.shoot()
-        
-        # Обновляем килфид
-        self.update_killfeed_positions()
-        
-        # Обновляем анимацию прицеливания
-        self.update_aim(task)
-        
         return task.cont
 
+    def apply_max_fps(self, max_fps):
+        """Ограничивает частоту отрисовки; 0 - без ограничения. Симуляция от нее не зависит"""
+        if max_fps and max_fps > 0:
+            globalClock.setMode(ClockObject.MLimited)
+            globalClock.setFrameRate(max_fps)
+        else:
+            globalClock.setMode(ClockObject.MNormal)
+
     def update_aim(self, task):
         """Обновление анимации прицеливания"""
         if self.is_aiming and self.aim_transition < 1.0:
@@ -1804,19 +1765,15 @@ class Game(ShowBase):
         target_fov = default_fov + (self.ads_fov[self.current_weapon] - default_fov) * self.aim_transition
         base.camLens.setFov(target_fov)
         
-        # Изменение чувствительности мыши при прицеливании
-        base_sensitivity = self.settings["sensitivity"]
-        
-        # Применяем множитель чувствительности при прицеливании
-        if self.is_aiming:
-            sensitivity = base_sensitivity * self.ads_sensitivity_multiplier
-        else:
-            sensitivity = base_sensitivity
-        
-        self.mouse_sensitivity = sensitivity
-        
         return task.cont
 
+    def get_look_sensitivity(self):
+        """Чувствительность обзора с учетом прицеливания (применяется один раз в input_pipeline)"""
+        sensitivity = self.settings["sensitivity"]
+        if self.is_aiming:
+            sensitivity *= self.ads_sensitivity_multiplier
+        return sensitivity
+
     def start_aiming(self):
         """Начало прицеливания"""
         self.is_aiming = True
@@ -1847,6 +1804,7 @@ class Game(ShowBase):
             # Обновляем параметры стрельбы для нового оружия
             self.shoot_cooldown = self.weapons[weapon_name]["cooldown"]
             self.last_shot_time = 0  # Сбрасываем время последнего выстрела
+            self.time_since_shot = float('inf')
             
             # Запускаем анимацию доставания оружия
             self.play_weapon_draw_animation()
@@ -1996,7 +1954,7 @@ class Game(ShowBase):
         props.setCursorHidden(True)
         # Устанавливаем курсор в центр экрана
         props.setMouseMode(WindowProperties.M_relative)
-        base.win.requestProperties(props)
+        self.request_window_properties(props)
         
         # Отключаем стандартное управление камерой
         base.disableMouse()
@@ -2008,47 +1966,8 @@ class Game(ShowBase):
         self.accept("mouse1", self.on_mouse_press)
         self.accept("mouse1-up", self.on_mouse_release)
         
-        # Устанавливаем задачу для обработки движения мыши
-        taskMgr.add(self.mouseTask, 'mouseTask')
-        
-    def mouseTask(self, task):
-        """Обрабатывает движение мыши"""
-        if task.time < 0.05:  # Пропускаем первый кадр
-            return Task.cont
-            
-        # Получаем изменение позиции мыши
-        md = base.win.getPointer(0)
-        x = md.getX()
-        y = md.getY()
-        
-        if base.win.movePointer(0,
-            int(base.win.getProperties().getXSize() / 2),
-            int(base.win.getProperties().getYSize() / 2)):
-            # Рассчитываем изменение положения
-            deltaX = x - base.win.getProperties().getXSize()//2
-            deltaY = y - base.win.getProperties().getYSize()//2
-            
-            # Применяем чувствительность
-            sensitivity_factor = 25.0  # Увеличено с 10.0 до 25.0
-            deltaX *= self.mouse_sensitivity * sensitivity_factor
-            deltaY *= self.mouse_sensitivity * sensitivity_factor
-            
-            # Обновляем поворот камеры
-            heading = self.camera.getH() - deltaX * 0.3  # Увеличено с 0.2 до 0.3
-            pitch = self.camera.getP() + deltaY * 0.3
-            
-            # Ограничиваем угол обзора по вертикали
-            pitch = min(90, max(-90, pitch))
-            
-            self.camera.setH(heading)
-            self.camera.setP(pitch)
-            
-            # Поворачиваем оружие вместе с камерой
-            if hasattr(self, 'weapon'):
-                self.weapon.setH(heading)
-                self.weapon.setP(pitch)
-        
-        return Task.cont
+        # Поворот камеры - единая стадия ввода
+        self.input_pipeline.start()
 
     def setup_audio(self):
         """Setup and start background music"""
@@ -2062,26 +1981,12 @@ class Game(ShowBase):
         if self.is_splash_screen_active:  # Check if splash screen is active
             return  # Ignore all actions during splash screen
         
-        if self.music:
-            self.music.stop()
-        
-        # Get the music file path
-        music_path = f"music/{track_name}"
-        
-        try:
-            self.music = loader.loadSfx(music_path)
-            if self.music:
-                self.music.setLoop(True)
-                self.music.setVolume(volume)
-                self.music.play()
-                self.current_music_path = music_path
-        except Exception as e:
-            print(f"Error loading music: {e}")
+        # Текущий трек доигрывает, пока новый загружается в фоне
+        self.music_player.play(track_name, volume)
 
     def update_music_volume(self, volume):
         """Update the volume of currently playing music"""
-        if self.music:
-            self.music.setVolume(volume)
+        self.music_player.set_volume(volume)
             
         # Update settings
         if 'audio' not in self.settings:
@@ -2110,8 +2015,8 @@ class Game(ShowBase):
         
         if enabled:
             self.play_music(self.settings['audio']['current_track'], self.settings['audio']['music_volume'])
-        elif self.music:
-            self.music.stop()
+        else:
+            self.music_player.stop()
 
     def cycle_weapon(self, direction):
         if self.is_splash_screen_active:  # Check if splash screen is active
@@ -2146,9 +2051,6 @@ class Game(ShowBase):
         # Получаем текущую модель оружия
         current_weapon_model = self.weapon_models[self.current_weapon]
         
-        # Создаем копию модели гильзы
-        shell = self.shell_model.copyTo(render)
-        
         # Определяем точку выброса относительно модели оружия
         if self.current_weapon == "pistol":
             eject_offset = Vec3(0.1, 0.9, -0.1)
@@ -2157,23 +2059,14 @@ class Game(ShowBase):
         else:  # sniper
             eject_offset = Vec3(0.1, 1.1, -0.05)
 
-        # Создаем пустой узел как родитель для гильзы
-        shell_parent = render.attachNewNode("shell_parent")
-        shell_parent.setPos(current_weapon_model.getPos(render))
-        shell_parent.setHpr(current_weapon_model.getHpr(render))
-        
-        # Привязываем гильзу к родительскому узлу и устанавливаем смещение
-        shell.reparentTo(shell_parent)
-        shell.setPos(eject_offset)
-        
-        # Получаем мировые координаты точки выброса
-        shell.wrtReparentTo(render)  # Переносим в мировые координаты
+        # Мировые координаты точки выброса и поворот оружия
+        eject_pos = self.render.getRelativePoint(current_weapon_model, eject_offset)
+        eject_hpr = current_weapon_model.getHpr(self.render)
         
         # Базовые векторы для расчета направления выброса
-        weapon_quat = current_weapon_model.getQuat(render)
+        weapon_quat = current_weapon_model.getQuat(self.render)
         right = weapon_quat.getRight()
         up = weapon_quat.getUp()
-        forward = weapon_quat.getForward()
         
         # Рассчитываем начальную скорость в мировых координатах
         ejection_speed = 3.0
@@ -2186,70 +2079,20 @@ class Game(ShowBase):
         
         # Добавляем случайное отклонение
         initial_velocity += Vec3(
-            random.uniform(-0.2, 0.2),
-            random.uniform(-0.2, 0.2),
-            random.uniform(0, 0.5)
+            self.rng.effects.uniform(-0.2, 0.2),
+            self.rng.effects.uniform(-0.2, 0.2),
+            self.rng.effects.uniform(0, 0.5)
         )
         
         # Случайное вращение для реалистичности
         angular_velocity = Vec3(
-            random.uniform(-720, 720),
-            random.uniform(-720, 720),
-            random.uniform(-720, 720)
+            self.rng.effects.uniform(-720, 720),
+            self.rng.effects.uniform(-720, 720),
+            self.rng.effects.uniform(-720, 720)
         )
         
-        # Добавляем гильзу в список активных
-        shell_data = {
-            'model': shell,
-            'velocity': initial_velocity,
-            'angular_velocity': angular_velocity,
-            'time': 0
-        }
-        self.active_shells.append(shell_data)
-        
-        # Запускаем задачу для удаления гильзы через 2 секунды
-        taskMgr.doMethodLater(2.0, self.remove_shell, 'remove_shell', 
-                            extraArgs=[shell_data], appendTask=True)
-
-    def update_shells(self, task):
-        """Обновляет физику гильз"""
-        if self.is_splash_screen_active:  # Check if splash screen is active
-            return task.cont  # Continue but ignore input during splash screen
-        
-        dt = globalClock.getDt()
-        gravity = Vec3(0, 0, -9.8)
-        
-        for shell in self.active_shells:
-            # Обновляем время
-            shell['time'] += dt
-            
-            # Обновляем позицию
-            current_pos = shell['model'].getPos()
-            shell['velocity'] += gravity * dt
-            new_pos = current_pos + shell['velocity'] * dt
-            shell['model'].setPos(new_pos)
-            
-            # Обновляем вращение
-            current_hpr = shell['model'].getHpr()
-            rotation = shell['angular_velocity'] * dt
-            new_hpr = current_hpr + rotation
-            shell['model'].setHpr(new_hpr)
-            
-            # Проверяем столкновение с полом
-            if new_pos.getZ() < 0:
-                new_pos.setZ(0)
-                shell['velocity'] = Vec3(0, 0, 0)
-                shell['angular_velocity'] = Vec3(0, 0, 0)
-                shell['model'].setPos(new_pos)
-        
-        return task.cont
-
-    def remove_shell(self, shell_data, task):
-        """Удаляет гильзу"""
-        if shell_data in self.active_shells:
-            self.active_shells.remove(shell_data)
-            shell_data['model'].removeNode()
-        return task.done
+        # Гильза живет 2 секунды, слот потом переиспользуется
+        self.shell_casings.spawn(eject_pos, eject_hpr, initial_velocity, angular_velocity)
 
     def apply_settings(self, new_settings):
         # Обновляем настройки
@@ -2263,29 +2106,31 @@ class Game(ShowBase):
             lens.setFov(new_settings['fov'])
         if 'show_score' in new_settings:
             self.show_score = new_settings['show_score']
+            self.update_score_display()
         if 'show_timer' in new_settings:
             self.show_timer = new_settings['show_timer']
+        if 'max_fps' in new_settings:
+            self.apply_max_fps(new_settings['max_fps'])
+        if 'max_shell_casings' in new_settings:
+            self.shell_casings.set_capacity(new_settings['max_shell_casings'])
             
         # Сохраняем все настройки
         self.save_settings()
 
     def load_settings(self):
-        try:
-            with open('settings.json', 'r') as f:
-                return json.load(f)
-        except:
-            return self.DEFAULT_SETTINGS.copy()
+        return self.settings_store.load(self.DEFAULT_SETTINGS)
 
     def save_settings(self):
         """Сохраняет текущие настройки в файл"""
+        # Без окна (бенчмарк, воспроизведение) настройки подменяются только в памяти
+        if self.headless:
+            return
+
         # Обновляем значение чувствительности в настройках перед сохранением
         self.settings['sensitivity'] = self.mouse_sensitivity
         
-        try:
-            with open('settings.json', 'w') as f:
-                json.dump(self.settings, f, indent=4)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        # Частые изменения (ползунок громкости) сливаются в одну фоновую запись
+        self.settings_store.save(self.settings)
 
     def show_main_menu(self):
         """Called by splash screen when it's done"""
@@ -2296,5 +2141,28 @@ class Game(ShowBase):
 
         
 if __name__ == "__main__":
-    game = Game()
+    import argparse
+    parser = argparse.ArgumentParser(description="Aim Trainer")
+    parser.add_argument('--record', nargs='?', const='recordings', metavar='DIR',
+                        help="записывать каждую игру в папку (по умолчанию recordings)")
+    parser.add_argument('--event-log', default='event_logs', metavar='DIR',
+                        help="папка журналов выстрелов и попаданий (по умолчанию event_logs)")
+    parser.add_argument('--no-event-log', action='store_true', help="не вести журнал событий")
+    parser.add_argument('--playback', metavar='FILE',
+                        help="воспроизвести запись без окна и сравнить счет с записанным")
+    args = parser.parse_args()
+
+    if args.playback:
+        game = Game(headless=True)
+        result = SessionPlayer(game, args.playback).run()
+        print(f"Playback: {result['frames']} frames, score {result['score']}, {result['hits']} hits, "
+              f"{result['session_s']:.1f} s of play in {result['playback_s']:.1f} s ({result['speedup']:.1f}x)")
+        if result['match'] is None:
+            print("Recording has no summary to compare with")
+        else:
+            print(f"Recorded score {result['recorded_score']}, {result['recorded_hits']} hits: "
+                  f"{'MATCH' if result['match'] else 'MISMATCH'}")
+        sys.exit(0 if result['match'] is not False else 1)
+
+    game = Game(record_dir=args.record, event_log_dir=None if args.no_event_log else args.event_log)
     game.run()
@@ -0,0 +1,279 @@
+from panda3d.core import NodePath, PandaNode, CollisionNode, CollisionPolygon, BitMask32, Point3
+from panda3d.core import GeomVertexReader, Filename, Loader, LoaderOptions
+import numpy as np
+import hashlib
+import glob
+import os
+import time
+
+# Маска геометрии карты; сфера игрока сталкивается с картой и манекенами
+MAP_MASK = BitMask32.bit(2)
+
+# Версия формата кэша: меняется при изменении сборки, чтобы старые .bam не читались
+BUILD_VERSION = 1
+
+
+def extract_triangles(model):
+    """Все треугольники видимой геометрии модели в ее координатах, массив (T, 3, 3)"""
+    triangles = []
+    for geom_np in model.findAllMatches('**/+GeomNode'):
+        mat = geom_np.getMat(model)
+        geom_node = geom_np.node()
+        for i in range(geom_node.getNumGeoms()):
+            geom = geom_node.getGeom(i).decompose()
+            reader = GeomVertexReader(geom.getVertexData(), 'vertex')
+            for primitive in geom.getPrimitives():
+                vertices = primitive.getVertexList()
+                for first in range(0, len(vertices) - 2, 3):
+                    triangle = []
+                    for index in vertices[first:first + 3]:
+                        reader.setRow(index)
+                        point = mat.xformPoint(reader.getData3())
+                        triangle.append((point.x, point.y, point.z))
+                    triangles.append(triangle)
+    return np.array(triangles, dtype=np.float64).reshape(-1, 3, 3)
+
+
+def simplify(triangles, min_area=1e-6, plane_tolerance=1e-4):
+    """Убирает вырожденные и повторяющиеся треугольники и склеивает пары в четырехугольники.
+
+    Возвращает список выпуклых многоугольников (списков точек). Полигоны из
+    egg после decompose распадаются на треугольники - пары с общим ребром в
+    одной плоскости снова становятся одним CollisionPolygon.
+    """
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    areas = np.linalg.norm(normals, axis=1) / 2
+    keep = areas > min_area
+    triangles = triangles[keep]
+    normals = normals[keep] / (areas[keep, None] * 2)
+
+    # Один и тот же треугольник (в любом порядке вершин) оставляем один раз
+    rounded = [[tuple(point) for point in triangle] for triangle in np.round(triangles, 5)]
+    seen = set()
+    unique = []
+    for i, triangle in enumerate(rounded):
+        key = tuple(sorted(triangle))
+        if key not in seen:
+            seen.add(key)
+            unique.append(i)
+    triangles = triangles[unique]
+    normals = normals[unique]
+    rounded = [rounded[i] for i in unique]
+
+    # Ребро (a, b) -> треугольники, у которых оно идет в этом направлении
+    edges = {}
+    for i, triangle in enumerate(rounded):
+        for k in range(3):
+            edges.setdefault((triangle[k], triangle[(k + 1) % 3]), []).append((i, k))
+
+    polygons = []
+    used = np.zeros(len(triangles), dtype=bool)
+    for i, triangle in enumerate(rounded):
+        if used[i]:
+            continue
+        used[i] = True
+        polygon = list(triangles[i])
+        for k in range(3):
+            # У соседа с той же ориентацией общее ребро идет в обратную сторону
+            edge = (triangle[(k + 1) % 3], triangle[k])
+            for j, m in edges.get(edge, []):
+                if used[j] or np.dot(normals[i], normals[j]) < 1 - plane_tolerance:
+                    continue
+                # Вершина соседа напротив общего ребра встает между k и k + 1
+                opposite = triangles[j][(m + 2) % 3]
+                quad = polygon[:k + 1] + [opposite] + polygon[k + 1:]
+                if is_convex(quad, normals[i]):
+                    polygon = quad
+                    used[j] = True
+                    break
+            if len(polygon) == 4:
+                break
+        polygons.append(polygon)
+    return polygons
+
+
+def is_convex(points, normal):
+    count = len(points)
+    for i in range(count):
+        edge = points[(i + 1) % count] - points[i]
+        following = points[(i + 2) % count] - points[(i + 1) % count]
+        if np.dot(np.cross(edge, following), normal) <= 0:
+            return False
+    return True
+
+
+def build_bvh(polygons, leaf_size=8, name='map_collision'):
+    """Раскладывает полигоны по дереву узлов (BVH).
+
+    Узлы делятся пополам по самой длинной оси центров полигонов. Листья -
+    CollisionNode с не больше чем leaf_size полигонами. Traverser Panda3D сам
+    отсекает поддеревья по bounding volume узлов, поэтому сфера игрока
+    проверяется только против полигонов рядом с ней.
+    """
+    root = NodePath(PandaNode(name))
+    centers = np.array([np.mean(polygon, axis=0) for polygon in polygons]).reshape(-1, 3)
+    build_bvh_node(root, polygons, centers, np.arange(len(polygons)), leaf_size)
+    return root
+
+
+def build_bvh_node(parent, polygons, centers, indices, leaf_size, depth=0):
+    if len(indices) <= leaf_size:
+        node = CollisionNode(f'map_leaf_{depth}')
+        for index in indices:
+            node.addSolid(CollisionPolygon(*[Point3(*point) for point in polygons[index]]))
+        node.setIntoCollideMask(MAP_MASK)
+        node.setFromCollideMask(BitMask32.allOff())
+        parent.attachNewNode(node)
+        return
+
+    spread = centers[indices].max(axis=0) - centers[indices].min(axis=0)
+    axis = int(np.argmax(spread))
+    order = indices[np.argsort(centers[indices, axis], kind='stable')]
+    middle = len(order) // 2
+    for half in (order[:middle], order[middle:]):
+        child = parent.attachNewNode(f'map_bvh_{depth + 1}')
+        build_bvh_node(child, polygons, centers, half, leaf_size, depth + 1)
+
+
+def egg_checksum(egg_path):
+    sha1 = hashlib.sha1(f"v{BUILD_VERSION}".encode())
+    with open(egg_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_cache_path(egg_path, checksum):
+    stem, _ = os.path.splitext(egg_path)
+    return f"{stem}.collision.{checksum[:16]}.bam"
+
+
+def load_map_collision(egg_path, model, leaf_size=8):
+    """Возвращает BVH коллизий карты, собирая его только при изменении egg.
+
+    Результат хранится рядом с egg в .bam, имя которого содержит sha1
+    исходника, поэтому измененная карта пересобирается автоматически.
+    """
+    checksum = egg_checksum(egg_path)
+    cache_path = get_cache_path(egg_path, checksum)
+
+    if os.path.exists(cache_path):
+        options = LoaderOptions(LoaderOptions.LFNoCache)
+        node = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(cache_path), options)
+        if node is not None:
+            return NodePath(node)
+        print(f"Ошибка чтения кэша коллизий карты: {cache_path}")
+
+    started = time.perf_counter()
+    triangles = extract_triangles(model)
+    polygons = simplify(triangles)
+    collision = build_bvh(polygons, leaf_size)
+    print(f"Built map collision: {len(triangles)} triangles -> {len(polygons)} polygons "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # Старые кэши этой карты больше не нужны
+    stem, _ = os.path.splitext(egg_path)
+    for old_path in glob.glob(f"{glob.escape(stem)}.collision.*.bam"):
+        if old_path != cache_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    if not collision.writeBamFile(Filename.fromOsSpecific(cache_path)):
+        print(f"Ошибка записи кэша коллизий карты: {cache_path}")
+    return collision
+
+
+class CollisionCost:
+    """Время обхода self.cTrav за кадр.
+
+    ShowBase обходит cTrav в задаче collisionLoop (sort 30); две задачи
+    с sort 29 и 31 засекают время вокруг нее.
+    """
+
+    def __init__(self, task_mgr, window=120):
+        self.task_mgr = task_mgr
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.started = 0.0
+        self.tasks = [
+            task_mgr.add(self.start, 'collision_cost_start', sort=29),
+            task_mgr.add(self.stop, 'collision_cost_stop', sort=31)
+        ]
+
+    def start(self, task):
+        self.started = time.perf_counter()
+        return task.cont
+
+    def stop(self, task):
+        self.samples[self.count % len(self.samples)] = (time.perf_counter() - self.started) * 1000
+        self.count += 1
+        return task.cont
+
+    def get_average_ms(self):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        return float(filled.mean()) if len(filled) else 0.0
+
+    def get_max_ms(self):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        return float(filled.max()) if len(filled) else 0.0
+
+    def destroy(self):
+        for task in self.tasks:
+            self.task_mgr.remove(task)
+        self.tasks = []
+
+
+if __name__ == "__main__":
+    # Бенчмарк: обход сферы игрока против BVH и против одного плоского узла
+    from panda3d.core import CollisionTraverser, CollisionHandlerQueue, CollisionSphere
+    import random
+
+    def make_arena(boxes, rng):
+        """Случайная арена из боксов (по 12 треугольников)"""
+        corners = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+        faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+        triangles = []
+        for _ in range(boxes):
+            size = np.array([rng.uniform(0.5, 4), rng.uniform(0.5, 4), rng.uniform(0.5, 6)])
+            offset = np.array([rng.uniform(-100, 100), rng.uniform(-100, 100), 0])
+            points = corners * size + offset
+            for a, b, c, d in faces:
+                triangles.append((points[a], points[b], points[c]))
+                triangles.append((points[a], points[c], points[d]))
+        return np.array(triangles)
+
+    def flat_node(polygons):
+        root = NodePath('flat')
+        node = CollisionNode('flat_map')
+        for polygon in polygons:
+            node.addSolid(CollisionPolygon(*[Point3(*point) for point in polygon]))
+        node.setIntoCollideMask(MAP_MASK)
+        root.attachNewNode(node)
+        return root
+
+    def traverse_ms(scene, frames=200):
+        player = CollisionNode('player')
+        player.addSolid(CollisionSphere(0, 0, 0, 1.0))
+        player.setFromCollideMask(MAP_MASK)
+        player_np = scene.attachNewNode(player)
+        traverser = CollisionTraverser('bench')
+        traverser.addCollider(player_np, CollisionHandlerQueue())
+        rng = random.Random(1)
+        started = time.perf_counter()
+        for _ in range(frames):
+            player_np.setPos(rng.uniform(-100, 100), rng.uniform(-100, 100), 1.8)
+            traverser.traverse(scene)
+        elapsed = (time.perf_counter() - started) / frames * 1000
+        player_np.removeNode()
+        return elapsed
+
+    print(f"{'triangles':>10} {'polygons':>9} {'build ms':>9} {'flat ms':>9} {'bvh ms':>9}")
+    for boxes in (3, 100, 1000):
+        triangles = make_arena(boxes, random.Random(0))
+        started = time.perf_counter()
+        polygons = simplify(triangles)
+        bvh = build_bvh(polygons)
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f"{len(triangles):>10} {len(polygons):>9} {build_ms:>9.1f} "
+              f"{traverse_ms(flat_node(polygons)):>9.3f} {traverse_ms(bvh):>9.3f}")
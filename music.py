@@ -0,0 +1,253 @@
+import math
+import os
+import time
+
+# Форматы, которые умеет проигрывать звуковой менеджер Panda3D
+MUSIC_EXTENSIONS = ('.mp3', '.ogg', '.wav', '.flac')
+
+
+class MusicPlayer:
+    """Фоновая музыка: загрузка в фоне, упреждающая загрузка и кроссфейд.
+
+    Треки загружаются через loader.loadMusic(..., callback=...): файл
+    открывается и декодируется потоком загрузчика Panda3D, а большие файлы
+    менеджер OpenAL и так читает потоково. Пока новый трек грузится, старый
+    продолжает играть; когда он готов, задача music_player плавно меняет
+    громкость обоих без пауз. Следующий трек плейлиста загружается заранее.
+    """
+
+    def __init__(self, game, music_dir="music", crossfade_time=2.0):
+        self.game = game
+        self.music_dir = music_dir
+        self.crossfade_time = crossfade_time
+        self.volume = 0.5
+
+        self.playlist = []
+        # Текущий трек: {'name', 'sound'}
+        self.current = None
+        # Затухающие звуки: {'sound', 'start_volume', 'elapsed'}
+        self.fading_out = []
+        # Нарастание текущего трека
+        self.fade_in_elapsed = None
+        # Имя трека -> загруженный звук
+        self.loaded = {}
+        # Имя трека -> время начала фоновой загрузки
+        self.loading = {}
+        # Трек, который нужно включить, как только он загрузится
+        self.wanted = None
+
+        self.last_time = globalClock.getRealTime()
+        # Стоимость работы плеера в основном потоке за кадр (мс)
+        self.frame_cost = 0.0
+        self.max_frame_cost = 0.0
+        self.load_times = []
+        self.task = game.taskMgr.add(self.update, 'music_player')
+
+    @staticmethod
+    def list_tracks(music_dir):
+        """Файлы музыки в папке, по алфавиту"""
+        try:
+            names = os.listdir(music_dir)
+        except OSError:
+            return []
+        return sorted(name for name in names if name.lower().endswith(MUSIC_EXTENSIONS))
+
+    def set_playlist(self, tracks):
+        self.playlist = list(tracks)
+
+    def get_track_path(self, track_name):
+        return f"{self.music_dir}/{track_name}"
+
+    def get_current_track(self):
+        return self.current['name'] if self.current else None
+
+    def next_track(self, track_name):
+        """Трек плейлиста после track_name (по кругу)"""
+        if not self.playlist:
+            return None
+        if track_name not in self.playlist:
+            return self.playlist[0]
+        return self.playlist[(self.playlist.index(track_name) + 1) % len(self.playlist)]
+
+    def prefetch(self, track_name):
+        """Загружает трек в фоне, не начиная воспроизведение"""
+        if not track_name or track_name in self.loaded or track_name in self.loading:
+            return
+        self.loading[track_name] = time.perf_counter()
+        try:
+            self.game.loader.loadMusic(
+                self.get_track_path(track_name),
+                callback=self.on_loaded,
+                extraArgs=[track_name]
+            )
+        except Exception as e:
+            self.loading.pop(track_name, None)
+            print(f"Error loading music: {e}")
+
+    def on_loaded(self, sound, track_name):
+        started = time.perf_counter()
+        requested = self.loading.pop(track_name, None)
+        if requested is not None:
+            self.load_times.append(started - requested)
+        if not sound:
+            print(f"Error loading music: {self.get_track_path(track_name)}")
+            if self.wanted == track_name:
+                self.wanted = None
+        else:
+            self.loaded[track_name] = sound
+            if self.wanted == track_name:
+                self.start(track_name)
+        self.frame_cost += (time.perf_counter() - started) * 1000
+
+    def play(self, track_name, volume=None):
+        """Включает трек; текущий играет, пока новый не загрузится"""
+        started = time.perf_counter()
+        if volume is not None:
+            self.set_volume(volume)
+        if self.current and self.current['name'] == track_name:
+            self.wanted = None
+        elif track_name in self.loaded:
+            self.start(track_name)
+        else:
+            self.wanted = track_name
+            self.prefetch(track_name)
+        self.frame_cost += (time.perf_counter() - started) * 1000
+
+    def start(self, track_name):
+        """Запускает загруженный трек и кроссфейд с предыдущим"""
+        self.wanted = None
+        sound = self.loaded[track_name]
+        if self.current:
+            self.fading_out.append({
+                'sound': self.current['sound'],
+                'start_volume': self.current['sound'].getVolume(),
+                'elapsed': 0.0
+            })
+        # Звук мог еще доигрывать затухание - забираем его обратно
+        self.fading_out = [fade for fade in self.fading_out if fade['sound'] is not sound]
+
+        # Один трек крутится по кругу, иначе плейлист переходит дальше сам
+        sound.setLoop(len(self.playlist) <= 1)
+        sound.setVolume(0.0 if self.current else self.volume)
+        sound.play()
+        self.fade_in_elapsed = 0.0 if self.current else None
+        self.current = {'name': track_name, 'sound': sound}
+
+        # Держим в памяти только текущий и следующий треки
+        following = self.next_track(track_name)
+        for name in list(self.loaded):
+            if name not in (track_name, following) and not any(
+                    fade['sound'] is self.loaded[name] for fade in self.fading_out):
+                del self.loaded[name]
+        self.prefetch(following)
+
+    def stop(self, fade=True):
+        self.wanted = None
+        if not self.current:
+            return
+        sound = self.current['sound']
+        self.current = None
+        self.fade_in_elapsed = None
+        if fade:
+            self.fading_out.append({'sound': sound, 'start_volume': sound.getVolume(), 'elapsed': 0.0})
+        else:
+            sound.stop()
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.current and self.fade_in_elapsed is None:
+            self.current['sound'].setVolume(volume)
+
+    def update(self, task):
+        started = time.perf_counter()
+        # Кроссфейд идет в реальном времени, замедление времени его не тянет
+        now = globalClock.getRealTime()
+        dt = now - self.last_time
+        self.last_time = now
+
+        for fade in list(self.fading_out):
+            fade['elapsed'] += dt
+            progress = min(1.0, fade['elapsed'] / self.crossfade_time)
+            if progress >= 1.0:
+                fade['sound'].stop()
+                self.fading_out.remove(fade)
+            else:
+                # Равная мощность: cos/sin, чтобы в середине не было провала
+                fade['sound'].setVolume(fade['start_volume'] * math.cos(progress * math.pi / 2))
+
+        if self.current and self.fade_in_elapsed is not None:
+            self.fade_in_elapsed += dt
+            progress = min(1.0, self.fade_in_elapsed / self.crossfade_time)
+            self.current['sound'].setVolume(self.volume * math.sin(progress * math.pi / 2))
+            if progress >= 1.0:
+                self.fade_in_elapsed = None
+
+        # Плейлист: заранее начинаем следующий трек, чтобы кроссфейд закончился к концу текущего
+        if self.current and len(self.playlist) > 1 and self.wanted is None:
+            sound = self.current['sound']
+            remaining = sound.length() - sound.getTime()
+            # Без звукового устройства длина 0 - переключать нечего
+            if sound.length() > 0 and remaining <= self.crossfade_time:
+                following = self.next_track(self.current['name'])
+                if following in self.loaded:
+                    self.start(following)
+                else:
+                    self.play(following)
+
+        self.frame_cost += (time.perf_counter() - started) * 1000
+        self.max_frame_cost = max(self.max_frame_cost, self.frame_cost)
+        self.frame_cost = 0.0
+        return task.cont
+
+    def get_stats(self):
+        return {
+            'current': self.get_current_track(),
+            'loaded': sorted(self.loaded),
+            'loading': sorted(self.loading),
+            'fading': len(self.fading_out),
+            'max_frame_cost_ms': self.max_frame_cost,
+            'avg_load_ms': sum(self.load_times) / len(self.load_times) * 1000 if self.load_times else 0.0
+        }
+
+    def destroy(self):
+        self.stop(fade=False)
+        for fade in self.fading_out:
+            fade['sound'].stop()
+        self.fading_out.clear()
+        self.loaded.clear()
+        self.game.taskMgr.remove(self.task)
+
+
+if __name__ == "__main__":
+    # Бенчмарк: самый долгий кадр при смене трека - синхронная загрузка против плеера
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData('', 'window-type none')
+    from direct.showbase.ShowBase import ShowBase
+
+    base = ShowBase()
+    music_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "music")
+    tracks = MusicPlayer.list_tracks(music_dir)
+
+    def longest_frame(frames, action=None):
+        longest = 0.0
+        for frame in range(frames):
+            started = time.perf_counter()
+            if frame == 0 and action:
+                action()
+            base.taskMgr.step()
+            longest = max(longest, time.perf_counter() - started)
+            time.sleep(0.005)
+        return longest * 1000
+
+    for track in tracks:
+        path = os.path.join(music_dir, track)
+        sync_ms = longest_frame(20, lambda: base.loader.loadMusic(path).play())
+        print(f"{track}: synchronous loadMusic frame {sync_ms:.2f} ms")
+
+    player = MusicPlayer(base, music_dir=music_dir, crossfade_time=0.5)
+    player.set_playlist(tracks)
+    for track in tracks:
+        player.max_frame_cost = 0.0
+        frame_ms = longest_frame(200, lambda: player.play(track))
+        print(f"{track}: MusicPlayer longest frame {frame_ms:.2f} ms, "
+              f"player main-thread cost {player.max_frame_cost:.3f} ms, stats {player.get_stats()}")
@@ -0,0 +1,276 @@
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from event_log import (EVENT_DTYPE, EVENT_HIT, EVENT_KILL, EVENT_SHOT, EVENT_SPAWN, HEADER, MAGIC, ZONES,
+                       load_event_log)
+
+HEAD_ZONE = ZONES.index('target_head')
+# Корзины времени (с) для убийств и флик-шотов: от 10 мс до 100 с по логарифмической шкале.
+# Гистограммы складываются между файлами и процессами, перцентили берутся из суммы
+TIME_BINS = np.logspace(-2, 2, 161)
+
+
+def new_weapon_stats():
+    return {
+        'shots': 0,
+        'hits': np.zeros(len(ZONES), dtype=np.int64),
+        'ttk': np.zeros(len(TIME_BINS) - 1, dtype=np.int64),
+        'flick': np.zeros(len(TIME_BINS) - 1, dtype=np.int64)
+    }
+
+
+def time_histogram(values):
+    counts, _ = np.histogram(np.clip(values, TIME_BINS[0], TIME_BINS[-1]), TIME_BINS)
+    return counts
+
+
+def analyze_file(path):
+    """Счетчики одного журнала по оружию: {имя: new_weapon_stats()} или None, если файл не читается.
+
+    Все проходы векторные, по столбцам записей из memmap:
+    - точность - bincount выстрелов и попаданий (оружие x зона);
+    - время убийства - от спавна манекена до его убийства: записи спавнов и
+      убийств сортируются по (манекен, порядок в файле), убийство берет
+      спавн из предыдущей строки;
+    - флик - от прошлого убийства до следующего попадания (перенос прицела
+      на новый манекен), прошлое убийство ищется searchsorted.
+    """
+    try:
+        info, records = load_event_log(path)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+    if info['zones'] != list(ZONES):
+        print(f"Skipping {path}: unknown hit zones {info['zones']}")
+        return None
+
+    weapons = info['weapons']
+    kind = np.asarray(records['kind'])
+    weapon = np.asarray(records['weapon']).astype(np.int64)
+    times = np.asarray(records['time'])
+    slots = len(weapons) + 1  # Последний слот - неизвестное оружие (255)
+    weapon = np.minimum(weapon, len(weapons))
+
+    shot_counts = np.bincount(weapon[kind == EVENT_SHOT], minlength=slots)
+    is_hit = kind == EVENT_HIT
+    zone = np.asarray(records['zone']).astype(np.int64)
+    hit_counts = np.bincount(weapon[is_hit] * len(ZONES) + zone[is_hit],
+                             minlength=slots * len(ZONES)).reshape(slots, len(ZONES))
+
+    # Время убийства: спавн и убийство одного манекена идут подряд после сортировки
+    lifecycle = np.flatnonzero((kind == EVENT_SPAWN) | (kind == EVENT_KILL))
+    order = lifecycle[np.lexsort((lifecycle, np.asarray(records['target'])[lifecycle]))]
+    kills = np.flatnonzero((kind[order[1:]] == EVENT_KILL) & (kind[order[:-1]] == EVENT_SPAWN)
+                           & (records['target'][order[1:]] == records['target'][order[:-1]])) + 1
+    ttk = times[order[kills]] - times[order[kills - 1]]
+    ttk_weapon = weapon[order[kills]]
+
+    # Флик: попадание после последнего убийства раньше него
+    kill_times = times[kind == EVENT_KILL]
+    hit_times = times[is_hit]
+    previous = np.searchsorted(kill_times, hit_times, side='left') - 1
+    has_previous = previous >= 0
+    flick = hit_times[has_previous] - kill_times[previous[has_previous]]
+    flick_weapon = weapon[is_hit][has_previous]
+
+    stats = {}
+    for index in range(slots):
+        name = weapons[index] if index < len(weapons) else 'unknown'
+        if not shot_counts[index] and not hit_counts[index].any():
+            continue
+        stats[name] = {
+            'shots': int(shot_counts[index]),
+            'hits': hit_counts[index],
+            'ttk': time_histogram(ttk[ttk_weapon == index]),
+            'flick': time_histogram(flick[flick_weapon == index])
+        }
+    return stats
+
+
+def merge(total, stats):
+    for name, weapon_stats in stats.items():
+        target = total.setdefault(name, new_weapon_stats())
+        for key, value in weapon_stats.items():
+            target[key] = target[key] + value
+    return total
+
+
+def analyze(paths, processes=None, chunksize=4):
+    """Счетчики по всем файлам; файлы делятся между процессами, результаты складываются"""
+    total = {}
+    files = 0
+    if processes == 1 or len(paths) < 2:
+        results = map(analyze_file, paths)
+        for stats in results:
+            if stats is not None:
+                merge(total, stats)
+                files += 1
+        return total, files
+    with Pool(processes) as pool:
+        for stats in pool.imap_unordered(analyze_file, paths, chunksize):
+            if stats is not None:
+                merge(total, stats)
+                files += 1
+    return total, files
+
+
+def histogram_percentiles(counts, percentiles=(50, 90, 99)):
+    """Перцентили по гистограмме TIME_BINS (середина корзины в логарифмической шкале), с"""
+    total = counts.sum()
+    if not total:
+        return {f"p{p}": None for p in percentiles}
+    cumulative = np.cumsum(counts)
+    result = {}
+    for p in percentiles:
+        index = int(np.searchsorted(cumulative, total * p / 100))
+        result[f"p{p}"] = float(np.sqrt(TIME_BINS[index] * TIME_BINS[index + 1]))
+    return result
+
+
+def summarize(total, files):
+    """Отчет: точность, доля по зонам, хедшоты, время убийства и флика по оружию и в целом"""
+    report = {'files': files, 'weapons': {}}
+    rows = list(total.items())
+    if total:
+        rows.append(('all', {key: sum(stats[key] for stats in total.values()) for key in new_weapon_stats()}))
+    for name, stats in rows:
+        hits = int(stats['hits'].sum())
+        entry = {
+            'shots': int(stats['shots']),
+            'hits': hits,
+            'accuracy': hits / stats['shots'] if stats['shots'] else None,
+            'headshot_rate': int(stats['hits'][HEAD_ZONE]) / hits if hits else None,
+            'zones': {zone: {'hits': int(count), 'share': int(count) / hits if hits else 0.0}
+                      for zone, count in zip(ZONES[1:], stats['hits'][1:])},
+            'kills_timed': int(stats['ttk'].sum()),
+            'ttk_s': histogram_percentiles(stats['ttk']),
+            'flick_s': histogram_percentiles(stats['flick'])
+        }
+        if name == 'all':
+            report['overall'] = entry
+        else:
+            report['weapons'][name] = entry
+    return report
+
+
+def find_logs(paths):
+    """Журналы .evlog из списка файлов и папок"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.evlog')))
+        else:
+            found.append(path)
+    return found
+
+
+def write_synthetic_session(path, shots, seed, weapons=('pistol', 'rifle', 'sniper', 'dual_revolvers', 'shotgun'),
+                            targets=10):
+    """Журнал сессии со случайной стрельбой того же формата, что пишет EventLog"""
+    rng = np.random.default_rng(seed)
+    shot_times = np.cumsum(rng.exponential(0.25, shots))
+    shot_weapon = (np.arange(shots) // 600 + seed) % len(weapons)
+    accuracy = np.linspace(0.35, 0.65, len(weapons))[shot_weapon]
+    hit = rng.random(shots) < accuracy
+    hit_times = shot_times[hit]
+    hit_targets = np.arange(hit.sum()) % targets
+    hit_zones = rng.choice(np.arange(1, len(ZONES)), size=hit.sum(), p=[0.15, 0.45, 0.1, 0.1, 0.2])
+
+    # Выстрелы, попадания с убийствами и спавны манекенов (на старте и после убийства)
+    records = np.zeros(targets + shots + 3 * len(hit_times), dtype=EVENT_DTYPE)
+    start = 0
+    for kind, times, weapon, target, zone in (
+            (EVENT_SPAWN, np.zeros(targets), np.zeros(targets, dtype=int), np.arange(targets), 0),
+            (EVENT_SHOT, shot_times, shot_weapon, -1, 0),
+            (EVENT_HIT, hit_times, shot_weapon[hit], hit_targets, hit_zones),
+            (EVENT_KILL, hit_times, shot_weapon[hit], hit_targets, 0),
+            (EVENT_SPAWN, hit_times + rng.uniform(0.5, 2.0, len(hit_times)), shot_weapon[hit], hit_targets, 0)):
+        part = records[start:start + len(times)]
+        part['kind'] = kind
+        part['time'] = times
+        part['weapon'] = weapon
+        part['target'] = target
+        part['zone'] = zone
+        part['damage'] = 60 if kind in (EVENT_HIT, EVENT_KILL) else 0
+        start += len(times)
+    # Порядок в файле - по времени; при равном времени попадание раньше убийства
+    records = records[np.lexsort((records['kind'], records['time']))]
+    records['frame'] = (records['time'] * 60).astype(np.uint32)
+
+    info = json.dumps({'seed': seed, 'weapons': list(weapons), 'zones': list(ZONES), 'synthetic': True}).encode()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, EVENT_DTYPE.itemsize, len(info)) + info)
+        records.tofile(f)
+    return len(records)
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def format_share(value):
+    return "    -" if value is None else f"{value * 100:5.1f}%"
+
+
+def print_report(report):
+    print(f"{report['files']} sessions")
+    for name, entry in list(report['weapons'].items()) + [('all', report.get('overall'))]:
+        if entry is None:
+            continue
+        print(f"  {name:<15} {entry['shots']:>9} shots, accuracy {format_share(entry['accuracy'])}, "
+              f"headshots {format_share(entry['headshot_rate'])}, "
+              f"ttk p50 {format_seconds(entry['ttk_s']['p50'])} s, "
+              f"flick p50/p90 {format_seconds(entry['flick_s']['p50'])}/{format_seconds(entry['flick_s']['p90'])} s")
+
+
+if __name__ == "__main__":
+    # python session_analytics.py event_logs --processes 4 --output analytics.json
+    # python session_analytics.py --synthetic 4000000 --files 40   (бенчмарк пропускной способности)
+    import argparse
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Vectorized analytics over session event logs")
+    parser.add_argument('paths', nargs='*', default=['event_logs'], help="event log files or folders")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--output', help="JSON report path")
+    parser.add_argument('--synthetic', type=int, metavar='SHOTS',
+                        help="benchmark on a generated corpus with this many shots")
+    parser.add_argument('--files', type=int, default=40, help="files in the synthetic corpus")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        directory = tempfile.mkdtemp()
+        try:
+            started = time.perf_counter()
+            records = sum(write_synthetic_session(os.path.join(directory, f"synthetic_{i:04d}.evlog"),
+                                                  args.synthetic // args.files, seed=i)
+                          for i in range(args.files))
+            print(f"Generated {args.files} files, {records} records "
+                  f"({records * EVENT_DTYPE.itemsize / 2 ** 20:.0f} MB) in {time.perf_counter() - started:.1f} s")
+            paths = find_logs([directory])
+            for processes in sorted({1, args.processes or os.cpu_count()}):
+                started = time.perf_counter()
+                total, files = analyze(paths, processes)
+                elapsed = time.perf_counter() - started
+                shots = sum(stats['shots'] for stats in total.values())
+                print(f"{processes} processes: {shots} shots in {elapsed:.2f} s "
+                      f"({shots / elapsed / 1e6:.1f} M shots/s, {records / elapsed / 1e6:.1f} M records/s)")
+            report = summarize(total, files)
+        finally:
+            shutil.rmtree(directory)
+    else:
+        paths = find_logs(args.paths)
+        started = time.perf_counter()
+        report = summarize(*analyze(paths, args.processes))
+        print(f"Analyzed {len(paths)} files in {time.perf_counter() - started:.2f} s")
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Report saved to {args.output}")
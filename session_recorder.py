@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import random
+import struct
+import time
+
+from direct.showbase.DirectObject import DirectObject
+from panda3d.core import ClockObject
+
+# Заголовок: магия, сид, время кадра старта игры и первого записанного кадра,
+# длина JSON с оружием и настройками
+MAGIC = b'AIMREC2\0'
+HEADER = struct.Struct('<8sQddI')
+# Кадр: флаги, число событий, dt и время кадра; дальше поворот и индексы событий.
+# Время кадра пишется целиком: сумма dt при повторе расходится с часами записи в последнем бите
+FRAME = struct.Struct('<BBdd')
+LOOK = struct.Struct('<dd')
+# Итог: счет, число попаданий, sha256 последовательности попаданий
+SUMMARY = struct.Struct('<qI32s')
+
+FLAG_LOOK = 1
+FLAG_HAS_MOUSE = 2
+FLAG_SUMMARY = 0x80
+
+# События ввода, которые влияют на игру; в файле хранится индекс в этом списке
+SESSION_EVENTS = (
+    'w', 'w-up', 's', 's-up', 'a', 'a-up', 'd', 'd-up', 'shift', 'shift-up',
+    'space', '1', '2', '3', '4', '5', 'wheel_up', 'wheel_down',
+    'mouse1', 'mouse1-up', 'mouse3', 'mouse3-up'
+)
+# Настройки, от которых зависит результат; воспроизведение берет их из записи
+GAMEPLAY_SETTINGS = ('spread_enabled', 'recoil_enabled', 'bhop_enabled', 'target_count')
+
+RNG_STREAMS = ('spawn', 'respawn', 'spread', 'recoil', 'effects')
+
+
+class RngStreams:
+    """Отдельный генератор случайных чисел на каждую подсистему.
+
+    Все потоки выводятся из одного сида сессии, поэтому сессию можно
+    повторить, зная только его. Потоки независимы: лишний вызов в эффектах
+    (гильзы, анимации) не сдвигает разброс, отдачу и появление манекенов.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = None
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        for name in RNG_STREAMS:
+            setattr(self, name, random.Random(f"{seed}:{name}"))
+
+
+class SessionLog:
+    """Общее для записи и воспроизведения: номер кадра и отпечаток попаданий"""
+
+    def __init__(self, game):
+        self.game = game
+        self.frame = -1
+        self.hits = 0
+        self.digest = hashlib.sha256()
+
+    def record_hit(self, zone, points, point):
+        """Попадание входит в отпечаток вместе с кадром, зоной, очками и точкой"""
+        self.hits += 1
+        self.digest.update(
+            f"{self.frame}:{zone}:{points}:{point[0]:.4f},{point[1]:.4f},{point[2]:.4f};".encode())
+
+
+class SessionRecorder(SessionLog, DirectObject):
+    """Пишет игровую сессию в компактный бинарный файл.
+
+    На кадр - флаги, dt, суммарный поворот камеры от мыши и индексы
+    событий клавиатуры и мыши. Вместе с сидом и настройками из заголовка
+    этого хватает, чтобы воспроизвести сессию до того же счета.
+    """
+
+    is_playback = False
+
+    def __init__(self, game, path):
+        SessionLog.__init__(self, game)
+        self.path = path
+        self.file = None
+        self.task = None
+        self.current = None
+        self.seed = 0
+        self.start_time = 0.0
+        self.info = None
+        self.bytes_written = 0
+
+    def start(self, seed, weapon, settings):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.seed = seed
+        self.start_time = globalClock.getFrameTime()
+        self.info = json.dumps({'weapon': weapon, 'settings': settings}).encode()
+
+        for index, event in enumerate(SESSION_EVENTS):
+            self.accept(event, self.record_event, [index])
+        # Раньше dataLoop (-50): события и поворот этого кадра пишутся уже в новую запись
+        self.task = self.game.taskMgr.add(self.begin_frame, 'session_recorder', sort=-55)
+
+    def write(self, data):
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def write_header(self):
+        """Заголовок пишется в первом кадре: старт игры мог быть в том же кадре или между кадрами"""
+        self.write(HEADER.pack(MAGIC, self.seed, self.start_time, globalClock.getFrameTime(), len(self.info)) + self.info)
+
+    def begin_frame(self, task):
+        if self.current is not None:
+            self.write_frame(self.current)
+        else:
+            self.write_header()
+        self.frame += 1
+        # Наличие мыши фиксируется на кадр - его же видит shoot при записи и при повторе
+        self.current = {'dt': globalClock.getDt(), 'time': globalClock.getFrameTime(), 'look': None, 'events': [],
+                        'has_mouse': self.window_has_mouse()}
+        return task.cont
+
+    def write_frame(self, record):
+        flags = FLAG_HAS_MOUSE if record['has_mouse'] else 0
+        if record['look'] is not None:
+            flags |= FLAG_LOOK
+        events = record['events'][:255]
+        data = FRAME.pack(flags, len(events), record['dt'], record['time'])
+        if record['look'] is not None:
+            data += LOOK.pack(*record['look'])
+        self.write(data + bytes(events))
+
+    def window_has_mouse(self):
+        """Как Game.has_mouse без записи: без окна мышь считается на месте (ввод от бота)"""
+        watcher = self.game.mouseWatcherNode
+        return self.game.headless or (watcher is not None and watcher.hasMouse())
+
+    def has_mouse(self):
+        if self.current is None:
+            return self.window_has_mouse()
+        return self.current['has_mouse']
+
+    def record_look(self, delta_heading, delta_pitch):
+        if self.current is None:
+            return
+        look = self.current['look'] or (0.0, 0.0)
+        self.current['look'] = (look[0] + delta_heading, look[1] + delta_pitch)
+
+    def record_event(self, index):
+        if self.current is not None:
+            self.current['events'].append(index)
+
+    def stop(self, score):
+        """Дописывает последний кадр и итог, закрывает файл"""
+        if self.file is None:
+            return
+        self.ignoreAll()
+        if self.task is not None:
+            self.game.taskMgr.remove(self.task)
+            self.task = None
+        if self.current is not None:
+            self.write_frame(self.current)
+            self.current = None
+        else:
+            self.write_header()
+        self.write(FRAME.pack(FLAG_SUMMARY, 0, 0.0, 0.0) + SUMMARY.pack(int(score), self.hits, self.digest.digest()))
+        self.file.close()
+        self.file = None
+        print(f"Session recorded: {self.path} ({self.frame + 1} frames, {self.bytes_written} bytes)")
+
+
+def load_session(path):
+    """Читает файл сессии: заголовок, список кадров и итог (или None)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, seed, start_time, first_frame_time, info_size = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a session recording")
+    offset = HEADER.size
+    info = json.loads(data[offset:offset + info_size])
+    offset += info_size
+
+    frames = []
+    summary = None
+    while offset < len(data):
+        flags, event_count, dt, frame_time = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+        if flags & FLAG_SUMMARY:
+            score, hits, digest = SUMMARY.unpack_from(data, offset)
+            summary = {'score': score, 'hits': hits, 'digest': digest}
+            break
+        look = None
+        if flags & FLAG_LOOK:
+            look = LOOK.unpack_from(data, offset)
+            offset += LOOK.size
+        events = data[offset:offset + event_count]
+        offset += event_count
+        frames.append((dt, frame_time, look, events, bool(flags & FLAG_HAS_MOUSE)))
+
+    return {'seed': seed, 'start_time': start_time, 'first_frame_time': first_frame_time, 'weapon': info['weapon'],
+            'settings': info['settings'], 'frames': frames, 'summary': summary}
+
+
+class SessionPlayer(SessionLog):
+    """Воспроизводит записанную сессию с тем же сидом, настройками и вводом.
+
+    Часы переводятся в MSlave: tick() их не двигает, время и dt каждого
+    кадра ставятся ровно те, что были при записи, а не по реальному
+    времени. Поэтому без окна и vsync сессия проигрывается быстрее реальной
+    и дает тот же счет и те же попадания.
+    """
+
+    is_playback = True
+
+    def __init__(self, game, path):
+        SessionLog.__init__(self, game)
+        self.path = path
+        self.session = load_session(path)
+        self.frames = self.session['frames']
+        self.finished = False
+        self.tasks = []
+
+    def start(self):
+        game = self.game
+        session = self.session
+        game.settings.update(session['settings'])
+        game.current_weapon = session['weapon']
+        game.session = self
+
+        # Старт игры и первый кадр получают те же время и dt, что при записи
+        globalClock.setMode(ClockObject.MSlave)
+        globalClock.setFrameTime(session['start_time'])
+        game.start_game(seed=session['seed'])
+        if self.frames:
+            self.set_clock(0)
+
+        self.tasks = [
+            game.taskMgr.add(self.apply_frame, 'session_playback', sort=-55),
+            # Часы переходят на новый кадр в renderFrame задачи igLoop (sort 50) - перед ней
+            # ставим время следующего кадра: задачи doMethodLater будятся по нему до sort -55
+            game.taskMgr.add(self.next_frame, 'session_playback_clock', sort=49)
+        ]
+
+    def apply_frame(self, task):
+        self.frame += 1
+        if self.frame >= len(self.frames):
+            self.finished = True
+            return task.done
+        _, _, look, events, _ = self.frames[self.frame]
+        if look is not None:
+            self.game.apply_look_delta(*look)
+        for index in events:
+            messenger.send(SESSION_EVENTS[index])
+        return task.cont
+
+    def set_clock(self, index):
+        """Время, dt и номер кадра index ровно как при записи (tick() в MSlave их не меняет)"""
+        dt, frame_time = self.frames[index][:2]
+        globalClock.setFrameTime(frame_time)
+        if dt > 0:
+            globalClock.setDt(dt)
+        globalClock.setFrameCount(globalClock.getFrameCount() + 1)
+
+    def next_frame(self, task):
+        if self.frame + 1 < len(self.frames):
+            self.set_clock(self.frame + 1)
+        return task.cont
+
+    def has_mouse(self):
+        if 0 <= self.frame < len(self.frames):
+            return self.frames[self.frame][4]
+        return True
+
+    def run(self):
+        """Проигрывает все кадры; возвращает результат сравнения с записью"""
+        started = time.perf_counter()
+        self.start()
+        # Ровно столько кадров, сколько записано: лишний кадр после последнего изменил бы счет
+        while self.frame + 1 < len(self.frames):
+            self.game.taskMgr.step()
+        self.finished = True
+        elapsed = time.perf_counter() - started
+        for task in self.tasks:
+            self.game.taskMgr.remove(task)
+        return self.get_result(elapsed)
+
+    def get_result(self, elapsed):
+        summary = self.session['summary']
+        session_time = sum(frame[0] for frame in self.frames)
+        result = {
+            'frames': len(self.frames),
+            'score': int(self.game.score),
+            'hits': self.hits,
+            'session_s': session_time,
+            'playback_s': elapsed,
+            'speedup': session_time / elapsed if elapsed else 0.0,
+            'match': None
+        }
+        if summary is not None:
+            result['recorded_score'] = summary['score']
+            result['recorded_hits'] = summary['hits']
+            result['match'] = (summary['score'] == result['score'] and summary['hits'] == self.hits
+                               and summary['digest'] == self.digest.digest())
+        return result
+
+
+if __name__ == "__main__":
+    # Проверка: одинаковый сид дает одинаковые потоки, и потоки не зависят друг от друга
+    first = RngStreams(12345)
+    second = RngStreams(12345)
+    for _ in range(1000):
+        second.effects.random()  # Лишние вызовы в эффектах
+    same = all(first.spread.uniform(-1, 1) == second.spread.uniform(-1, 1) for _ in range(1000))
+    print(f"seed {first.seed}: spread stream unaffected by effects calls: {same}")
+
+    # Размер записи: 60 FPS, мышь каждый кадр, 4 события в секунду
+    import io
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), 'bench.aimrec')
+
+    class FakeClock:
+        def getFrameTime(self):
+            return 0.0
+
+        def getDt(self):
+            return 1 / 60
+
+    class FakeGame:
+        mouseWatcherNode = None
+        taskMgr = None
+        headless = False
+
+    import builtins
+    builtins.globalClock = FakeClock()
+    recorder = SessionRecorder(FakeGame(), path)
+    recorder.file = io.BytesIO()
+    recorder.info = json.dumps({'weapon': 'rifle', 'settings': {}}).encode()
+    for frame in range(60 * 60):
+        recorder.begin_frame(type('Task', (), {'cont': 1}))
+        recorder.record_look(0.3, -0.1)
+        if frame % 15 == 0:
+            recorder.record_event(SESSION_EVENTS.index('mouse1'))
+    recorder.write_frame(recorder.current)
+    print(f"one minute at 60 FPS: {recorder.bytes_written} bytes "
+          f"({recorder.bytes_written / (recorder.frame + 1):.1f} bytes/frame)")
+
+    # Запись -> воспроизведение: бот бенчмарка играет минуту без окна, запись
+    # проигрывается в отдельном процессе (main.py --playback) и должна дать тот же счет
+    import subprocess
+    import sys
+    from benchmark import AimBot, BENCHMARK_SETTINGS, FRAME_DT, START_TIME
+    from main import Game
+
+    game = Game(headless=True, record_dir=tempfile.mkdtemp())
+    for key in BENCHMARK_SETTINGS:
+        game.settings[key] = game.DEFAULT_SETTINGS[key]
+    globalClock.setMode(ClockObject.MNonRealTime)
+    globalClock.setFrameTime(START_TIME)
+    globalClock.setDt(FRAME_DT)
+    game.start_game(seed=7)
+    bot = AimBot(game, 7)
+    bot.start()
+    for _ in range(60 * 60):
+        game.taskMgr.step()
+    session = game.session
+    session.stop(game.score)
+    print(f"recorded score {int(game.score)}, {session.hits} hits")
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    playback = subprocess.run([sys.executable, os.path.join(directory, 'main.py'), '--playback', session.path],
+                              cwd=directory, capture_output=True, text=True)
+    print("\n".join(line for line in playback.stdout.splitlines() if line.startswith(('Playback', 'Recorded'))))
+    if playback.returncode != 0:
+        print("round trip FAILED")
+        sys.exit(1)
+    print("round trip OK")
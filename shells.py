@@ -0,0 +1,263 @@
+from panda3d.core import GeomVertexData, GeomVertexFormat, GeomVertexArrayFormat, GeomTriangles, Geom, GeomNode
+from panda3d.core import InternalName, OmniBoundingVolume
+import numpy as np
+
+# Грани бокса: нормаль и четыре угла (знаки по осям), против часовой снаружи
+BOX_FACES = [
+    ((1, 0, 0), [(1, -1, -1), (1, 1, -1), (1, 1, 1), (1, -1, 1)]),
+    ((-1, 0, 0), [(-1, 1, -1), (-1, -1, -1), (-1, -1, 1), (-1, 1, 1)]),
+    ((0, 1, 0), [(1, 1, -1), (-1, 1, -1), (-1, 1, 1), (1, 1, 1)]),
+    ((0, -1, 0), [(-1, -1, -1), (1, -1, -1), (1, -1, 1), (-1, -1, 1)]),
+    ((0, 0, 1), [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)]),
+    ((0, 0, -1), [(-1, 1, -1), (1, 1, -1), (1, -1, -1), (-1, -1, -1)]),
+]
+
+
+def hpr_to_mats(hpr):
+    """Матрицы поворота (N, 3, 3) из HPR в градусах, как у Panda3D (точка-строка @ матрица)"""
+    h, p, r = np.radians(hpr).T
+    ch, sh, cp, sp, cr, sr = np.cos(h), np.sin(h), np.cos(p), np.sin(p), np.cos(r), np.sin(r)
+    # Roll @ Pitch @ Heading, раскрытое вручную
+    mats = np.empty((len(h), 3, 3))
+    mats[:, 0, 0] = cr * ch - sr * sp * sh
+    mats[:, 0, 1] = cr * sh + sr * sp * ch
+    mats[:, 0, 2] = -sr * cp
+    mats[:, 1, 0] = -cp * sh
+    mats[:, 1, 1] = cp * ch
+    mats[:, 1, 2] = sp
+    mats[:, 2, 0] = sr * ch + cr * sp * sh
+    mats[:, 2, 1] = sr * sh - cr * sp * ch
+    mats[:, 2, 2] = cr * cp
+    return mats
+
+
+class ShellCasings:
+    """Гильзы как система частиц на массивах NumPy.
+
+    Позиции, скорости, углы и скорости вращения всех гильз лежат в массивах
+    фиксированной длины (capacity). Гравитация и пол считаются одной
+    векторной операцией, а все гильзы рисуются одним Geom: у каждой свой
+    слот из 24 вершин. Когда слоты кончаются, новая гильза занимает слот
+    самой старой.
+
+    update() - шаг физики (может вызываться несколько раз за кадр),
+    update_geometry() - запись вершин измененных слотов, раз за кадр.
+    """
+
+    VERTICES_PER_SHELL = 24
+
+    def __init__(self, parent, capacity=256, lifetime=2.0, gravity=-9.8, ground_height=0.0,
+                 half_extents=(0.02, 0.05, 0.02), color=(0.8, 0.6, 0.2, 1)):
+        self.parent = parent
+        self.lifetime = lifetime
+        self.gravity = gravity
+        self.ground_height = ground_height
+        self.color = color
+
+        # Локальные вершины и нормали одной гильзы
+        corners = []
+        normals = []
+        for normal, face in BOX_FACES:
+            corners.extend(face)
+            normals.extend([normal] * 4)
+        self.local_vertices = np.array(corners, dtype=np.float64) * np.array(half_extents)
+        self.local_normals = np.array(normals, dtype=np.float64)
+
+        self.np = None
+        self.set_capacity(capacity)
+
+    def set_capacity(self, capacity):
+        """Пересоздает буферы под новое максимальное число гильз (текущие гильзы пропадают)"""
+        if self.np:
+            self.np.removeNode()
+        self.capacity = max(1, int(capacity))
+        self.next_slot = 0
+
+        self.pos = np.zeros((self.capacity, 3))
+        self.velocity = np.zeros((self.capacity, 3))
+        self.hpr = np.zeros((self.capacity, 3))
+        self.spin = np.zeros((self.capacity, 3))
+        self.age = np.zeros(self.capacity)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        # Гильза еще летит; лежащие на полу не пересчитываются
+        self.moving = np.zeros(self.capacity, dtype=bool)
+        # Слот изменился с прошлой записи вершин
+        self.dirty = np.zeros(self.capacity, dtype=bool)
+
+        vertex_array = GeomVertexArrayFormat()
+        vertex_array.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+        normal_array = GeomVertexArrayFormat()
+        normal_array.addColumn(InternalName.getNormal(), 3, Geom.NT_float32, Geom.C_normal)
+        vertex_format = GeomVertexFormat()
+        vertex_format.addArray(vertex_array)
+        vertex_format.addArray(normal_array)
+        vertex_format = GeomVertexFormat.registerFormat(vertex_format)
+
+        vdata = GeomVertexData('shell_casings', vertex_format, Geom.UHDynamic)
+        vdata.uncleanSetNumRows(self.capacity * self.VERTICES_PER_SHELL)
+        triangles = GeomTriangles(Geom.UHStatic)
+        for slot in range(self.capacity):
+            for face in range(6):
+                base = slot * self.VERTICES_PER_SHELL + face * 4
+                triangles.addVertices(base, base + 1, base + 2)
+                triangles.addVertices(base, base + 2, base + 3)
+        geom = Geom(vdata)
+        geom.addPrimitive(triangles)
+        node = GeomNode('shell_casings')
+        node.addGeom(geom)
+        # Гильзы разлетаются по всей арене, отсекать их нет смысла
+        node.setBounds(OmniBoundingVolume())
+        node.setFinal(True)
+
+        self.np = self.parent.attachNewNode(node)
+        self.np.setColor(*self.color)
+        self.vdata = node.modifyGeom(0).modifyVertexData()
+        self.positions()[:] = 0
+        self.normals()[:] = 0
+
+    def positions(self):
+        array = np.frombuffer(memoryview(self.vdata.modifyArray(0)), dtype=np.float32)
+        return array.reshape(self.capacity, self.VERTICES_PER_SHELL, 3)
+
+    def normals(self):
+        array = np.frombuffer(memoryview(self.vdata.modifyArray(1)), dtype=np.float32)
+        return array.reshape(self.capacity, self.VERTICES_PER_SHELL, 3)
+
+    def spawn(self, pos, hpr, velocity, spin):
+        """Добавляет гильзу; при переполнении вытесняет самую старую"""
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.capacity
+        self.pos[slot] = tuple(pos)
+        self.hpr[slot] = tuple(hpr)
+        self.velocity[slot] = tuple(velocity)
+        self.spin[slot] = tuple(spin)
+        self.age[slot] = 0.0
+        self.alive[slot] = True
+        self.moving[slot] = True
+        self.dirty[slot] = True
+
+    def update(self, dt):
+        """Интегрирует все летящие гильзы одним проходом; вершины не трогает"""
+        if not self.alive.any():
+            return
+
+        self.age[self.alive] += dt
+        expired = np.flatnonzero(self.alive & (self.age >= self.lifetime))
+        if len(expired):
+            self.alive[expired] = False
+            self.moving[expired] = False
+            self.dirty[expired] = True
+
+        moving = np.flatnonzero(self.moving)
+        if len(moving) == 0:
+            return
+
+        self.dirty[moving] = True
+        self.velocity[moving, 2] += self.gravity * dt
+        self.pos[moving] += self.velocity[moving] * dt
+        self.hpr[moving] += self.spin[moving] * dt
+
+        # Пол: гильза останавливается и больше не пересчитывается
+        landed = moving[self.pos[moving, 2] < self.ground_height]
+        if len(landed):
+            self.pos[landed, 2] = self.ground_height
+            self.velocity[landed] = 0
+            self.spin[landed] = 0
+            self.moving[landed] = False
+
+    def update_geometry(self):
+        """Пишет вершины слотов, измененных после прошлого вызова; раз за кадр после шагов физики"""
+        dirty = np.flatnonzero(self.dirty)
+        if len(dirty) == 0:
+            return
+        self.dirty[dirty] = False
+        positions = self.positions()
+
+        # Схлопываем вершины исчезнувших гильз, чтобы слот ничего не рисовал
+        expired = dirty[~self.alive[dirty]]
+        if len(expired):
+            positions[expired] = 0
+
+        live = dirty[self.alive[dirty]]
+        if len(live) == 0:
+            return
+        # Все матрицы поворота в ряд (3, K*3) - одно матричное умножение на все гильзы
+        rotation = hpr_to_mats(self.hpr[live]).transpose(1, 0, 2).reshape(3, -1)
+        vertices = (self.local_vertices @ rotation).reshape(self.VERTICES_PER_SHELL, -1, 3).transpose(1, 0, 2)
+        vertices += self.pos[live, None, :]
+        positions[live] = vertices
+        normals = (self.local_normals @ rotation).reshape(self.VERTICES_PER_SHELL, -1, 3).transpose(1, 0, 2)
+        self.normals()[live] = normals
+
+    def get_live_count(self):
+        return int(self.alive.sum())
+
+    def clear(self):
+        self.alive[:] = False
+        self.moving[:] = False
+        self.dirty[:] = False
+        self.positions()[:] = 0
+
+    def destroy(self):
+        if self.np:
+            self.np.removeNode()
+            self.np = None
+
+
+if __name__ == "__main__":
+    # Бенчмарк: стоимость кадра для списка узлов (старый update_shells) и для массивов
+    from panda3d.core import loadPrcFileData, NodePath, Vec3
+    loadPrcFileData('', 'window-type none')
+    from direct.showbase.ShowBase import ShowBase
+    import random
+    import time
+
+    base = ShowBase()
+    shell_model = base.loader.loadModel("models/box")
+    shell_model.setScale(0.02, 0.05, 0.02)
+    rng = random.Random(0)
+
+    def random_launch():
+        return ((rng.uniform(-1, 1), rng.uniform(-1, 1), 1.5),
+                (rng.uniform(-720, 720), rng.uniform(-720, 720), rng.uniform(-720, 720)))
+
+    def old_frame_ms(count, frames=30, dt=1 / 60):
+        root = NodePath('shells')
+        shells = []
+        for _ in range(count):
+            pos, spin = random_launch()
+            shell = shell_model.copyTo(root)
+            shell.setPos(*pos)
+            shells.append({'model': shell, 'velocity': Vec3(3, 0, 1), 'angular_velocity': Vec3(*spin)})
+        gravity = Vec3(0, 0, -9.8)
+        started = time.perf_counter()
+        for _ in range(frames):
+            for shell in shells:
+                current_pos = shell['model'].getPos()
+                shell['velocity'] += gravity * dt
+                new_pos = current_pos + shell['velocity'] * dt
+                shell['model'].setPos(new_pos)
+                shell['model'].setHpr(shell['model'].getHpr() + shell['angular_velocity'] * dt)
+        elapsed = (time.perf_counter() - started) / frames * 1000
+        root.removeNode()
+        return elapsed
+
+    def array_frame_ms(count, frames=30, dt=1 / 60, steps=1):
+        # steps шагов физики за кадр (как у GameClock при просадке FPS) и одна запись вершин
+        shells = ShellCasings(NodePath('shells'), capacity=count, lifetime=100)
+        for _ in range(count):
+            pos, spin = random_launch()
+            shells.spawn(pos, (0, 0, 0), (3, 0, 1), spin)
+        started = time.perf_counter()
+        for _ in range(frames):
+            for _ in range(steps):
+                shells.update(dt / steps)
+            shells.update_geometry()
+        elapsed = (time.perf_counter() - started) / frames * 1000
+        shells.destroy()
+        return elapsed
+
+    print(f"{'shells':>7} {'node list ms':>13} {'arrays ms':>10} {'8 steps ms':>11}")
+    for count in (10, 100, 1000, 5000):
+        print(f"{count:>7} {old_frame_ms(count):>13.3f} {array_frame_ms(count):>10.3f} "
+              f"{array_frame_ms(count, steps=8):>11.3f}")
@@ -1,17 +1,26 @@
-from panda3d.core import Point3, Vec3, NodePath, CollisionNode, CollisionBox, CollisionSphere, BitMask32
+from panda3d.core import Point3, Vec3, NodePath
 from panda3d.core import TextureStage, Texture, CardMaker
-import random
 import os
 import sys
 import threading
+from image_index import CategoryImageIndex
+from texture_atlas import TextureAtlas, AtlasCardRenderer
+from texture_cache import TextureCache
+from hitbox import HitboxTemplate
 
 class Target:
-    # Кэш для текстур
-    texture_cache = {}
+    # Кэш для текстур (бюджет задается в settings.json: texture_cache_budget_mb)
+    texture_cache = TextureCache(256 * 1024 * 1024)
     # Флаг, указывающий загружена ли категория
     category_loaded = False
     # Текущая загруженная категория
     current_category = None
+    # Индекс изображений по категориям, строится один раз
+    image_index = None
+    # Пачки карточек атласа текущей категории
+    card_renderer = None
+    # Общие для всех манекенов узлы коллизий
+    hitbox_template = None
     
     # Базовые текстуры для обычного режима - манекены без текстур
     TARGET_TEXTURES = []
@@ -39,49 +48,30 @@ class Target:
         # Сразу нормализуем базовый путь
         return Target.normalize_path(base)
     
+    @staticmethod
+    def get_image_index():
+        """Возвращает общий индекс изображений категорий"""
+        if Target.image_index is None:
+            Target.image_index = CategoryImageIndex(Target.get_base_path())
+        return Target.image_index
+
     @staticmethod
     def get_images_from_category(category):
-        # Получаем базовый путь (уже нормализованный)
-        base_path = Target.get_base_path()
-        # Собираем путь к категории, используя прямые слеши
-        category_path = f"{base_path}/images/nsfw/{category}"
-        print(f"Ищем изображения в: {category_path}")
-        
-        # Для проверки существования используем Windows-путь
-        windows_path = category_path
-        if windows_path.startswith('/'):
-            windows_path = windows_path[1].upper() + ':' + windows_path[2:]
-        
-        if not os.path.exists(windows_path):
-            print(f"Путь к категории не существует: {category_path}")
-            # Попробуем поискать в родительской директории
-            parent_path = os.path.dirname(os.path.dirname(base_path))
-            category_path = f"{Target.normalize_path(parent_path)}/images/nsfw/{category}"
-            windows_path = category_path
-            if windows_path.startswith('/'):
-                windows_path = windows_path[1].upper() + ':' + windows_path[2:]
-            
-            print(f"Пробуем альтернативный путь: {category_path}")
-            if not os.path.exists(windows_path):
-                print(f"Альтернативный путь тоже не существует")
-                return []
-            
-        valid_extensions = ['.png', '.jpg', '.jpeg']
-        images = []
-        
-        try:
-            files = os.listdir(windows_path)
-            print(f"Найдено {len(files)} файлов в категории")
-            for file in files:
-                if any(file.lower().endswith(ext) for ext in valid_extensions):
-                    # Создаем путь в формате Panda3D
-                    full_path = f"{category_path}/{file}"
-                    images.append(full_path)
-                    print(f"Добавлено изображение: {full_path}")
-        except Exception as e:
-            print(f"Ошибка при чтении директории {category_path}: {e}")
-                
-        return images if images else []
+        return Target.get_image_index().get_images(category)
+
+    @staticmethod
+    def get_hitbox_template():
+        """Возвращает общий шаблон хитбоксов"""
+        if Target.hitbox_template is None:
+            Target.hitbox_template = HitboxTemplate()
+        return Target.hitbox_template
+
+    @staticmethod
+    def get_streamer(game):
+        """Возвращает фоновый загрузчик текстур, если потоковый режим включен"""
+        if not game.settings.get('texture_streaming', True):
+            return None
+        return getattr(game, 'texture_streamer', None)
 
     @staticmethod
     def preload_category(game, category):
@@ -89,41 +79,193 @@ class Target:
         if Target.current_category == category and Target.category_loaded:
             return
 
+        # Атлас прошлой категории больше не нужен карточкам
+        if Target.current_category is not None:
+            Target.texture_cache.unpin(f"atlas:{Target.current_category}")
         Target.category_loaded = False
         Target.current_category = category
         
         # Очищаем старый кэш
         Target.texture_cache.clear()
+        if Target.card_renderer:
+            Target.card_renderer.destroy()
+            Target.card_renderer = None
+            Target.refresh_textures(game)
         
         # Загружаем текстуры из NSFW категории
         category_images = Target.get_images_from_category(category)
+        streamer = Target.get_streamer(game)
+
+        # Картинки категории пакуются в атлас, карточки рисуются пачками
+        if game.settings.get('texture_atlas', True):
+            paths = [Target.normalize_path(image_path) for image_path in category_images]
+            build_atlas = lambda key: TextureAtlas.build(paths)
+            on_ready = lambda atlas: Target.on_atlas_ready(game, category, atlas)
+            # Атлас используется всеми карточками, пока категория не сменится. Закрепляем
+            # до put(): иначе атлас больше бюджета вытесняется и освобождается сразу при вставке
+            Target.texture_cache.pin(f"atlas:{category}")
+            if streamer:
+                streamer.stream_job(category, f"atlas:{category}", Target.texture_cache, build_atlas, on_ready)
+            else:
+                atlas = build_atlas(category)
+                Target.texture_cache.put(f"atlas:{category}", atlas)
+                on_ready(atlas)
+            Target.category_loaded = True
+            return
+
+        # В потоковом режиме файлы читаются в фоне, манекены ждут с заглушкой
+        if streamer:
+            paths = [Target.normalize_path(image_path) for image_path in category_images]
+            streamer.stream_category(category, paths, Target.texture_cache)
+            Target.category_loaded = True
+            return
+
         for image_path in category_images:
+            # Дальше бюджета кэша заранее не грузим, остальное догрузится по требованию
+            if Target.texture_cache.is_full():
+                break
             try:
                 tex = game.loader.loadTexture(Target.normalize_path(image_path))
                 if tex:
-                    Target.texture_cache[Target.normalize_path(image_path)] = tex
+                    Target.texture_cache.put(Target.normalize_path(image_path), tex, prefetch=True)
             except:
                 print(f"Error preloading texture: {image_path}")
         
         Target.category_loaded = True
         print(f"Preloaded {len(Target.texture_cache)} textures for category: {category}")
 
+    @staticmethod
+    def on_atlas_ready(game, category, atlas):
+        """Создает пачки карточек из готового атласа и переносит на них манекены"""
+        if category != Target.current_category:
+            return
+        print(f"Packed {len(atlas.regions)} textures into {len(atlas.pages)} atlas pages for category: {category}")
+        Target.card_renderer = AtlasCardRenderer(game.render, atlas)
+        Target.refresh_textures(game)
+
+    @staticmethod
+    def refresh_textures(game):
+        """Заново назначает текстуры активным манекенам (атлас появился или исчез)"""
+        if not game.settings.get('show_target_images', True):
+            return
+        for target in getattr(game, 'targets', []):
+            if target.is_active and target.texture_path and not target.model.isEmpty():
+                target.show_texture(target.texture_path)
+                target.update_visibility()
+
     def load_texture(self, texture_path):
         """Загружает текстуру с использованием кэша"""
         normalized_path = Target.normalize_path(texture_path)
         
-        if normalized_path in Target.texture_cache:
-            return Target.texture_cache[normalized_path]
+        tex = Target.texture_cache.get(normalized_path)
+        if tex:
+            return tex
         
         try:
             tex = self.game.loader.loadTexture(normalized_path)
             if tex:
-                Target.texture_cache[normalized_path] = tex
+                Target.texture_cache.put(normalized_path, tex)
                 return tex
         except Exception as e:
             print(f"Ошибка загрузки текстуры {normalized_path}: {e}")
         return None
 
+    def apply_texture(self, tex):
+        """Накладывает текстуру на карточку манекена"""
+        self.visual.setTexture(tex)
+        self.visual.setTransparency(1)  # 1 = M_alpha
+        self.visual.setBin("transparent", 0)
+        self.visual.setDepthWrite(False)
+
+    def pin_texture(self, key):
+        """Закрепляет показанную текстуру, чтобы кэш ее не вытеснил"""
+        if key == self.pinned_texture:
+            return
+        self.unpin_texture()
+        if key is not None:
+            Target.texture_cache.pin(key)
+        self.pinned_texture = key
+
+    def unpin_texture(self):
+        if self.pinned_texture is not None:
+            Target.texture_cache.unpin(self.pinned_texture)
+            self.pinned_texture = None
+
+    def use_atlas_card(self, renderer, normalized_path):
+        """Рисует манекен карточкой из общей пачки вместо собственной"""
+        mat = self.model.getMat(self.game.render)
+        if self.atlas_card and self.atlas_card.renderer is renderer:
+            self.atlas_card = renderer.reassign(self.atlas_card, normalized_path, mat)
+        else:
+            self.release_atlas_card()
+            self.atlas_card = renderer.allocate(normalized_path, mat)
+        if not self.is_active:
+            self.atlas_card.hide()
+        self.visual.hide()
+
+    def release_atlas_card(self):
+        if self.atlas_card:
+            self.atlas_card.release()
+            self.atlas_card = None
+
+    def show_card(self):
+        if self.atlas_card:
+            self.atlas_card.show()
+        else:
+            self.visual.show()
+
+    def hide_card(self):
+        if self.atlas_card:
+            self.atlas_card.hide()
+        else:
+            self.visual.hide()
+
+    def show_texture(self, texture_path):
+        """Показывает текстуру из кэша или заглушку до окончания фоновой загрузки"""
+        renderer = Target.card_renderer
+        normalized_path = Target.normalize_path(texture_path)
+        if renderer and renderer.has_image(normalized_path):
+            self.unpin_texture()
+            self.use_atlas_card(renderer, normalized_path)
+            return
+        self.release_atlas_card()
+
+        streamer = Target.get_streamer(self.game)
+        if not streamer:
+            tex = self.load_texture(texture_path)
+            if tex:
+                self.apply_texture(tex)
+                self.pin_texture(normalized_path)
+            return
+
+        # Атлас еще собирается - ждем его с заглушкой, отдельные файлы не грузим
+        if renderer is None and self.game.settings.get('texture_atlas', True):
+            self.unpin_texture()
+            self.apply_texture(streamer.placeholder)
+            return
+
+        tex = Target.texture_cache.get(normalized_path)
+        if tex:
+            self.apply_texture(tex)
+            self.pin_texture(normalized_path)
+            return
+
+        self.unpin_texture()
+        self.apply_texture(streamer.placeholder)
+        streamer.request(
+            normalized_path,
+            Target.texture_cache,
+            callback=lambda tex: self.on_texture_streamed(texture_path, tex)
+        )
+
+    def on_texture_streamed(self, texture_path, tex):
+        """Подменяет заглушку, когда текстура догрузилась"""
+        # Манекен мог успеть сменить картинку или быть удален
+        if texture_path != self.texture_path or self.model.isEmpty():
+            return
+        self.apply_texture(tex)
+        self.pin_texture(Target.normalize_path(texture_path))
+
     def __init__(self, game, pos):
         self.game = game
         self.position = pos
@@ -131,6 +273,9 @@ class Target:
         self.current_hp = self.max_hp
         self.is_active = True
         self.texture_path = None
+        self.atlas_card = None
+        self.pinned_texture = None
+        self.restore_task = None
         
         # Проверяем режим отображения
         show_images = self.game.settings.get('show_target_images', True)
@@ -140,9 +285,7 @@ class Target:
                 Target.preload_category(game, category)
             
             # Выбираем текстуру из NSFW категории
-            category_images = self.get_images_from_category(category)
-            if category_images:
-                self.texture_path = random.choice(category_images)
+            self.texture_path = Target.get_image_index().random_image(category)
                 
         self.create_model()
         self.update_visibility()
@@ -153,27 +296,22 @@ class Target:
         
         if show_images:
             # Показываем картинку
-            if hasattr(self, 'visual'):
+            if self.atlas_card:
+                self.atlas_card.show()
+            elif hasattr(self, 'visual'):
                 self.visual.show()
                 self.visual.setTransparency(1)
                 self.visual.setColor(1, 1, 1, 1)  # Полностью непрозрачная картинка
-            
-            # Скрываем части манекена
-            for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-                np.setColor(1, 1, 1, 0)  # Полностью прозрачный
         else:
             # Скрываем картинку
-            if hasattr(self, 'visual'):
+            if self.atlas_card:
+                self.atlas_card.hide()
+            elif hasattr(self, 'visual'):
                 self.visual.hide()
-            
-            # Показываем части манекена красным цветом
-            for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-                np.show()
-                np.setColor(0.8, 0.2, 0.2, 1)  # Красный цвет, полностью непрозрачный
-                # Настраиваем прозрачность для правильного отображения
-                np.setTransparency(1)
-                np.setBin("transparent", 0)
-                np.setDepthWrite(True)  # Включаем запись в буфер глубины
+
+        # Части манекена видны красным только без картинок; шаблон общий,
+        # поэтому настройка применяется сразу ко всем манекенам
+        Target.get_hitbox_template().set_debug_visible(not show_images)
 
     def create_model(self):
         # Create root node
@@ -181,6 +319,10 @@ class Target:
         self.model.setPos(self.position)
         self.model.reparentTo(self.game.render)
         
+        # Поворачиваем манекен лицом к игроку до создания карточки:
+        # карточка в атласе пишется сразу в мировых координатах
+        self.face_player()
+        
         # Create visual representation (card with texture)
         cm = CardMaker('card')
         cm.setFrame(-0.8, 0.8, 0, 3.0)  # 1.6x3.0 meters
@@ -189,100 +331,102 @@ class Target:
         # Load and apply texture only if we have one
         if self.texture_path:
             try:
-                tex = self.load_texture(self.texture_path)
-                if tex:
-                    self.visual.setTexture(tex)
-                    self.visual.setTransparency(1)  # 1 = M_alpha
-                    self.visual.setBin("transparent", 0)
-                    self.visual.setDepthWrite(False)
+                self.show_texture(self.texture_path)
             except:
                 print(f"Error loading texture: {self.texture_path}")
         
-        # Create collision geometry
-        # Head (sphere)
-        head_node = CollisionNode('target_head')
-        head_sphere = CollisionSphere(0, 0, 2.6, 0.6)
-        head_node.addSolid(head_sphere)
-        head_node.setIntoCollideMask(BitMask32.bit(1))
-        self.head_np = self.model.attachNewNode(head_node)
-        
-        # Body (box)
-        body_node = CollisionNode('target_body')
-        body_box = CollisionBox(Point3(0, 0, 1.5), 0.7, 0.4, 0.6)
-        body_node.addSolid(body_box)
-        body_node.setIntoCollideMask(BitMask32.bit(1))
-        self.body_np = self.model.attachNewNode(body_node)
-        
-        # Arms (boxes)
-        left_arm_node = CollisionNode('target_left_arm')
-        left_arm_box = CollisionBox(Point3(-1.0, 0, 1.5), 0.3, 0.3, 0.6)
-        left_arm_node.addSolid(left_arm_box)
-        left_arm_node.setIntoCollideMask(BitMask32.bit(1))
-        self.left_arm_np = self.model.attachNewNode(left_arm_node)
-        
-        right_arm_node = CollisionNode('target_right_arm')
-        right_arm_box = CollisionBox(Point3(1.0, 0, 1.5), 0.3, 0.3, 0.6)
-        right_arm_node.addSolid(right_arm_box)
-        right_arm_node.setIntoCollideMask(BitMask32.bit(1))
-        self.right_arm_np = self.model.attachNewNode(right_arm_node)
-        
-        # Legs (box)
-        legs_node = CollisionNode('target_legs')
-        legs_box = CollisionBox(Point3(0, 0, 0.6), 0.7, 0.4, 1.0)
-        legs_node.addSolid(legs_box)
-        legs_node.setIntoCollideMask(BitMask32.bit(1))
-        self.legs_np = self.model.attachNewNode(legs_node)
+        # Подключаем общий шаблон хитбоксов (голова, тело, руки, ноги)
+        self.hitbox_np = Target.get_hitbox_template().instance_to(self.model)
+        self.sync_hit_engine()
         
         # Настраиваем начальную видимость
         self.update_visibility()
-        
-        # Поворачиваем манекен лицом к игроку
-        self.model.lookAt(0, 0, 0)
-        self.model.setH(self.model.getH() + 180)  # Разворачиваем на 180 градусов
 
     def destroy(self):
+        if self.restore_task:
+            taskMgr.remove(self.restore_task)
+            self.restore_task = None
+        self.release_atlas_card()
+        self.unpin_texture()
+        hit_engine = getattr(self.game, 'hit_engine', None)
+        if hit_engine:
+            hit_engine.remove_target(self)
         if hasattr(self, 'model') and self.model:
             self.model.removeNode()
 
     def respawn(self):
         self.is_active = False
         # Скрываем все части манекена и отключаем коллизии
-        self.visual.hide()
-        for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-            np.hide()
+        self.hide_card()
+        # Скрытый манекен не держит свою текстуру в кэше
+        self.unpin_texture()
         self.disable_collisions()
         
         # Через 3 секунды восстанавливаем манекен
-        taskMgr.doMethodLater(3.0, self.restore_target, 'restore_target')
+        self.restore_task = taskMgr.doMethodLater(3.0, self.restore_target, 'restore_target')
+
+    def choose_texture(self):
+        """Выбирает новую текстуру только если включен режим изображений"""
+        show_images = self.game.settings.get('show_target_images', True)
+        if show_images:
+            category = self.game.settings.get('nsfw_category', 'furry')
+            # Категорию могли сменить посреди сессии
+            if not Target.category_loaded or Target.current_category != category:
+                Target.preload_category(self.game, category)
+            texture_path = Target.get_image_index().random_image(category)
+            if texture_path:
+                self.texture_path = texture_path
+                self.show_texture(self.texture_path)
 
     def restore_target(self, task):
+        self.restore_task = None
         self.current_hp = self.max_hp
         self.is_active = True
         
-        # Выбираем новую текстуру только если включен режим изображений
-        show_images = self.game.settings.get('show_target_images', True)
-        if show_images:
-            category = self.game.settings.get('nsfw_category', 'furry')
-            category_images = self.get_images_from_category(category)
-            
-            if category_images:
-                self.texture_path = random.choice(category_images)
-                tex = self.load_texture(self.texture_path)
-                if tex:
-                    self.visual.setTexture(tex)
-                    self.visual.setTransparency(1)
-                    self.visual.setBin("transparent", 0)
-                    self.visual.setDepthWrite(False)
+        self.choose_texture()
         
         # Показываем все части и включаем коллизии
-        self.visual.show()
-        for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-            np.show()
+        self.show_card()
         self.enable_collisions()
         
         self.update_visibility()
         return task.done
 
+    def deactivate(self):
+        """Убирает манекен в пул: без карточки, коллизий и отложенных задач"""
+        self.is_active = False
+        if self.restore_task:
+            taskMgr.remove(self.restore_task)
+            self.restore_task = None
+        self.release_atlas_card()
+        self.unpin_texture()
+        self.disable_collisions()
+        # Спрятанный узел не рисуется и не участвует в коллизиях
+        self.model.stash()
+
+    def place(self, pos):
+        """Достает манекен из пула на новую позицию"""
+        self.position = pos
+        self.model.setPos(pos)
+        self.face_player()
+        self.model.unstash()
+        
+        self.current_hp = self.max_hp
+        self.is_active = True
+        self.visual.setColorScale(1, 1, 1, 1)
+        
+        self.choose_texture()
+        
+        self.show_card()
+        self.enable_collisions()
+        
+        self.update_visibility()
+
+    def face_player(self):
+        """Поворачивает манекен лицом к игроку"""
+        self.model.lookAt(0, 0, 0)
+        self.model.setH(self.model.getH() + 180)  # Разворачиваем на 180 градусов
+
     def take_damage(self, damage):
         if not self.is_active:
             return
@@ -293,50 +437,140 @@ class Target:
         else:
             # Change color based on remaining health
             health_fraction = self.current_hp / self.max_hp
-            self.visual.setColorScale(1, health_fraction, health_fraction, 1)
+            if self.atlas_card:
+                self.atlas_card.set_color(1, health_fraction, health_fraction, 1)
+            else:
+                self.visual.setColorScale(1, health_fraction, health_fraction, 1)
 
     def disable_collisions(self):
-        for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-            np.node().setIntoCollideMask(BitMask32.allOff())
+        # Маски у шаблона общие, поэтому прячем только свой экземпляр
+        self.hitbox_np.stash()
+        self.sync_hit_engine()
 
     def enable_collisions(self):
-        for np in [self.head_np, self.body_np, self.left_arm_np, self.right_arm_np, self.legs_np]:
-            np.node().setIntoCollideMask(BitMask32.bit(1))
+        self.hitbox_np.unstash()
+        self.sync_hit_engine()
+
+    def sync_hit_engine(self):
+        """Передает положение манекена в пакетную проверку лучей (HitEngine)"""
+        hit_engine = getattr(self.game, 'hit_engine', None)
+        if not hit_engine:
+            return
+        if self.is_active and not self.hitbox_np.isStashed():
+            hit_engine.update_target(self)
+        else:
+            hit_engine.remove_target(self)
 
-    def get_damage_for_part(self, part_name):
+    def get_damage_for_part(self, hit_node):
         """Возвращает урон в зависимости от части тела"""
-        damages = {
-            'target_head': 100,      # Голова - мгновенное убийство
-            'target_body': 60,       # Тело - средний урон
-            'target_left_arm': 40,   # Руки - малый урон
-            'target_right_arm': 40,
-            'target_legs': 40        # Ноги - малый урон
-        }
-        return damages.get(part_name, 0)
+        zone = HitboxTemplate.get_zone(hit_node)
+        return zone.damage if zone else 0
 
     def check_hit(self, from_point, direction):
         """Проверяет попадание в манекен и возвращает информацию о попадании"""
         if not self.is_active:
             return False, None, 0
 
-        # Создаем луч для проверки попадания
-        self.game.picker.setFromLens(self.game.camNode, from_point.x, from_point.y)
-        
-        if self.game.cQueue.getNumEntries() > 0:
-            self.game.cQueue.sortEntries()
-            entry = self.game.cQueue.getEntry(0)
-            
-            hit_node = entry.getIntoNode()
-            hit_name = hit_node.getName()
-            
-            # Получаем точку попадания в мировых координатах
-            hit_pos = entry.getSurfacePoint(self.game.render)
-            
-            # Получаем урон в зависимости от части тела
-            damage = self.get_damage_for_part(hit_name)
-            
+        # Один луч в мировых координатах через общую проверку попаданий
+        hit = self.game.hit_registration.cast(from_point, direction)
+        if hit and hit.target is self:
+            damage = hit.zone.damage
             if damage > 0:  # Если попали в валидную часть тела
                 self.take_damage(damage)
-                return True, hit_pos, damage
+                return True, hit.point, damage
                 
         return False, None, 0
+
+
+class TargetPool:
+    """Пул заранее созданных манекенов.
+
+    Убитый манекен не удаляется, а прячется в пул и потом ставится на новую
+    позицию. game.targets содержит только активные манекены. Запас свободных
+    манекенов (spare) достраивается в фоне не больше builds_per_frame за кадр,
+    поэтому спавн почти никогда не создает узлы и коллизии заново.
+    """
+
+    # Позиция для манекенов, которые строятся про запас
+    STORAGE_POS = Point3(0, 25, 1)
+
+    def __init__(self, game, spare=2, builds_per_frame=1):
+        self.game = game
+        self.spare = spare
+        self.builds_per_frame = builds_per_frame
+        self.free = []
+        self.pending_builds = 0
+        self.grow_task = None
+        self.built = 0
+
+    def build(self):
+        target = Target(self.game, self.STORAGE_POS)
+        target.deactivate()
+        # Постоянный номер манекена (для журнала событий): объект живет в пуле всю игру
+        target.pool_id = self.built
+        self.built += 1
+        return target
+
+    def reserve(self, count):
+        """Досоздает свободные манекены до count, по несколько за кадр"""
+        self.pending_builds = max(self.pending_builds, count - len(self.free))
+        if self.pending_builds > 0 and self.grow_task is None:
+            self.grow_task = self.game.taskMgr.add(self.grow, 'target_pool_grow')
+
+    def prewarm(self, count):
+        """Сразу создает count свободных манекенов (на загрузке уровня)"""
+        while len(self.free) < count:
+            self.free.append(self.build())
+
+    def grow(self, task):
+        for _ in range(self.builds_per_frame):
+            if self.pending_builds <= 0:
+                break
+            self.free.append(self.build())
+            self.pending_builds -= 1
+        if self.pending_builds <= 0:
+            self.grow_task = None
+            return task.done
+        return task.cont
+
+    def acquire(self, pos):
+        """Ставит манекен из пула на позицию и добавляет в game.targets"""
+        if self.free:
+            target = self.free.pop()
+        else:
+            # Пул пуст - строим сразу, такого быть не должно при нормальном запасе
+            target = self.build()
+        target.place(pos)
+        self.game.targets.append(target)
+        if len(self.free) < self.spare:
+            self.reserve(self.spare)
+        return target
+
+    def release(self, target):
+        """Возвращает убитый манекен в пул"""
+        if target in self.game.targets:
+            self.game.targets.remove(target)
+        if target not in self.free:
+            target.deactivate()
+            self.free.append(target)
+
+    def release_all(self):
+        for target in list(self.game.targets):
+            self.release(target)
+
+    def find(self, node_path):
+        """Находит активный манекен по его корневому узлу"""
+        for target in self.game.targets:
+            if target.model == node_path:
+                return target
+        return None
+
+    def destroy(self):
+        if self.grow_task:
+            self.game.taskMgr.remove(self.grow_task)
+            self.grow_task = None
+        for target in self.game.targets + self.free:
+            target.destroy()
+        self.game.targets.clear()
+        self.free.clear()
+        self.pending_builds = 0
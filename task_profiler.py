@@ -0,0 +1,312 @@
+import csv
+import os
+import time
+
+import numpy as np
+
+# Границы корзин гистограммы, с: от 1 мкс до 100 мс по логарифмической шкале
+HISTOGRAM_BINS = np.logspace(-6, -1, 21)
+
+
+class TaskTiming:
+    """Замеры одной задачи (по имени): все вызовы и сумма за каждый кадр в кольцевых буферах"""
+
+    def __init__(self, name, window):
+        self.name = name
+        self.samples = np.zeros(window)
+        self.frame_costs = np.zeros(window)
+        self.calls = 0
+        self.total = 0.0
+        self.max_time = 0.0
+        self.frame_cost = 0.0
+        self.frame_calls = 0
+
+    def record(self, elapsed):
+        self.samples[self.calls % len(self.samples)] = elapsed
+        self.calls += 1
+        self.total += elapsed
+        self.frame_cost += elapsed
+        self.frame_calls += 1
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def get_samples(self):
+        return self.samples[:min(self.calls, len(self.samples))]
+
+    def get_histogram(self, bins=HISTOGRAM_BINS):
+        """Число вызовов по корзинам длительности (последние window вызовов)"""
+        counts, _ = np.histogram(np.clip(self.get_samples(), bins[0], bins[-1]), bins)
+        return counts
+
+
+class TaskProfiler:
+    """Время каждой задачи taskMgr, включая doMethodLater.
+
+    Пока профайлер включен, функция каждой задачи (уже добавленной и
+    добавляемой через add/doMethodLater) обернута замером perf_counter.
+    Задача task_profiler в самом конце кадра раскладывает суммы по
+    кольцевым буферам, из которых берутся гистограммы, топ задач для
+    оверлея и CSV. Свои затраты профайлер тоже считает и сравнивает с
+    бюджетом overhead_budget_ms на кадр.
+    """
+
+    def __init__(self, task_mgr, window=600, overhead_budget_ms=0.1):
+        self.task_mgr = task_mgr
+        self.window = window
+        self.overhead_budget_ms = overhead_budget_ms
+        self.timings = {}
+        self.enabled = False
+        self.task = None
+
+        self.frame = 0
+        self.frame_times = np.zeros(window)
+        self.overheads = np.zeros(window)
+        self.last_frame_end = None
+        self.call_overhead = 0.0
+        self.budget_warned = False
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.call_overhead = self.calibrate()
+        # Новые задачи оборачиваются сразу при добавлении
+        self.original_add = self.task_mgr.add
+        self.original_do_method_later = self.task_mgr.doMethodLater
+        self.task_mgr.add = self.add
+        self.task_mgr.doMethodLater = self.do_method_later
+        for task in self.get_tasks():
+            self.wrap(task)
+        self.last_frame_end = None
+        self.task = self.original_add(self.end_frame, 'task_profiler', sort=1000)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.task_mgr.remove(self.task)
+        self.task = None
+        del self.task_mgr.add
+        del self.task_mgr.doMethodLater
+        for task in self.get_tasks():
+            function = task.getFunction()
+            if hasattr(function, 'original'):
+                task.setFunction(function.original)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def get_tasks(self):
+        return [task for task in self.task_mgr.getTasks() + self.task_mgr.getDoLaters()
+                if hasattr(task, 'getFunction')]
+
+    def add(self, *args, **kwargs):
+        task = self.original_add(*args, **kwargs)
+        self.wrap(task)
+        return task
+
+    def do_method_later(self, *args, **kwargs):
+        task = self.original_do_method_later(*args, **kwargs)
+        self.wrap(task)
+        return task
+
+    def wrap(self, task):
+        function = task.getFunction()
+        if function is None or hasattr(function, 'original') or task is self.task:
+            return
+        name = task.getName()
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = TaskTiming(name, self.window)
+        task.setFunction(self.make_wrapper(function, timing))
+
+    @staticmethod
+    def make_wrapper(function, timing):
+        perf_counter = time.perf_counter
+
+        def profiled(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timing.record(perf_counter() - started)
+        profiled.original = function
+        return profiled
+
+    def calibrate(self, calls=5000):
+        """Цена обертки на один вызов, с"""
+        def noop():
+            return None
+
+        wrapped = self.make_wrapper(noop, TaskTiming('calibration', 16))
+        started = time.perf_counter()
+        for _ in range(calls):
+            noop()
+        plain = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(calls):
+            wrapped()
+        return max(0.0, (time.perf_counter() - started - plain) / calls)
+
+    def end_frame(self, task):
+        started = time.perf_counter()
+        slot = self.frame % self.window
+        calls = 0
+        for timing in self.timings.values():
+            timing.frame_costs[slot] = timing.frame_cost
+            calls += timing.frame_calls
+            timing.frame_cost = 0.0
+            timing.frame_calls = 0
+
+        if self.last_frame_end is not None:
+            self.frame_times[slot] = started - self.last_frame_end
+        self.frame += 1
+        ended = time.perf_counter()
+        self.last_frame_end = ended
+        self.overheads[slot] = calls * self.call_overhead + (ended - started)
+
+        if not self.budget_warned and self.frame == self.window and \
+                self.get_overhead_ms() > self.overhead_budget_ms:
+            print(f"Task profiler overhead {self.get_overhead_ms():.3f} ms/frame "
+                  f"is over budget {self.overhead_budget_ms} ms")
+            self.budget_warned = True
+        return task.cont
+
+    def get_frames(self):
+        return min(self.frame, self.window)
+
+    def get_overhead_ms(self):
+        frames = self.get_frames()
+        return float(self.overheads[:frames].mean() * 1000) if frames else 0.0
+
+    def get_top(self, count=8):
+        """Самые дорогие задачи за последние кадры: [(имя, мс/кадр, макс. мс)]"""
+        frames = self.get_frames()
+        if not frames:
+            return []
+        rows = [(timing.name, float(timing.frame_costs[:frames].mean() * 1000), timing.max_time * 1000)
+                for timing in self.timings.values()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:count]
+
+    def get_overlay_values(self):
+        """Текст оверлея для Hud: кадр, затраты профайлера и топ задач"""
+        frames = self.get_frames()
+        frame_ms = self.frame_times[:frames].mean() * 1000 if frames else 0.0
+        lines = [f"Frame {frame_ms:.2f} ms, profiler {self.get_overhead_ms():.3f} ms"]
+        for name, ms, max_ms in self.get_top():
+            lines.append(f"{name[:24]:<24} {ms:6.3f} ms  max {max_ms:6.2f}")
+        return ("\n".join(lines),)
+
+    def get_stats(self):
+        frames = self.get_frames()
+        tasks = {}
+        for timing in sorted(self.timings.values(), key=lambda timing: timing.total, reverse=True):
+            samples = timing.get_samples()
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99)) * 1000 if len(samples) else (0.0, 0.0, 0.0)
+            tasks[timing.name] = {
+                'calls': timing.calls,
+                'ms_per_frame': float(timing.frame_costs[:frames].mean() * 1000) if frames else 0.0,
+                'mean_ms': timing.total / timing.calls * 1000 if timing.calls else 0.0,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': timing.max_time * 1000
+            }
+        overhead = self.get_overhead_ms()
+        return {
+            'frames': self.frame,
+            'overhead_ms': overhead,
+            'overhead_budget_ms': self.overhead_budget_ms,
+            'within_budget': overhead <= self.overhead_budget_ms,
+            'tasks': tasks
+        }
+
+    def export_csv(self, path):
+        """Пишет по строке на задачу и кадр из кольцевых буферов (frame, task, ms)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        frames = self.get_frames()
+        first = self.frame - frames
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'task', 'ms'])
+            for frame in range(first, self.frame):
+                slot = frame % self.window
+                writer.writerow([frame, 'frame', f"{self.frame_times[slot] * 1000:.4f}"])
+                writer.writerow([frame, 'task_profiler', f"{self.overheads[slot] * 1000:.4f}"])
+                for timing in self.timings.values():
+                    if timing.frame_costs[slot]:
+                        writer.writerow([frame, timing.name, f"{timing.frame_costs[slot] * 1000:.4f}"])
+        return path
+
+    def reset(self):
+        self.timings.clear()
+        self.frame = 0
+        self.last_frame_end = None
+        self.budget_warned = False
+
+    def destroy(self):
+        self.disable()
+        self.timings.clear()
+
+
+if __name__ == "__main__":
+    # Бенчмарк затрат: 30 задач разной стоимости, кадр без профайлера и с ним.
+    # Затраты должны укладываться в бюджет, топ - совпадать с настоящей стоимостью задач.
+    import tempfile
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData('', 'window-type none\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+
+    base = ShowBase()
+
+    def make_work(iterations):
+        def work(task):
+            total = 0
+            for i in range(iterations):
+                total += i
+            return task.cont
+        return work
+
+    for i in range(30):
+        base.taskMgr.add(make_work(i * 20), f"work_{i:02d}", sort=i)
+
+    def one_shot(task):
+        make_work(2000)(task)
+        return task.done
+
+    def run(frames=600):
+        total = 0.0
+        for frame in range(frames):
+            if frame % 30 == 0:
+                base.taskMgr.doMethodLater(0, one_shot, 'one_shot')
+            started = time.perf_counter()
+            base.taskMgr.step()
+            total += time.perf_counter() - started
+        return total / frames * 1000
+
+    run(60)
+    plain_ms = run()
+    profiler = TaskProfiler(base.taskMgr)
+    profiler.enable()
+    profiled_ms = run()
+    stats = profiler.get_stats()
+    print(f"frame without profiler {plain_ms:.3f} ms, with profiler {profiled_ms:.3f} ms "
+          f"(+{profiled_ms - plain_ms:.3f} ms)")
+    print(f"profiler estimate {stats['overhead_ms']:.3f} ms/frame, budget {stats['overhead_budget_ms']} ms, "
+          f"within budget: {stats['within_budget']}")
+    print(profiler.get_overlay_values()[0])
+    print(f"one_shot: {stats['tasks']['one_shot']}")
+    print(f"work_29 histogram: {profiler.timings['work_29'].get_histogram().tolist()}")
+    path = profiler.export_csv(os.path.join(tempfile.mkdtemp(), 'tasks.csv'))
+    with open(path) as f:
+        rows = sum(1 for _ in f)
+    print(f"CSV {path}: {rows} rows")
+    profiler.disable()
+    print(f"after disable: {run(60):.3f} ms/frame, add restored: {'add' not in vars(base.taskMgr)}")
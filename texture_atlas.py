@@ -0,0 +1,318 @@
+from panda3d.core import Texture, PNMImage, Filename, NodePath, GeomNode, Geom, GeomTriangles
+from panda3d.core import GeomVertexData, GeomVertexFormat, GeomVertexWriter, OmniBoundingVolume
+from panda3d.core import TransparencyAttrib, Point3
+
+
+class TextureAtlas:
+    """Изображения категории, упакованные в несколько страниц-текстур.
+
+    Карточки всех манекенов одного размера, поэтому страница делится на
+    одинаковые ячейки. regions хранит для каждого пути номер страницы и
+    UV-прямоугольник (u0, v0, u1, v1).
+    """
+
+    def __init__(self, pages, regions):
+        self.pages = pages
+        self.regions = regions
+
+    @staticmethod
+    def build(paths, cell_size=(256, 480), page_size=2048, padding=2):
+        """Собирает атлас; безопасно вызывать из фонового потока"""
+        cell_w, cell_h = cell_size
+        slot_w = cell_w + padding * 2
+        slot_h = cell_h + padding * 2
+        cols = max(1, page_size // slot_w)
+        rows = max(1, page_size // slot_h)
+        per_page = cols * rows
+
+        images = []
+        for path in paths:
+            image = PNMImage()
+            if not image.read(Filename(path)):
+                print(f"Ошибка чтения изображения для атласа: {path}")
+                continue
+            if not image.hasAlpha():
+                image.addAlpha()
+                image.alphaFill(1.0)
+            images.append((path, image))
+
+        pages = []
+        regions = {}
+        for first in range(0, len(images), per_page):
+            chunk = images[first:first + per_page]
+            # Последняя страница может быть ниже, если картинок мало
+            used_rows = (len(chunk) + cols - 1) // cols
+            page_w = cols * slot_w if len(chunk) >= cols else len(chunk) * slot_w
+            page_h = used_rows * slot_h
+            page = PNMImage(page_w, page_h, 4)
+            page.alphaFill(0.0)
+
+            cell = PNMImage(cell_w, cell_h, 4)
+            for i, (path, image) in enumerate(chunk):
+                x = (i % cols) * slot_w + padding
+                y = (i // cols) * slot_h + padding
+                cell.quickFilterFrom(image)
+                page.copySubImage(cell, x, y)
+
+                # В PNMImage y растет вниз, в UV - вверх
+                regions[path] = (len(pages), (
+                    x / page_w,
+                    1.0 - (y + cell_h) / page_h,
+                    (x + cell_w) / page_w,
+                    1.0 - y / page_h
+                ))
+
+            tex = Texture(f"target_atlas_{len(pages)}")
+            tex.load(page)
+            tex.setWrapU(Texture.WM_clamp)
+            tex.setWrapV(Texture.WM_clamp)
+            pages.append(tex)
+
+        return TextureAtlas(pages, regions)
+
+
+class CardBatch:
+    """Карточки манекенов с одной страницы атласа в одном Geom (один draw call).
+
+    Каждой карточке выделяется слот из четырех вершин. Вершины пишутся сразу
+    в координатах родителя, скрытая карточка схлопывается в точку.
+    """
+
+    # Рамка карточки как у CardMaker в Target.create_model
+    FRAME = (-0.8, 0.8, 0.0, 3.0)
+
+    def __init__(self, parent, texture, capacity=16):
+        self.capacity = 0
+        self.free_slots = []
+        self.slots = {}
+
+        self.vdata = GeomVertexData('target_cards', GeomVertexFormat.getV3c4t2(), Geom.UHDynamic)
+        self.triangles = GeomTriangles(Geom.UHStatic)
+        geom = Geom(self.vdata)
+        geom.addPrimitive(self.triangles)
+        node = GeomNode('target_card_batch')
+        node.addGeom(geom)
+        # Карточки разбросаны по всей арене, отсекать пачку целиком нет смысла
+        node.setBounds(OmniBoundingVolume())
+        node.setFinal(True)
+
+        self.np = parent.attachNewNode(node)
+        self.np.setTexture(texture)
+        # Dual: непрозрачные пиксели пишут глубину, поэтому сортировка карточек не нужна
+        self.np.setTransparency(TransparencyAttrib.MDual)
+        self.geom = node.modifyGeom(0)
+        self.vdata = self.geom.modifyVertexData()
+        self.triangles = self.geom.modifyPrimitive(0)
+
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """Увеличивает число слотов, новые слоты сразу скрыты"""
+        old_capacity = self.capacity
+        self.vdata.setNumRows(capacity * 4)
+        for slot in range(old_capacity, capacity):
+            base = slot * 4
+            self.triangles.addVertices(base, base + 1, base + 2)
+            self.triangles.addVertices(base, base + 2, base + 3)
+            self.collapse(slot)
+        # Свободные слоты выдаются с начала
+        self.free_slots = list(range(capacity - 1, old_capacity - 1, -1)) + self.free_slots
+        self.capacity = capacity
+
+    def allocate(self, mat, uv, color=(1, 1, 1, 1)):
+        if not self.free_slots:
+            self.grow(self.capacity * 2)
+        slot = self.free_slots.pop()
+        self.slots[slot] = {'mat': mat, 'uv': uv, 'color': color, 'visible': True}
+        self.write(slot)
+        return slot
+
+    def free(self, slot):
+        if self.slots.pop(slot, None) is not None:
+            self.collapse(slot)
+            self.free_slots.append(slot)
+
+    def update(self, slot, **changes):
+        """Меняет матрицу, UV, цвет или видимость карточки и переписывает ее вершины"""
+        data = self.slots.get(slot)
+        if data is None:
+            return
+        data.update(changes)
+        if data['visible']:
+            self.write(slot)
+        else:
+            self.collapse(slot)
+
+    def write(self, slot):
+        data = self.slots[slot]
+        mat = data['mat']
+        u0, v0, u1, v1 = data['uv']
+        left, right, bottom, top = self.FRAME
+
+        vertex = GeomVertexWriter(self.vdata, 'vertex')
+        color = GeomVertexWriter(self.vdata, 'color')
+        texcoord = GeomVertexWriter(self.vdata, 'texcoord')
+        vertex.setRow(slot * 4)
+        color.setRow(slot * 4)
+        texcoord.setRow(slot * 4)
+
+        # Порядок вершин и UV как у CardMaker
+        for x, z, u, v in ((left, bottom, u0, v0), (right, bottom, u1, v0),
+                           (right, top, u1, v1), (left, top, u0, v1)):
+            vertex.setData3(mat.xformPoint(Point3(x, 0, z)))
+            color.setData4(*data['color'])
+            texcoord.setData2(u, v)
+
+    def collapse(self, slot):
+        vertex = GeomVertexWriter(self.vdata, 'vertex')
+        vertex.setRow(slot * 4)
+        for _ in range(4):
+            vertex.setData3(0, 0, 0)
+
+    def destroy(self):
+        self.slots.clear()
+        self.np.removeNode()
+
+
+class AtlasCard:
+    """Ссылка манекена на его слот в пачке карточек"""
+
+    def __init__(self, renderer, batch, slot):
+        self.renderer = renderer
+        self.batch = batch
+        self.slot = slot
+
+    def is_valid(self):
+        return not self.renderer.destroyed
+
+    def show(self):
+        if self.is_valid():
+            self.batch.update(self.slot, visible=True)
+
+    def hide(self):
+        if self.is_valid():
+            self.batch.update(self.slot, visible=False)
+
+    def set_color(self, r, g, b, a=1):
+        if self.is_valid():
+            self.batch.update(self.slot, color=(r, g, b, a))
+
+    def place(self, mat):
+        if self.is_valid():
+            self.batch.update(self.slot, mat=mat)
+
+    def release(self):
+        if self.is_valid():
+            self.batch.free(self.slot)
+        self.slot = None
+
+
+class AtlasCardRenderer:
+    """Атлас категории и по одной пачке карточек на каждую страницу"""
+
+    def __init__(self, parent, atlas):
+        self.atlas = atlas
+        self.destroyed = False
+        self.root = parent.attachNewNode('target_cards')
+        self.batches = [CardBatch(self.root, page) for page in atlas.pages]
+
+    def has_image(self, path):
+        return path in self.atlas.regions
+
+    def allocate(self, path, mat):
+        """Выделяет карточку под изображение или возвращает None, если его нет в атласе"""
+        region = self.atlas.regions.get(path)
+        if region is None:
+            return None
+        page_index, uv = region
+        batch = self.batches[page_index]
+        return AtlasCard(self, batch, batch.allocate(mat, uv))
+
+    def reassign(self, card, path, mat):
+        """Переносит карточку на другое изображение (возможно, на другую страницу)"""
+        page_index, uv = self.atlas.regions[path]
+        batch = self.batches[page_index]
+        if batch is card.batch:
+            batch.update(card.slot, uv=uv, mat=mat, visible=True)
+            return card
+        card.release()
+        return AtlasCard(self, batch, batch.allocate(mat, uv))
+
+    def get_draw_calls(self):
+        return len(self.batches)
+
+    def destroy(self):
+        self.destroyed = True
+        for batch in self.batches:
+            batch.destroy()
+        self.batches = []
+        self.root.removeNode()
+
+
+if __name__ == "__main__":
+    # Бенчмарк: draw calls и время кадра для отдельных карточек и для атласа
+    from panda3d.core import loadPrcFileData, CardMaker, Mat4
+    loadPrcFileData('', 'window-type offscreen\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+    import glob
+    import os
+    import random
+    import time
+
+    base = ShowBase()
+    base.camera.setPos(0, -10, 2)
+    category_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", "nsfw", "furry")
+    paths = [Filename.fromOsSpecific(p).getFullpath() for p in sorted(glob.glob(os.path.join(category_dir, "*")))]
+
+    started = time.perf_counter()
+    atlas = TextureAtlas.build(paths)
+    print(f"Atlas: {len(paths)} images -> {len(atlas.pages)} pages in {(time.perf_counter() - started) * 1000:.1f} ms")
+    textures = {path: base.loader.loadTexture(path) for path in paths}
+
+    def count_draw_calls(root):
+        return sum(np.node().getNumGeoms() for np in root.findAllMatches('**/+GeomNode') if not np.isHidden())
+
+    def frame_time(frames=60):
+        if base.win is None:
+            return float('nan')
+        for _ in range(5):
+            base.graphicsEngine.renderFrame()
+        started = time.perf_counter()
+        for _ in range(frames):
+            base.graphicsEngine.renderFrame()
+        return (time.perf_counter() - started) / frames * 1000
+
+    rng = random.Random(0)
+    print(f"{'targets':>8} {'cards draws':>12} {'cards ms':>10} {'atlas draws':>12} {'atlas ms':>10}")
+    for count in (10, 100, 1000):
+        placements = []
+        for _ in range(count):
+            holder = NodePath("target_root")
+            holder.setPos(rng.uniform(-15, 15), rng.uniform(15, 35), 1)
+            holder.lookAt(0, 0, 0)
+            holder.setH(holder.getH() + 180)
+            placements.append((rng.choice(paths), Mat4(holder.getMat())))
+
+        # Старый способ: своя карточка и своя текстура у каждого манекена
+        cards_root = base.render.attachNewNode("cards")
+        cm = CardMaker('card')
+        cm.setFrame(-0.8, 0.8, 0, 3.0)
+        for path, mat in placements:
+            card = cards_root.attachNewNode(cm.generate())
+            card.setMat(mat)
+            card.setTexture(textures[path])
+            card.setTransparency(1)
+            card.setBin("transparent", 0)
+            card.setDepthWrite(False)
+        cards_draws = count_draw_calls(cards_root)
+        cards_ms = frame_time()
+        cards_root.removeNode()
+
+        renderer = AtlasCardRenderer(base.render, atlas)
+        for path, mat in placements:
+            renderer.allocate(path, mat)
+        atlas_draws = count_draw_calls(renderer.root)
+        atlas_ms = frame_time()
+        renderer.destroy()
+
+        print(f"{count:>8} {cards_draws:>12} {cards_ms:>10.2f} {atlas_draws:>12} {atlas_ms:>10.2f}")
@@ -0,0 +1,139 @@
+from panda3d.core import TexturePool
+from collections import OrderedDict
+from texture_atlas import TextureAtlas
+
+
+class TextureCache:
+    """Кэш текстур манекенов с бюджетом памяти и вытеснением LRU.
+
+    Размер записи считается по RAM-образу текстуры (для атласа - сумма страниц).
+    Закрепленные (pin) записи видны на экране и не вытесняются, даже если
+    бюджет превышен. Поддерживает операции словаря, которые использует
+    TextureStreamer: in, [], put.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        # Ключ -> {'value', 'size'}; порядок - от давно использованных к недавним
+        self.entries = OrderedDict()
+        # Ключ -> число закреплений
+        self.pins = {}
+        self.used_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def texture_size(value):
+        """Размер текстуры или атласа в байтах"""
+        textures = value.pages if isinstance(value, TextureAtlas) else [value]
+        size = 0
+        for tex in textures:
+            ram_size = tex.getRamImageSize()
+            size += ram_size if ram_size else tex.getExpectedRamImageSize()
+        return size
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.evict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry['value']
+
+    def put(self, key, value, prefetch=False):
+        """Кладет текстуру в кэш.
+
+        prefetch=True для упреждающей загрузки: если места нет без вытеснения,
+        текстура не сохраняется, чтобы не выталкивать то, что реально нужно.
+        Возвращает True, если текстура осталась в кэше.
+        """
+        size = self.texture_size(value)
+        if prefetch and self.used_bytes + size > self.budget_bytes:
+            return False
+
+        self.pop(key)
+        self.entries[key] = {'value': value, 'size': size}
+        self.used_bytes += size
+        self.evict()
+        return key in self.entries
+
+    def pop(self, key, default=None):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return default
+        self.used_bytes -= entry['size']
+        return entry['value']
+
+    def is_full(self):
+        return self.used_bytes >= self.budget_bytes
+
+    def pin(self, key):
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        count = self.pins.get(key, 0) - 1
+        if count > 0:
+            self.pins[key] = count
+        else:
+            self.pins.pop(key, None)
+            self.evict()
+
+    def evict(self):
+        """Вытесняет давно не использованные незакрепленные записи до бюджета"""
+        if self.used_bytes <= self.budget_bytes:
+            return
+        for key in list(self.entries):
+            if self.used_bytes <= self.budget_bytes:
+                break
+            if key in self.pins:
+                continue
+            self.release(self.pop(key))
+            self.evictions += 1
+
+    @staticmethod
+    def release(value):
+        """Убирает текстуру (или страницы атласа) из пула Panda3D, иначе память не освободится"""
+        textures = value.pages if isinstance(value, TextureAtlas) else [value]
+        for tex in textures:
+            TexturePool.releaseTexture(tex)
+
+    def clear(self):
+        """Убирает все записи. Закрепления остаются: их держат манекены на экране,
+        и та же текстура, положенная снова, не должна вытесняться"""
+        for entry in self.entries.values():
+            self.release(entry['value'])
+        self.entries.clear()
+        self.used_bytes = 0
+
+    def get_stats(self):
+        return {
+            'entries': len(self.entries),
+            'pinned': len(self.pins),
+            'used_bytes': self.used_bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
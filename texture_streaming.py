@@ -0,0 +1,167 @@
+from panda3d.core import Texture, TexturePool, Filename, PNMImage
+import queue
+import threading
+
+
+class TextureStreamer:
+    """Фоновая загрузка текстур манекенов без блокировки кадра.
+
+    Файлы читаются и декодируются в рабочих потоках через TexturePool,
+    а готовые текстуры передаются основному потоку через очередь. Задача
+    taskMgr забирает не больше swaps_per_frame текстур за кадр, кладет их
+    в кэш и вызывает колбэки ожидающих манекенов.
+    """
+
+    def __init__(self, game, workers=2, swaps_per_frame=2):
+        self.game = game
+        self.swaps_per_frame = swaps_per_frame
+
+        # Задания для рабочих потоков и готовые результаты для основного
+        self.jobs = queue.Queue()
+        self.ready = queue.Queue()
+
+        # Путь -> список колбэков, ожидающих эту текстуру
+        self.pending = {}
+        # Категория -> {'loaded': n, 'total': n}
+        self.progress = {}
+        # Поколение увеличивается при смене категории, старые задания отбрасываются
+        self.generation = 0
+
+        # Заглушка, которую показывают манекены до загрузки текстуры
+        self.placeholder = self.create_placeholder()
+
+        self.workers = []
+        for i in range(workers):
+            worker = threading.Thread(
+                target=self.worker_loop,
+                name=f"texture_streamer_{i}",
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+        self.task = game.taskMgr.add(self.process_ready, 'texture_streamer')
+
+    @staticmethod
+    def create_placeholder():
+        """Создает полупрозрачную серую текстуру-заглушку"""
+        image = PNMImage(4, 4, 4)
+        image.fill(0.6, 0.6, 0.6)
+        image.alphaFill(0.5)
+        tex = Texture('target_placeholder')
+        tex.load(image)
+        return tex
+
+    def worker_loop(self):
+        """Читает файлы текстур в фоновом потоке"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            path, category, generation, loader = job
+            # Категорию уже сменили - не тратим время на старые файлы
+            if generation != self.generation:
+                self.ready.put((path, category, generation, None))
+                continue
+            tex = None
+            try:
+                tex = loader(path)
+            except Exception as e:
+                print(f"Ошибка фоновой загрузки текстуры {path}: {e}")
+            self.ready.put((path, category, generation, tex))
+
+    @staticmethod
+    def load_texture_file(path):
+        return TexturePool.loadTexture(Filename(path))
+
+    def reset(self):
+        """Отбрасывает все незавершенные задания (смена категории)"""
+        self.generation += 1
+        self.pending.clear()
+
+    def stream_category(self, category, paths, cache):
+        """Ставит в очередь загрузку всех изображений категории"""
+        self.reset()
+
+        loaded = sum(1 for path in paths if path in cache)
+        self.progress[category] = {'loaded': loaded, 'total': len(paths)}
+
+        for path in paths:
+            if path not in cache:
+                self.request(path, cache, category=category)
+
+    def stream_job(self, category, key, cache, loader, callback=None):
+        """Ставит в очередь одно задание на всю категорию (например, сборку атласа)"""
+        self.reset()
+        self.progress[category] = {'loaded': 1 if key in cache else 0, 'total': 1}
+        self.request(key, cache, callback=callback, category=category, loader=loader)
+
+    def request(self, path, cache, callback=None, category=None, loader=None):
+        """Запрашивает текстуру; колбэк вызывается в основном потоке.
+
+        loader позволяет загрузить в фоне что-то кроме файла текстуры
+        (например, собрать атлас); по умолчанию читается файл path.
+        """
+        if path in cache:
+            if callback:
+                callback(cache[path])
+            return
+
+        if path in self.pending:
+            if callback:
+                self.pending[path]['callbacks'].append(callback)
+            return
+
+        self.pending[path] = {
+            'cache': cache,
+            'callbacks': [callback] if callback else []
+        }
+        self.jobs.put((path, category, self.generation, loader or self.load_texture_file))
+
+    def process_ready(self, task):
+        """Забирает готовые текстуры с ограничением на количество за кадр"""
+        swapped = 0
+        while swapped < self.swaps_per_frame:
+            try:
+                path, category, generation, tex = self.ready.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self.generation:
+                continue
+
+            request = self.pending.pop(path, None)
+            if category in self.progress:
+                self.progress[category]['loaded'] += 1
+                progress = self.progress[category]
+                if progress['loaded'] == progress['total']:
+                    print(f"Streamed {progress['total']} textures for category: {category}")
+
+            if not tex or request is None:
+                continue
+
+            # Упреждающая загрузка без ожидающих не вытесняет нужные текстуры
+            request['cache'].put(path, tex, prefetch=not request['callbacks'])
+            for callback in request['callbacks']:
+                callback(tex)
+            swapped += 1
+
+        return task.cont
+
+    def get_progress(self, category):
+        """Возвращает долю загруженных текстур категории от 0 до 1"""
+        progress = self.progress.get(category)
+        if not progress or progress['total'] == 0:
+            return 1.0
+        return progress['loaded'] / progress['total']
+
+    def is_category_ready(self, category):
+        return self.get_progress(category) >= 1.0
+
+    def destroy(self):
+        """Останавливает рабочие потоки и задачу"""
+        self.generation += 1
+        self.pending.clear()
+        for _ in self.workers:
+            self.jobs.put(None)
+        self.game.taskMgr.remove(self.task)
@@ -0,0 +1,161 @@
+from panda3d.core import GeomVertexData, GeomVertexFormat, GeomVertexArrayFormat, GeomLines, Geom, GeomNode
+from panda3d.core import InternalName, OmniBoundingVolume, TransparencyAttrib
+import numpy as np
+
+
+class TracerRenderer:
+    """Все следы пуль в одном Geom (один draw call).
+
+    Вершины лежат в кольцевом буфере GeomVertexData: след занимает слот из
+    двух вершин, новый след пишется в следующий слот, а самый старый слот
+    переиспользуется. Затухание - один проход NumPy по колонке цвета за кадр,
+    истекшие следы схлопываются в точку.
+    """
+
+    def __init__(self, parent, capacity=128, color=(1.0, 1.0, 0.8, 0.5), thickness=2.0,
+                 hold_time=0.1, fade_time=0.2):
+        self.capacity = capacity
+        self.color = color
+        self.hold_time = hold_time
+        self.fade_time = fade_time
+        self.next_slot = 0
+
+        # Время появления следа в слоте; -inf - слот свободен
+        self.spawn_times = np.full(capacity, -np.inf)
+        self.live = 0
+
+        # Позиции и цвета в отдельных массивах, чтобы писать их через NumPy
+        vertex_array = GeomVertexArrayFormat()
+        vertex_array.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+        color_array = GeomVertexArrayFormat()
+        color_array.addColumn(InternalName.getColor(), 4, Geom.NT_float32, Geom.C_color)
+        vertex_format = GeomVertexFormat()
+        vertex_format.addArray(vertex_array)
+        vertex_format.addArray(color_array)
+        vertex_format = GeomVertexFormat.registerFormat(vertex_format)
+
+        vdata = GeomVertexData('tracers', vertex_format, Geom.UHDynamic)
+        vdata.uncleanSetNumRows(capacity * 2)
+        lines = GeomLines(Geom.UHStatic)
+        for slot in range(capacity):
+            lines.addVertices(slot * 2, slot * 2 + 1)
+        geom = Geom(vdata)
+        geom.addPrimitive(lines)
+        node = GeomNode('tracers')
+        node.addGeom(geom)
+        # Следы разлетаются по всей арене, отсекать их нет смысла
+        node.setBounds(OmniBoundingVolume())
+        node.setFinal(True)
+
+        self.np = parent.attachNewNode(node)
+        self.np.setTransparency(TransparencyAttrib.MAlpha)
+        self.np.setRenderModeThickness(thickness)
+        self.np.setLightOff()
+        self.vdata = node.modifyGeom(0).modifyVertexData()
+
+        self.positions()[:] = 0
+        colors = self.colors()
+        colors[:] = color
+        colors[:, 3] = 0
+
+    def positions(self):
+        return np.frombuffer(memoryview(self.vdata.modifyArray(0)), dtype=np.float32).reshape(-1, 3)
+
+    def colors(self):
+        return np.frombuffer(memoryview(self.vdata.modifyArray(1)), dtype=np.float32).reshape(-1, 4)
+
+    def add(self, start_pos, end_pos, now):
+        """Пишет новый след в следующий слот кольца"""
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.capacity
+        if self.spawn_times[slot] == -np.inf:
+            self.live += 1
+
+        positions = self.positions()
+        positions[slot * 2] = (start_pos[0], start_pos[1], start_pos[2])
+        positions[slot * 2 + 1] = (end_pos[0], end_pos[1], end_pos[2])
+        colors = self.colors()
+        colors[slot * 2:slot * 2 + 2] = self.color
+        self.spawn_times[slot] = now
+
+    def update(self, now):
+        """Обновляет прозрачность всех живых следов одним проходом"""
+        if self.live == 0:
+            return
+
+        age = now - self.spawn_times
+        alive = age < self.hold_time + self.fade_time
+        fade = np.clip(1.0 - (age - self.hold_time) / self.fade_time, 0.0, 1.0)
+        alpha = np.where(alive, self.color[3] * fade, 0.0).astype(np.float32)
+        self.colors()[:, 3] = np.repeat(alpha, 2)
+
+        # Истекшие следы схлопываем в точку и освобождаем слоты
+        expired = np.flatnonzero(~alive & (self.spawn_times > -np.inf))
+        if len(expired):
+            positions = self.positions()
+            positions[expired * 2 + 1] = positions[expired * 2]
+            self.spawn_times[expired] = -np.inf
+            self.live -= len(expired)
+
+    def clear(self):
+        self.spawn_times[:] = -np.inf
+        self.live = 0
+        self.positions()[:] = 0
+        self.colors()[:, 3] = 0
+
+    def destroy(self):
+        self.np.removeNode()
+
+
+if __name__ == "__main__":
+    # Бенчмарк: LineSegs + Sequence на каждый след против кольцевого буфера
+    from panda3d.core import loadPrcFileData, LineSegs, Vec4, Point3
+    loadPrcFileData('', 'window-type offscreen\naudio-library-name null')
+    from direct.showbase.ShowBase import ShowBase
+    from direct.interval.IntervalGlobal import Sequence, Wait, LerpColorScaleInterval, Func
+    import random
+    import time
+
+    base = ShowBase()
+    rng = random.Random(0)
+
+    def random_segment():
+        return Point3(0.2, 0.6, 1.6), Point3(rng.uniform(-15, 15), rng.uniform(15, 35), rng.uniform(0, 3))
+
+    def old_trace(parent, start_pos, end_pos):
+        ls = LineSegs()
+        ls.setColor(1.0, 1.0, 0.8, 0.5)
+        ls.setThickness(2.0)
+        ls.moveTo(start_pos)
+        ls.drawTo(end_pos)
+        trace = parent.attachNewNode(ls.create())
+        trace.setTransparency(TransparencyAttrib.MAlpha)
+        Sequence(Wait(0.1), LerpColorScaleInterval(trace, 0.2, Vec4(1, 1, 1, 0)), Func(trace.removeNode)).start()
+
+    def run(frames, per_frame, spawn):
+        """Средняя длительность кадра (мс) и максимум узлов/draw calls под parent"""
+        parent = base.render.attachNewNode('traces')
+        tracers = TracerRenderer(parent) if spawn is None else None
+        peak_geoms = 0
+        started = time.perf_counter()
+        for _ in range(frames):
+            now = globalClock.getFrameTime()
+            for _ in range(per_frame):
+                start_pos, end_pos = random_segment()
+                if tracers:
+                    tracers.add(start_pos, end_pos, now)
+                else:
+                    spawn(parent, start_pos, end_pos)
+            if tracers:
+                tracers.update(now)
+            base.taskMgr.step()
+            peak_geoms = max(peak_geoms, len(parent.findAllMatches('**/+GeomNode')))
+        elapsed = (time.perf_counter() - started) / frames * 1000
+        parent.removeNode()
+        return elapsed, peak_geoms
+
+    print(f"{'tracers/frame':>14} {'linesegs ms':>12} {'draws':>6} {'ring ms':>9} {'draws':>6}")
+    for per_frame in (1, 8, 32):
+        old_ms, old_draws = run(120, per_frame, old_trace)
+        ring_ms, ring_draws = run(120, per_frame, None)
+        print(f"{per_frame:>14} {old_ms:>12.3f} {old_draws:>6} {ring_ms:>9.3f} {ring_draws:>6}")